@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Littlelemon.settings')
+# Serve the read-heavy endpoints with the async views under ASGI
+os.environ.setdefault('LITTLELEMON_ASYNC_VIEWS', '1')
+# Async requests run their ORM calls on short-lived threads, so connections
+# cannot be reused across requests
+os.environ.setdefault('LITTLELEMON_CONN_MAX_AGE', '0')
+# WAL and the other SQLite production PRAGMAs (settings.SQLITE_PROFILES)
+os.environ.setdefault('LITTLELEMON_SQLITE_PROFILE', 'production')
 
 application = get_asgi_application()
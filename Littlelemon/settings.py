@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+import django
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -25,6 +28,8 @@ ALLOWED_HOSTS = []
 
 
 # Application definition
+# (API-only nodes run Littlelemon/settings_api.py, without the admin,
+# messages, staticfiles and djoser)
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -41,7 +46,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'LittlelemonAPI.middleware.metrics_middleware',
+    'LittlelemonAPI.middleware.compression_middleware',
     'django.middleware.security.SecurityMiddleware',
+    'LittlelemonAPI.middleware.replica_routing_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -74,12 +82,58 @@ WSGI_APPLICATION = 'Littlelemon.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+DATABASE_PATH = Path(os.environ.get('LITTLELEMON_DB_PATH', BASE_DIR / 'db.sqlite3')).resolve()
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'NAME': DATABASE_PATH,
+        # Keep connections across requests (asgi.py sets 0, see the Django
+        # docs on persistent connections under ASGI); checked before reuse
+        'CONN_MAX_AGE': int(os.environ.get('LITTLELEMON_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        # BEGIN IMMEDIATE: a transaction takes the write lock when it starts.
+        # A deferred one that reads and then writes cannot wait for the lock
+        # under WAL (busy_timeout does not apply) and fails at once with
+        # "database is locked" if another write committed in between. Older
+        # Django has no such option, LittlelemonAPI/database.py does the same.
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'} if django.VERSION >= (5, 1) else {},
+    },
+    # Read-only connection for the reads of GET requests (see
+    # LittlelemonAPI/routers.py). By default the same file opened with
+    # mode=ro, which under WAL never waits for the writer;
+    # LITTLELEMON_REPLICA_PATH can point at a synced snapshot instead.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': Path(os.environ.get('LITTLELEMON_REPLICA_PATH', DATABASE_PATH)).resolve().as_uri() + '?mode=ro',
+        'CONN_MAX_AGE': int(os.environ.get('LITTLELEMON_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['LittlelemonAPI.routers.ReadReplicaRouter']
+
+# PRAGMAs run on every new SQLite connection (see LittlelemonAPI/database.py).
+# 'production' lets readers and the writer run concurrently (WAL), waits
+# for the write lock instead of failing with "database is locked", and
+# trades the fsync on every commit for one per checkpoint. WAL mode is
+# stored in the database file, so it is opt-in: deployments set
+# LITTLELEMON_SQLITE_PROFILE=production (asgi.py and wsgi.py do), while
+# manage.py and runserver leave the tracked db.sqlite3 as it is. 'default'
+# keeps SQLite's own settings.
+SQLITE_PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'busy_timeout': 5000,  # ms
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # KiB
+        'temp_store': 'memory',
+    },
 }
+SQLITE_PROFILE = os.environ.get('LITTLELEMON_SQLITE_PROFILE', 'default')
 
 
 # Password validation
@@ -129,12 +183,12 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'LittlelemonAPI.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '4/minute',
-        'user': '10/minute',
+        'anon': os.environ.get('LITTLELEMON_ANON_THROTTLE_RATE', '4/minute'),
+        'user': os.environ.get('LITTLELEMON_USER_THROTTLE_RATE', '10/minute'),
     },
     'DEFAULT_FILTER_BACKENDS': [
         # 'django_filters.rest_framework.DjangoFilterBackend'
@@ -144,3 +198,61 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 3,
 }
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# LocMemCache is per process; point these at a shared backend (Redis,
+# Memcached) to share entries between workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Bounded LRU of authenticated tokens (see LittlelemonAPI/authentication.py)
+    'tokens': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tokens',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+TOKEN_CACHE_ALIAS = 'tokens'
+
+# Seconds a user's group names stay in the shared cache (see LittlelemonAPI/roles.py)
+ROLE_CACHE_TIMEOUT = 300
+
+# Seconds a rendered menu payload stays cached (see LittlelemonAPI/catalog.py)
+CATALOG_CACHE_TIMEOUT = 3600
+
+# Catalog version shared by the workers on this host (see LittlelemonAPI/catalog.py)
+CATALOG_DATABASE = BASE_DIR / 'catalog.sqlite3'
+
+# Token-bucket throttle state shared by the workers on this host (see LittlelemonAPI/throttling.py)
+THROTTLE_DATABASE = BASE_DIR / 'throttle.sqlite3'
+
+# Route the read-heavy GET endpoints to LittlelemonAPI/async_views.py; the
+# ASGI entry point turns this on. Other methods on those routes run the
+# regular views on a pool of ASYNC_WRITE_WORKERS threads.
+ASYNC_VIEWS = os.environ.get('LITTLELEMON_ASYNC_VIEWS') == '1'
+ASYNC_WRITE_WORKERS = int(os.environ.get('LITTLELEMON_ASYNC_WRITE_WORKERS', 4))
+
+# Per-request SQL/serializer timings, Server-Timing headers and the
+# /api/metrics histograms (see LittlelemonAPI/metrics.py)
+METRICS_ENABLED = os.environ.get('LITTLELEMON_METRICS', '1') == '1'
+METRICS_DATABASE = BASE_DIR / 'metrics.sqlite3'
+METRICS_FLUSH_INTERVAL = 5
+
+# Responses of at least this many bytes are sent brotli- or gzip-encoded
+# to clients that accept it (see LittlelemonAPI/middleware.py)
+COMPRESS_MIN_SIZE = 1024
+
+# Background jobs (see LittlelemonAPI/jobs.py), run by `manage.py run_jobs`:
+# orders placed with "Prefer: respond-async".
+# Seconds a claimed job may run before another worker takes it over, and
+# the first retry delay (doubled on each attempt)
+JOB_LEASE = 300
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 1
+# Days a done job (and its result) is kept
+JOB_RETENTION = 7
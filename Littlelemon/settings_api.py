@@ -0,0 +1,27 @@
+"""
+Settings for API-only nodes: DJANGO_SETTINGS_MODULE=Littlelemon.settings_api.
+
+The same as settings.py without the admin, messages, staticfiles and djoser
+apps, which cost every worker start-up time but serve no API request. Route
+/admin/, /static/ and djoser's user and token endpoints to nodes running the
+full settings (or the web server); the API's own login/ and register/ stay
+available here.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+API_ONLY_EXCLUDED_APPS = ['django.contrib.admin', 'django.contrib.messages', 'django.contrib.staticfiles', 'djoser']
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in API_ONLY_EXCLUDED_APPS]
+
+MIDDLEWARE = [name for name in MIDDLEWARE if name != 'django.contrib.messages.middleware.MessageMiddleware']
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'context_processors': [
+            name for name in TEMPLATES[0]['OPTIONS']['context_processors'] if not name.startswith('django.contrib.messages')
+        ],
+    },
+}]
@@ -1,9 +1,14 @@
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include
 
-urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('api/', include('djoser.urls')), 
-    path('api/', include('djoser.urls.authtoken')), 
-    path('api/', include('LittlelemonAPI.urls')),
-]
\ No newline at end of file
+urlpatterns = []
+# Left out by the API-only settings (settings_api.py)
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+    urlpatterns.append(path('admin/', admin.site.urls))
+if apps.is_installed('djoser'):
+    urlpatterns += [
+        path('api/', include('djoser.urls')),
+        path('api/', include('djoser.urls.authtoken')),
+    ]
+urlpatterns.append(path('api/', include('LittlelemonAPI.urls')))
@@ -2,5 +2,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Littlelemon.settings')
+# WAL and the other SQLite production PRAGMAs (settings.SQLITE_PROFILES)
+os.environ.setdefault('LITTLELEMON_SQLITE_PROFILE', 'production')
 
 application = get_wsgi_application()
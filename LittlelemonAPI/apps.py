@@ -3,3 +3,8 @@ from django.apps import AppConfig
 class LittlelemonapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'LittlelemonAPI'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # Register the job queue's tasks (see jobs.py)
+        from . import checkout  # noqa: F401
@@ -0,0 +1,186 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Paginator
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from . import authentication, catalog, formats, listings, models, roles, serializers
+from .views import cart as cart_views, menu as menu_views, orders as order_views
+from .pagination import KeysetPagination
+from .throttling import UserRateThrottle
+
+# Async versions of the read-heavy endpoints, routed instead of the DRF
+# views when ASYNC_VIEWS is on (the ASGI entry point turns it on). GETs run
+# on the event loop with the async ORM and render JSON; every other method
+# is handed to the regular DRF view on a bounded thread pool, so writes
+# behave exactly as before without queueing behind each other on Django's
+# single sync thread. So are GETs for the MessagePack and CSV formats,
+# which DRF's content negotiation picks.
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'ASYNC_WRITE_WORKERS', 4), thread_name_prefix='littlelemon-sync')
+    return _executor
+
+
+def _run_sync(view, request, args, kwargs):
+    # Pool threads outlive requests, so manage their connections like a worker would
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+async def run_sync_view(view, request, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # In the request's context, so per-request state (metrics, routing) follows
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _get_executor(), functools.partial(context.run, _run_sync, view, request, args, kwargs))
+
+
+def _render(data, status_code=status.HTTP_200_OK, headers=None):
+    return HttpResponse(listings.FastJSONRenderer().render(data), status=status_code,
+                        content_type='application/json', headers=headers)
+
+
+def _error(exc):
+    headers = {}
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        headers['WWW-Authenticate'] = 'Token'
+    if getattr(exc, 'wait', None):
+        headers['Retry-After'] = '%d' % exc.wait
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    return _render(data, exc.status_code, headers)
+
+
+async def _authenticate(request):
+    # Same order as DEFAULT_AUTHENTICATION_CLASSES: token, then session
+    auth = request.headers.get('Authorization', '').split()
+    if auth and auth[0].lower() == 'token':
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        user, token = await authentication.aauthenticate_credentials(auth[1])
+        return user
+    user = getattr(request, 'user', None)
+    # AuthenticationMiddleware's lazy user loads the session synchronously
+    if user is not None and await sync_to_async(lambda: user.is_authenticated)():
+        return user
+    return None
+
+
+def async_api_view(sync_view, authenticated=False, throttles=()):
+    # Async counterpart of @api_view for a view that already exists in views/
+    def decorator(func):
+        @functools.wraps(func)
+        async def view(request, *args, **kwargs):
+            if request.method != 'GET' or formats.requested(request):
+                return await run_sync_view(sync_view, request, *args, **kwargs)
+            try:
+                user = await _authenticate(request)
+                if authenticated and user is None:
+                    raise exceptions.NotAuthenticated()
+                request.user = user or AnonymousUser()
+                for throttle_class in throttles:
+                    throttle = throttle_class()
+                    if not await sync_to_async(throttle.allow_request, thread_sensitive=False)(request, None):
+                        raise exceptions.Throttled(throttle.wait())
+                return await func(request, user, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return _error(exc)
+        view.csrf_exempt = True
+        return view
+    return decorator
+
+
+async def _serialize(serializer_class, queryset):
+    queryset = serializer_class.setup_eager_loading(queryset)
+    return serializer_class([row async for row in queryset], many=True).data
+
+
+async def _serialize_orders(orders):
+    # Keyset pages (model instances); unsummarized orders need their items
+    await sync_to_async(serializers.OrderHistorySerializer.prefetch_missing_items)(orders)
+    return serializers.OrderHistorySerializer(orders, many=True).data
+
+
+async def _list_orders(rows):
+    # listings.orders() of listings.order_rows(), fetched on the event loop
+    return await sync_to_async(listings.orders)([row async for row in rows])
+
+
+@async_api_view(menu_views.all_menu_items)
+async def all_menu_items(request, user):
+    etag, key = catalog.response_keys(JSONRenderer.format, request.build_absolute_uri())
+    headers = {'ETag': etag, 'Vary': 'Accept'}
+    if catalog.etag_matches(request.headers.get('If-None-Match'), etag):
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    data = await cache.aget(key)
+    if data is None:
+        data = listings.menu_items([row async for row in listings.menu_item_rows(models.MenuItem.objects.all())])
+        await cache.aset(key, data, catalog.timeout())
+    return _render(data, headers=headers)
+
+
+@async_api_view(cart_views.view_cart, authenticated=True)
+async def view_cart(request, user):
+    return _render(await _serialize(serializers.CartSerializer, models.Cart.objects.filter(user=user)))
+
+
+@async_api_view(order_views.view_user_orders, authenticated=True)
+async def view_user_orders(request, user):
+    return _render(await _list_orders(listings.order_rows(models.Order.objects.filter(user=user))))
+
+
+@async_api_view(menu_views.category, authenticated=True)
+async def category(request, user):
+    categories = [row async for row in models.Category.objects.all()]
+    return _render(serializers.CategorySerializer(categories, many=True).data)
+
+
+@async_api_view(order_views.order, authenticated=True, throttles=[UserRateThrottle])
+async def order(request, user):
+    user_roles = await roles.aget_roles(user)
+    if roles.MANAGER in user_roles:
+        query = Request(request)
+        orders = order_views.manager_orders(query.query_params)
+        if KeysetPagination.requested(query):
+            paginator = KeysetPagination(order_views.ORDER_KEYSET_FIELDS, page_size=2)
+            rows = paginator.set_page([row async for row in paginator.page_queryset(orders, query)])
+            return _render({
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
+                'results': await _serialize_orders(rows),
+            })
+        paginator = Paginator(listings.order_rows(orders), per_page=query.query_params.get('perpage', default=2))
+        paginator.count = await orders.acount()
+        try:
+            rows = paginator.page(number=query.query_params.get('page', default=1)).object_list
+        except EmptyPage:
+            rows = models.Order.objects.none()
+        return _render(await _list_orders(rows))
+    if roles.DELIVERY_CREW in user_roles:
+        return _render(await _list_orders(listings.order_rows(models.Order.objects.filter(delivery_crew=user))))
+    data = await _list_orders(listings.order_rows(models.Order.objects.filter(user=user)))
+    if not data:
+        return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+    return _render(data)
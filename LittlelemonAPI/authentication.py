@@ -0,0 +1,81 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# Token -> user lookups are served from the TOKEN_CACHE_ALIAS cache: a
+# bounded LRU with a TTL (LocMemCache per process, or a shared backend
+# across workers). Entries are dropped as soon as a token is deleted or
+# rotated, or its user is saved (deactivated, demoted, ...). Entries hold
+# the token's and user's column values minus the password hash, which is
+# left deferred on the rebuilt user so saving it never touches the hash.
+
+
+def _cache():
+    return caches[getattr(settings, 'TOKEN_CACHE_ALIAS', 'default')]
+
+
+def _cache_key(key):
+    # Token keys are credentials, keep them out of the cache's key space
+    return 'littlelemon:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def forget_token(key):
+    _cache().delete(_cache_key(key))
+
+
+def forget_user_tokens(user):
+    keys = [_cache_key(key) for key in Token.objects.filter(user=user).values_list('key', flat=True)]
+    if keys:
+        _cache().delete_many(keys)
+
+
+def _entry(token):
+    user = token.user
+    fields = [field.attname for field in user._meta.concrete_fields if field.attname != 'password']
+    return token.key, token.created, user._state.db, fields, [getattr(user, name) for name in fields]
+
+
+def _token(entry):
+    key, created, db, fields, values = entry
+    user = get_user_model().from_db(db, fields, values)
+    token = Token.from_db(db, ['key', 'user_id', 'created'], [key, user.pk, created])
+    token.user = user
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    # Drop-in replacement for rest_framework's TokenAuthentication
+
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+        entry = _cache().get(cache_key)
+        if entry is None:
+            # Raises AuthenticationFailed for unknown keys and inactive users
+            user, token = super().authenticate_credentials(key)
+            _cache().set(cache_key, _entry(token))
+            return user, token
+        token = _token(entry)
+        return token.user, token
+
+
+async def aauthenticate_credentials(key):
+    # Async counterpart used by async_views: same cache, async ORM on a miss
+    cache_key = _cache_key(key)
+    entry = await _cache().aget(cache_key)
+    if entry is not None:
+        token = _token(entry)
+    else:
+        try:
+            token = await Token.objects.select_related('user').aget(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        await _cache().aset(cache_key, _entry(token))
+    return token.user, token
@@ -0,0 +1,107 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+# Rendered menu payloads are cached under the current catalog version.
+# Any menu item or category write bumps the version, which orphans every
+# cached payload and changes every ETag at once. The payloads live in each
+# worker's own cache, but the version lives in a small SQLite file shared
+# by every worker on the host (like the throttle buckets), so a write in
+# one worker invalidates all of them.
+
+_SCHEMA = '''CREATE TABLE IF NOT EXISTS versions (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID'''
+
+# Seeded from the clock so a lost version file never reuses old payload keys
+_SEED = "INSERT INTO versions (key, version) VALUES ('catalog', ?) ON CONFLICT (key) DO NOTHING"
+
+_BUMP = '''INSERT INTO versions (key, version) VALUES ('catalog', ?)
+ON CONFLICT (key) DO UPDATE SET version = version + 1'''
+
+
+class VersionStore:
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.local = threading.local()
+
+    def connection(self):
+        # One connection per thread and per process (never reused after fork)
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(_SCHEMA)
+            self.local.connection, self.local.pid = connection, os.getpid()
+        return connection
+
+    def get(self):
+        connection = self.connection()
+        row = connection.execute("SELECT version FROM versions WHERE key = 'catalog'").fetchone()
+        if row is None:
+            connection.execute(_SEED, (time.time_ns(),))
+            row = connection.execute("SELECT version FROM versions WHERE key = 'catalog'").fetchone()
+        return row[0]
+
+    def bump(self):
+        self.connection().execute(_BUMP, (time.time_ns(),))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    path = str(getattr(settings, 'CATALOG_DATABASE', settings.BASE_DIR / 'catalog.sqlite3'))
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = VersionStore(path)
+        return _stores[path]
+
+
+def get_version():
+    return get_store().get()
+
+
+def bump_version():
+    get_store().bump()
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or 'W/' + etag in candidates
+
+
+def response_keys(renderer_format, url):
+    # (ETag, cache key) of a catalog response under the current version
+    version = get_version()
+    variant = hashlib.md5(f'{renderer_format}:{url}'.encode()).hexdigest()
+    return f'"{version}-{variant[:16]}"', f'littlelemon:catalog:{version}:{variant}'
+
+
+def cached_response(request, build):
+    # build() returns the response data; it only runs on a cache miss
+    etag, key = response_keys(request.accepted_renderer.format, request.build_absolute_uri())
+    headers = {'ETag': etag, 'Vary': 'Accept'}
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout())
+    return Response(data, headers=headers)
+
+
+def timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600)
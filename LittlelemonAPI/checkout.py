@@ -0,0 +1,74 @@
+from django.contrib.auth.models import User
+from django.db import connections, router, transaction
+from django.db.models import F, Sum
+
+from . import jobs, rollups
+from .models import Cart, MenuItem, Order, OrderItem
+from .serializers import MenuItemSerializer, order_summary
+
+PLACE_ORDER = 'checkout.place_order'
+
+
+def place_order(user):
+    # Turns the user's cart into an order in one transaction and returns it,
+    # or None when the cart is empty.
+    with transaction.atomic():
+        cart_items = Cart.objects.filter(user=user)
+        # A no-op UPDATE locks the cart rows (and takes SQLite's write lock)
+        # before anything is read, so a parallel submit waits here and then
+        # finds the cart already emptied instead of placing it twice.
+        if not cart_items.update(quantity=F('quantity')):
+            return None
+        total = cart_items.aggregate(total=Sum('price'))['total']
+        order_items = [
+            OrderItem(menuitem=cart.menuitem, quantity=cart.quantity,
+                      unit_price=cart.unit_price, price=cart.price)
+            for cart in MenuItemSerializer.setup_eager_loading(cart_items, prefix='menuitem__')
+        ]
+        # The summary is written with the order and never rebuilt: titles
+        # and prices stay as they were at placement time
+        order = Order.objects.create(user=user, total=total, summary=order_summary(order_items))
+        for order_item in order_items:
+            order_item.order = order
+        OrderItem.objects.bulk_create(order_items)
+        cart_items.delete()
+        rollups.order_placed(order, [
+            (item.menuitem_id, item.menuitem.category_id, item.quantity, item.price) for item in order_items])
+    return order
+
+
+@jobs.task(PLACE_ORDER)
+def place_order_job(user_id):
+    # place_order() for a request answered with 202 Accepted
+    order = place_order(User.objects.get(pk=user_id))
+    return {'order_id': order.pk if order is not None else None}
+
+
+def add_to_cart(user, quantities):
+    # Adds {menu_item_id: quantity} to the user's cart in two queries, one
+    # price lookup and one upsert that increments existing lines in place,
+    # so concurrent adds never lose an update. Returns the ids that do not
+    # exist; nothing is written then.
+    prices = dict(MenuItem.objects.filter(pk__in=quantities).values_list('id', 'price'))
+    missing = sorted(set(quantities) - set(prices))
+    if missing or not quantities:
+        return missing
+    connection = connections[router.db_for_write(Cart)]
+    qn = connection.ops.quote_name
+    table = qn(Cart._meta.db_table)
+    quantity, unit_price, price = qn('quantity'), qn('unit_price'), qn('price')
+    rows, params = [], []
+    for menuitem_id, count in quantities.items():
+        rows.append('(%s, %s, %s, %s, %s)')
+        params += [user.pk, menuitem_id, count, prices[menuitem_id], prices[menuitem_id] * count]
+    sql = (
+        f'INSERT INTO {table} ({qn("user_id")}, {qn("menuitem_id")}, {quantity}, {unit_price}, {price}) '
+        f'VALUES {", ".join(rows)} '
+        # Cart.Meta.unique_together
+        f'ON CONFLICT ({qn("menuitem_id")}, {qn("user_id")}) DO UPDATE SET '
+        f'{quantity} = {table}.{quantity} + excluded.{quantity}, '
+        f'{price} = ROUND(({table}.{quantity} + excluded.{quantity}) * {table}.{unit_price}, 2)'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+    return missing
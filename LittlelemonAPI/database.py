@@ -0,0 +1,55 @@
+import re
+import types
+
+import django
+from django.conf import settings
+
+# PRAGMAs from the active SQLITE_PROFILES entry are applied to every new
+# SQLite connection (connection_created, see signals.py). With persistent
+# connections (CONN_MAX_AGE) that happens once per worker thread instead of
+# once per request.
+
+_NAME = re.compile(r'^[a-z_]+$')
+
+# Settings stored in the database file; read-only connections (mode=ro, the
+# replica) cannot change them and inherit whatever the primary set
+_PERSISTENT = {'journal_mode'}
+
+
+def _read_only(connection):
+    return 'mode=ro' in str(connection.settings_dict['NAME'])
+
+
+def get_pragmas():
+    profiles = getattr(settings, 'SQLITE_PROFILES', {})
+    return profiles.get(getattr(settings, 'SQLITE_PROFILE', 'default'), {})
+
+
+def apply_pragmas(connection, pragmas=None):
+    # `connection` is a Django DatabaseWrapper with an open connection
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = get_pragmas() if pragmas is None else pragmas
+    read_only = _read_only(connection)
+    for name, value in pragmas.items():
+        if read_only and name in _PERSISTENT:
+            continue
+        if not _NAME.match(name):
+            raise ValueError(f'Invalid SQLite PRAGMA name: {name!r}')
+        if not isinstance(value, int) and not _NAME.match(str(value)):
+            raise ValueError(f'Invalid value for PRAGMA {name}: {value!r}')
+        # On the raw connection: nothing to log, and never inside a transaction
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def _begin_immediate(self):
+    self.cursor().execute('BEGIN IMMEDIATE')
+
+
+def begin_immediate(connection):
+    # Django < 5.1 has no 'transaction_mode' option (see DATABASES) and
+    # starts every transaction with a deferred BEGIN; start the writable
+    # connections' transactions with BEGIN IMMEDIATE there as well
+    if connection.vendor != 'sqlite' or django.VERSION >= (5, 1) or _read_only(connection):
+        return
+    connection._start_transaction_under_autocommit = types.MethodType(_begin_immediate, connection)
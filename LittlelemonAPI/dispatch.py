@@ -0,0 +1,70 @@
+import heapq
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import connections, router, transaction
+from django.db.models import Case, Count, F, IntegerField, When
+
+from . import roles
+from .models import Order
+
+# Hands unassigned open orders to the delivery crew member with the fewest
+# open orders, oldest order first. A cycle is one transaction: three reads
+# (crew, open load per crew, unassigned orders), a min-heap of (load, crew
+# id) in memory and one UPDATE per batch of orders that fits the
+# backend's query parameter limit. Overlapping cycles (the --interval loop
+# and a manual run) wait for each other instead of planning from the same
+# loads.
+
+
+def crew_loads():
+    # {crew member id: open orders}, from order_crew_status_idx
+    crew = User.objects.filter(groups__name=roles.DELIVERY_CREW, is_active=True).values_list('pk', flat=True)
+    loads = dict.fromkeys(crew, 0)
+    open_orders = (Order.objects.filter(delivery_crew__in=list(loads), status=False)
+                   .values_list('delivery_crew').annotate(open=Count('pk')).order_by())
+    loads.update(open_orders)
+    return loads
+
+
+def plan(order_ids, loads):
+    # {crew member id: [order ids]}; ties go to the lowest crew id
+    heap = [(load, crew_id) for crew_id, load in loads.items()]
+    heapq.heapify(heap)
+    assignments = defaultdict(list)
+    for order_id in order_ids:
+        load, crew_id = heap[0]
+        assignments[crew_id].append(order_id)
+        heapq.heapreplace(heap, (load + 1, crew_id))
+    return assignments
+
+
+def dispatch(limit=None):
+    # Runs one cycle and returns {crew member id: [order ids]}
+    with transaction.atomic(using=router.db_for_write(Order)):
+        loads = crew_loads()
+        if not loads:
+            return {}
+        unassigned = Order.objects.filter(delivery_crew__isnull=True, status=False).order_by('pk')
+        order_ids = list(unassigned.values_list('pk', flat=True)[:limit])
+        if not order_ids:
+            return {}
+        assignments = plan(order_ids, loads)
+        crew_of = {order_id: crew_id for crew_id, ids in assignments.items() for order_id in ids}
+        # Two parameters per order at most: its id and its crew member's
+        connection = connections[router.db_for_write(Order)]
+        batch_size = max(1, connection.ops.bulk_batch_size(['pk', 'delivery_crew'], order_ids))
+        for start in range(0, len(order_ids), batch_size):
+            batch = order_ids[start:start + batch_size]
+            by_crew = defaultdict(list)
+            for order_id in batch:
+                by_crew[crew_of[order_id]].append(order_id)
+            # Primary keys only grow, so the pk range holds exactly the
+            # planned orders; one a manager assigned meanwhile no longer
+            # matches the filter and keeps its crew member.
+            unassigned.filter(pk__range=(batch[0], batch[-1])).update(delivery_crew=Case(
+                *[When(pk__in=ids, then=crew_id) for crew_id, ids in by_crew.items()],
+                default=F('delivery_crew'),
+                output_field=IntegerField(),
+            ))
+    return dict(assignments)
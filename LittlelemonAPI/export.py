@@ -0,0 +1,118 @@
+import csv
+import itertools
+
+import django
+from asgiref.sync import sync_to_async
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import Order, OrderItem
+
+# Orders are read with a chunked server-side iterator (items prefetched per
+# chunk) and written out row by row, so memory stays flat however many
+# orders are exported.
+CHUNK_SIZE = 2000
+
+CSV_HEADER = [
+    'order_id', 'user_id', 'delivery_crew_id', 'status', 'total', 'date',
+    'menuitem_id', 'menuitem_title', 'quantity', 'unit_price', 'price',
+]
+
+
+def export_queryset(date_from=None, date_to=None):
+    orders = Order.objects.only('id', 'user_id', 'delivery_crew_id', 'status', 'total', 'date')
+    if date_from:
+        orders = orders.filter(date__gte=date_from)
+    if date_to:
+        orders = orders.filter(date__lte=date_to)
+    items = OrderItem.objects.select_related('menuitem').only(
+        'order_id', 'menuitem_id', 'menuitem__title', 'quantity', 'unit_price', 'price')
+    return orders.order_by('date', 'id').prefetch_related(Prefetch('items', queryset=items.order_by('id')))
+
+
+def _orders(queryset):
+    return queryset.iterator(chunk_size=CHUNK_SIZE)
+
+
+async def _aorders(queryset):
+    # Under ASGI: a sync iterator would be collected into a list by
+    # StreamingHttpResponse before the first byte is sent
+    if django.VERSION >= (5, 0):
+        async for order in queryset.aiterator(chunk_size=CHUNK_SIZE):
+            yield order
+        return
+    # Older aiterator() refuses prefetch_related(): pull the sync iterator
+    # a chunk at a time on the thread that owns its cursor
+    orders = _orders(queryset)
+    next_chunk = sync_to_async(lambda: list(itertools.islice(orders, CHUNK_SIZE)))
+    while chunk := await next_chunk():
+        for order in chunk:
+            yield order
+
+
+def _ndjson_line(encoder, order):
+    return encoder.encode({
+        'id': order.id,
+        'user_id': order.user_id,
+        'delivery_crew': order.delivery_crew_id,
+        'status': order.status,
+        'total': order.total,
+        'date': order.date,
+        'items': [{
+            'menuitem_id': item.menuitem_id,
+            'title': item.menuitem.title,
+            'quantity': item.quantity,
+            'unit_price': item.unit_price,
+            'price': item.price,
+        } for item in order.items.all()],
+    }) + '\n'
+
+
+def ndjson_rows(queryset):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for order in _orders(queryset):
+        yield _ndjson_line(encoder, order)
+
+
+async def andjson_rows(queryset):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    async for order in _aorders(queryset):
+        yield _ndjson_line(encoder, order)
+
+
+class _Echo:
+    # csv.writer target that hands each formatted line back to the caller
+    def write(self, value):
+        return value
+
+
+def _csv_lines(writer, order):
+    head = [order.id, order.user_id, order.delivery_crew_id, order.status, order.total, order.date.isoformat()]
+    items = order.items.all()
+    if not items:
+        return [writer.writerow(head + [''] * 5)]
+    return [writer.writerow(head + [item.menuitem_id, item.menuitem.title, item.quantity, item.unit_price, item.price])
+            for item in items]
+
+
+def csv_rows(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for order in _orders(queryset):
+        yield ''.join(_csv_lines(writer, order))
+
+
+async def acsv_rows(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    async for order in _aorders(queryset):
+        yield ''.join(_csv_lines(writer, order))
+
+
+def rows(fmt, queryset, asynchronous=False):
+    # The stream for `fmt` ('csv' or 'ndjson'), as an async generator when
+    # served by the ASGI handler
+    if fmt == 'csv':
+        return acsv_rows(queryset) if asynchronous else csv_rows(queryset)
+    return andjson_rows(queryset) if asynchronous else ndjson_rows(queryset)
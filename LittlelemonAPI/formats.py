@@ -0,0 +1,109 @@
+import csv
+import io
+import json
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+from . import listings
+
+try:
+    import msgpack
+except ImportError:  # in the Pipfile; MessagePack is only offered when it is installed
+    msgpack = None
+
+# Compact alternatives to JSON for the POS tablets and kitchen screens,
+# chosen by content negotiation (Accept: application/msgpack or text/csv,
+# or ?format=msgpack / ?format=csv) on the listing endpoints. Both render
+# the same data the JSON renderer gets; responses are compressed by
+# middleware.compression_middleware.
+
+_default = encoders.JSONEncoder().default
+_loads = listings.orjson.loads if listings.orjson is not None else json.loads
+
+
+def _plain(obj):
+    # Values msgpack and csv cannot take as is
+    if isinstance(obj, listings.RawJSON):
+        return _loads(obj.text)
+    return _default(obj)
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_plain)
+
+
+def _flatten(value, prefix, row):
+    # Nested objects become dotted columns (category.title)
+    for key, item in value.items():
+        if isinstance(item, dict):
+            _flatten(item, f'{prefix}{key}.', row)
+        else:
+            row[f'{prefix}{key}'] = item
+    return row
+
+
+def csv_records(data):
+    # One record per object, or per element of its first list of objects
+    # (order items) with the object's own columns repeated; an empty list
+    # still gives the object one record
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        data = data['results']
+    for obj in data if isinstance(data, list) else [data]:
+        if isinstance(obj, dict):
+            obj = {key: _plain(value) if isinstance(value, listings.RawJSON) else value for key, value in obj.items()}
+        row = _flatten(obj, '', {}) if isinstance(obj, dict) else {'value': obj}
+        nested = next((key for key, value in row.items()
+                       if isinstance(value, list) and all(isinstance(item, dict) for item in value)), None)
+        if nested is None:
+            yield row
+            continue
+        lines = row.pop(nested)
+        if not lines:
+            yield row
+        for line in lines:
+            yield {**row, **_flatten(line, f'{nested}.', {})}
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        records = list(csv_records(data))
+        header = list(dict.fromkeys(key for record in records for key in record))
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(header)
+        writer.writerows([
+            json.dumps(value, default=_plain) if isinstance(value, list) else value
+            for value in map(record.get, header)
+        ] for record in records)
+        return output.getvalue().encode(self.charset)
+
+
+_ALTERNATES = [CSVRenderer] + ([MessagePackRenderer] if msgpack is not None else [])
+
+# renderer_classes of the listing endpoints: JSON first (the default), the
+# browsable API for browsers, then the compact formats
+RENDERERS = [listings.FastJSONRenderer, renderers.BrowsableAPIRenderer, *_ALTERNATES]
+
+
+def requested(request):
+    # The compact format a (Django) request asks for, if any
+    fmt = request.GET.get('format')
+    if fmt:
+        return next((renderer.format for renderer in _ALTERNATES if renderer.format == fmt), None)
+    accept = request.headers.get('Accept', '')
+    return next((renderer.format for renderer in _ALTERNATES if renderer.media_type in accept), None)
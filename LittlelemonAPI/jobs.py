@@ -0,0 +1,139 @@
+import datetime
+import logging
+import random
+import threading
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+# A durable job queue in the main database, no broker needed. enqueue()
+# inserts a row (in the caller's transaction, so the job exists exactly
+# when the change that needs it commits) and `manage.py run_jobs` threads
+# claim due rows with a conditional UPDATE, run the task and mark the row
+# done in one transaction. A job whose lease has expired, or that has been
+# deleted, is never marked done twice, so database work in a task happens
+# once. Failures are retried with exponential backoff and jitter until
+# max_attempts, then left as failed; so is a job whose worker died on its
+# last attempt. Done jobs are deleted after JOB_RETENTION days (purge()).
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(name):
+    # Registers the decorated function as the handler of jobs called `name`
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, user=None, delay=0):
+    if name not in TASKS:
+        raise KeyError(f'Unknown task {name!r}')
+    return Job.objects.create(
+        name=name, payload=payload or {}, user=user,
+        max_attempts=getattr(settings, 'JOB_MAX_ATTEMPTS', 5),
+        run_after=timezone.now() + datetime.timedelta(seconds=delay),
+    )
+
+
+def backoff(attempts):
+    # Seconds before retry number `attempts`: 1, 2, 4, ... capped, +-10%
+    delay = min(getattr(settings, 'JOB_RETRY_BACKOFF', 1) * 2 ** (attempts - 1), 300)
+    return delay * random.uniform(0.9, 1.1)
+
+
+def claim():
+    # The oldest due job, now running under this caller's lease, or None
+    lease = datetime.timedelta(seconds=getattr(settings, 'JOB_LEASE', 300))
+    while True:
+        now = timezone.now()
+        job = (Job.objects.filter(Q(status=Job.QUEUED, run_after__lte=now)
+                                  | Q(status=Job.RUNNING, locked_until__lt=now))
+               .order_by('run_after', 'pk').first())
+        if job is None:
+            return None
+        if job.status == Job.RUNNING and job.attempts >= job.max_attempts:
+            # Its worker died (or hung) on the last attempt
+            if Job.objects.filter(pk=job.pk, status=Job.RUNNING, attempts=job.attempts).update(
+                    status=Job.FAILED, finished=now, error='Lease expired on the last attempt'):
+                logger.error('Job %s (%s) failed: lease expired on attempt %s', job.pk, job.name, job.attempts)
+            continue
+        # Another worker may have claimed it since the SELECT
+        claimed = Job.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts).update(
+            status=Job.RUNNING, attempts=F('attempts') + 1, locked_until=now + lease)
+        if claimed:
+            job.status, job.attempts, job.locked_until = Job.RUNNING, job.attempts + 1, now + lease
+            return job
+
+
+def run(job):
+    # Runs a claimed job; returns its final or next status
+    mine = Job.objects.filter(pk=job.pk, status=Job.RUNNING, attempts=job.attempts)
+    try:
+        with transaction.atomic():
+            if not mine.update(status=Job.DONE, finished=timezone.now(), error=''):
+                return None
+            result = TASKS[job.name](**job.payload)
+            if result is not None:
+                Job.objects.filter(pk=job.pk).update(result=result)
+        return Job.DONE
+    except Exception as exc:
+        error = f'{type(exc).__name__}: {exc}'
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.name, job.attempts)
+        if job.attempts >= job.max_attempts:
+            mine.update(status=Job.FAILED, finished=timezone.now(), error=error)
+            return Job.FAILED
+        mine.update(status=Job.QUEUED, error=error, locked_until=None,
+                    run_after=timezone.now() + datetime.timedelta(seconds=backoff(job.attempts)))
+        return Job.QUEUED
+
+
+def purge(now=None):
+    # Deletes jobs done more than JOB_RETENTION days ago; returns how many.
+    # Failed jobs stay for inspection.
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=getattr(settings, 'JOB_RETENTION', 7))
+    return Job.objects.filter(status=Job.DONE, finished__lt=cutoff).delete()[0]
+
+
+def run_pending():
+    # Runs due jobs in this thread until none is left; returns how many ran
+    count = 0
+    while (job := claim()) is not None:
+        run(job)
+        count += 1
+    return count
+
+
+def work(stop, poll_interval=1.0):
+    # Worker thread loop, until `stop` (a threading.Event) is set
+    try:
+        while not stop.is_set():
+            try:
+                job = claim()
+                if job is not None:
+                    run(job)
+                    continue
+            except DatabaseError:
+                # e.g. the database stayed locked; an unfinished job is
+                # claimed again when its lease runs out
+                logger.exception('Job worker database error')
+            close_old_connections()
+            stop.wait(poll_interval)
+    finally:
+        close_old_connections()
+
+
+def start_workers(count, poll_interval=1.0):
+    stop = threading.Event()
+    threads = [threading.Thread(target=work, args=(stop, poll_interval), name=f'job-worker-{index}', daemon=True)
+               for index in range(count)]
+    for thread in threads:
+        thread.start()
+    return stop, threads
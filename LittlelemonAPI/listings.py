@@ -0,0 +1,163 @@
+import itertools
+import json
+
+from django.db.models import FloatField, TextField
+from django.db.models.functions import Cast
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+from . import metrics
+from .models import MenuItem, Order, OrderItem
+
+try:
+    import orjson
+except ImportError:  # in the Pipfile; the stdlib encoder is used without it
+    orjson = None
+
+# Read-only fast path for the large listings (all menu items, order
+# history): rows come from .values_list() tuples and are mapped to the
+# exact JSON the serializers produce, with the Decimal and date formatting
+# decided once per field instead of once per value through DRF field
+# objects. Order summaries are not parsed at all: they are stored in the
+# rendered form (models.CompactJSONEncoder) and copied into the response
+# as RawJSON. FastJSONRenderer encodes with orjson when it is installed.
+# Writes and single objects keep using the serializers.
+
+
+def decimal_to_string(model, name):
+    # DRF DecimalField output (fixed decimal places, as a string) from the
+    # value read as a float: exact for these max_digits, and far cheaper
+    # than building a Decimal per value
+    template = '{:.%df}' % model._meta.get_field(name).decimal_places
+    return lambda value: None if value is None else template.format(value)
+
+
+def _float(name):
+    return Cast(name, FloatField())
+
+
+_price = decimal_to_string(MenuItem, 'price')
+_item_prices = [decimal_to_string(OrderItem, name) for name in ('unit_price', 'price')]
+_total = decimal_to_string(Order, 'total')
+
+MENU_ITEM_FIELDS = ('id', 'title', 'price', 'featured', 'category_id', 'category__slug', 'category__title')
+
+
+def _menu_item(row):
+    menuitem_id, title, price, featured, category_id, category_slug, category_title = row
+    return {
+        'id': menuitem_id,
+        'title': title,
+        'price': _price(price),
+        'featured': featured,
+        'category': {'id': category_id, 'slug': category_slug, 'title': category_title},
+    }
+
+
+def _menu_item_values(prefix=''):
+    return [prefix + field if field != 'price' else _float(prefix + field) for field in MENU_ITEM_FIELDS]
+
+
+def menu_item_rows(queryset):
+    return queryset.values_list(*_menu_item_values())
+
+
+@metrics.serializer_timed
+def menu_items(rows):
+    # MenuItemSerializer(queryset, many=True).data from menu_item_rows()
+    return [_menu_item(row) for row in rows]
+
+
+class RawJSON:
+    # Already encoded JSON, copied into FastJSONRenderer output as is
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __eq__(self, other):
+        return isinstance(other, RawJSON) and self.text == other.text
+
+    def __repr__(self):
+        return f'RawJSON({self.text!r})'
+
+
+def order_rows(queryset):
+    # Lazy, so it can be paginated; ISO dates as stored, summaries unparsed
+    return queryset.values_list(
+        'id', 'delivery_crew_id', 'status', _float('total'), Cast('date', TextField()), Cast('summary', TextField()))
+
+
+@metrics.serializer_timed
+def orders(rows):
+    # OrderHistorySerializer(queryset, many=True).data from order_rows();
+    # orders without a summary get their items in one extra query
+    rows = list(rows)
+    missing = [row[0] for row in rows if row[5] is None]
+    items = {order_id: [] for order_id in missing}
+    if missing:
+        unit_price, price = _item_prices
+        for order_id, quantity, unit, line, *menu_item in OrderItem.objects.filter(order_id__in=missing).values_list(
+                'order_id', 'quantity', _float('unit_price'), _float('price'), *_menu_item_values('menuitem__')):
+            items[order_id].append({
+                'menuitem': _menu_item(menu_item),
+                'quantity': quantity,
+                'unit_price': unit_price(unit),
+                'price': price(line),
+            })
+    return [{
+        'id': order_id,
+        'delivery_crew': delivery_crew,
+        'status': status,
+        'total': _total(total),
+        'date': date,
+        'items': RawJSON(summary) if summary is not None else items[order_id],
+    } for order_id, delivery_crew, status, total, date, summary in rows]
+
+
+class JSONEncoder(encoders.JSONEncoder):
+    # DRF's encoder, plus RawJSON (parsed; for the stdlib fallback)
+    def default(self, obj):
+        if isinstance(obj, RawJSON):
+            return json.loads(obj.text)
+        return super().default(obj)
+
+
+_default = encoders.JSONEncoder().default
+
+# Stands in for each RawJSON while orjson encodes, then is replaced by its text
+_PLACEHOLDER = '\x00raw\x00'
+_ENCODED_PLACEHOLDER = b'"\\u0000raw\\u0000"'
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    # Same bytes as JSONRenderer (compact, UTF-8, U+2028/9 escaped); falls
+    # back to it for indented output or without orjson
+    encoder_class = JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        raw = []
+
+        def default(obj):
+            if isinstance(obj, RawJSON):
+                raw.append(obj.text.encode())
+                return _PLACEHOLDER
+            return _default(obj)
+
+        content = orjson.dumps(data, default=default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+        if raw:
+            parts = content.split(_ENCODED_PLACEHOLDER)
+            if len(parts) != len(raw) + 1:
+                # The placeholder is in the data itself
+                return super().render(data, accepted_media_type, renderer_context)
+            content = b''.join(itertools.chain.from_iterable(zip(parts, raw))) + parts[-1]
+        if b'\xe2\x80' in content:
+            content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return content
+
+
+# renderer_classes of the views that return listings: the browsable API
+# stays available to browsers
+RENDERERS = [FastJSONRenderer, renderers.BrowsableAPIRenderer]
@@ -0,0 +1,222 @@
+# Shared helpers for the bench_* management commands.
+import asyncio
+import contextlib
+import itertools
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.db import connection, connections
+
+
+@contextlib.contextmanager
+def scratch_database(path=None):
+    # Runs against a throwaway, fully migrated SQLite file so benchmarks never
+    # touch db.sqlite3. A file (not :memory:) keeps disk costs in the numbers.
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    tmpdir = None
+    if path is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmpdir.name, 'bench.sqlite3')
+    test_settings['NAME'] = str(path)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    # Read-only mirrors (the replica) follow it to the scratch file
+    mirrors = {}
+    for alias in connections:
+        if connections[alias].settings_dict.get('TEST', {}).get('MIRROR') == connection.alias:
+            connections[alias].close()
+            mirrors[alias] = connections[alias].settings_dict['NAME']
+            connections[alias].settings_dict['NAME'] = Path(path).resolve().as_uri() + '?mode=ro'
+    try:
+        yield path
+    finally:
+        for alias, name in mirrors.items():
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = name
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+def measure(func, repeat, setup=None):
+    # Returns the wall time of each call in milliseconds; setup() is untimed
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'min_ms': round(min(samples), 3),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def server(command, port, env=None, timeout=30):
+    # Starts an HTTP server process and waits until it accepts connections
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen(command, env={**os.environ, **(env or {})},
+                               stdout=subprocess.DEVNULL, stderr=log)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                log.seek(0)
+                raise RuntimeError(f'{" ".join(command)} exited: {log.read().decode()[-2000:]}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f'{" ".join(command)} did not start within {timeout}s')
+                time.sleep(0.1)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        log.close()
+
+
+def python_command(*args):
+    return [sys.executable, '-m', *args]
+
+
+# name -> (module, async views on)
+SERVERS = {'wsgi': ('gunicorn', '0'), 'asgi': ('uvicorn', '1')}
+
+
+def server_command(name, port, workers, threads):
+    # gunicorn (gthread) serving the WSGI app, or uvicorn serving the ASGI app
+    if name == 'wsgi':
+        return python_command(
+            'gunicorn', 'Littlelemon.wsgi:application', '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers), '--worker-class', 'gthread', '--threads', str(threads),
+            '--log-level', 'warning')
+    return python_command(
+        'uvicorn', 'Littlelemon.asgi:application', '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(workers), '--no-access-log', '--log-level', 'warning')
+
+
+def server_env(name, path):
+    return {'LITTLELEMON_DB_PATH': str(path), 'LITTLELEMON_ASYNC_VIEWS': SERVERS[name][1]}
+
+
+async def _read_response(reader):
+    # Minimal HTTP/1.1 response reader: (status, keep-alive, body)
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            chunks.append((await reader.readexactly(size + 2))[:size])
+            if not size:
+                break
+        body = b''.join(chunks)
+    elif status in (204, 304):
+        body = b''
+    else:
+        return status, False, await reader.read()
+    return status, headers.get('connection', '').lower() != 'close', body
+
+
+class HTTPClient:
+    # One keep-alive connection to a local server, reopened when the server
+    # closes it. Errors are reported as the status 'error'.
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=None):
+        lines = [f'{method} {path} HTTP/1.1', 'Host: 127.0.0.1']
+        lines += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        if body is not None:
+            lines.append(f'Content-Length: {len(body)}')
+        payload = ('\r\n'.join(lines) + '\r\n\r\n').encode() + (body or b'')
+        try:
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+            self.writer.write(payload)
+            status, keep_alive, content = await _read_response(self.reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            status, keep_alive, content = 'error', False, b''
+        if not keep_alive:
+            self.close()
+        return status, content
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def _load(port, requests, concurrency, duration):
+    # `requests` is a list of (path, headers) cycled through by every client
+    latencies, statuses, stop = [], {}, time.monotonic() + duration
+
+    async def client(offset):
+        http = HTTPClient(port)
+        for index in itertools.count(offset):
+            if time.monotonic() >= stop:
+                break
+            path, headers = requests[index % len(requests)]
+            start = time.perf_counter()
+            status, content = await http.request('GET', path, headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+        http.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def run_load(port, requests, concurrency, duration):
+    # Closed-loop load: `concurrency` keep-alive clients for `duration` seconds
+    latencies, statuses, elapsed = asyncio.run(_load(port, requests, concurrency, duration))
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99), 2) if latencies else None,
+        'statuses': statuses,
+    }
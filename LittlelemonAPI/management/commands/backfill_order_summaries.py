@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+
+from LittlelemonAPI.models import Order, OrderItem
+from LittlelemonAPI.serializers import OrderItemSerializer, order_summary
+
+
+class Command(BaseCommand):
+    help = 'Writes Order.summary for orders placed before summaries existed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        items = OrderItemSerializer.setup_eager_loading(OrderItem.objects.all())
+        pending = Order.objects.filter(summary__isnull=True).order_by('pk')
+        done, last = 0, 0
+        while True:
+            # Keyed on pk, so each batch is one indexed range scan and the
+            # command can be stopped and rerun at any point
+            batch = list(pending.filter(pk__gt=last).prefetch_related(
+                Prefetch('items', queryset=items))[:options['batch_size']])
+            if not batch:
+                break
+            for order in batch:
+                order.summary = order_summary(order.items.all())
+            with transaction.atomic():
+                Order.objects.bulk_update(batch, ['summary'])
+            done += len(batch)
+            last = batch[-1].pk
+        self.stdout.write(f'Backfilled {done} order summaries.')
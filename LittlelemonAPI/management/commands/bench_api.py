@@ -0,0 +1,326 @@
+import asyncio
+import datetime
+import importlib.util
+import itertools
+import json
+import random
+import subprocess
+import time
+from collections import defaultdict
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from LittlelemonAPI import roles, throttling
+from LittlelemonAPI.models import Category, MenuItem, Order, OrderItem
+
+from ._bench import SERVERS, HTTPClient, free_port, percentile, scratch_database, server, server_command, server_env
+
+PASSWORD = 'bench-password'
+
+
+# The end-to-end flows from notes.txt. Each scenario is run by one actor of
+# its role and yields (endpoint, method, path, JSON body) steps; the
+# endpoint is the label results are grouped under.
+
+def browse(ctx):
+    yield 'GET category', 'GET', '/api/category', None
+    yield 'GET all-menu-items', 'GET', '/api/all-menu-items', None
+    yield 'GET menu-items?category', 'GET', f'/api/menu-items?category={ctx.choice(ctx.categories)}', None
+    yield 'GET menu-items?page', 'GET', f'/api/menu-items?page={ctx.rng.randint(1, 20)}&perpage=5', None
+    ordering = ctx.choice(['price', '-price'])
+    yield 'GET menu-items?ordering', 'GET', f'/api/menu-items?ordering={ordering}', None
+
+
+def shop(ctx):
+    entries = [{'menu_item_id': ctx.choice(ctx.items), 'quantity': ctx.rng.randint(1, 3)}
+               for _ in range(ctx.rng.randint(1, 3))]
+    if ctx.rng.random() < 0.5:
+        yield 'POST add-to-cart/batch', 'POST', '/api/add-to-cart/batch/', entries
+    else:
+        for entry in entries:
+            yield 'POST add-to-cart', 'POST', '/api/add-to-cart/', entry
+    yield 'GET view-cart', 'GET', '/api/view-cart/', None
+    yield 'POST place-order', 'POST', '/api/place-order/', None
+    yield 'GET user-orders', 'GET', '/api/user-orders/', None
+
+
+def order_history(ctx):
+    yield 'GET user-orders', 'GET', '/api/user-orders/', None
+
+
+def login(ctx):
+    body = {'username': ctx.choice(ctx.customers), 'password': PASSWORD}
+    yield 'POST login', 'POST', '/api/login/', body
+
+
+def register(ctx):
+    name = f'{ctx.prefix}-{next(ctx.counter)}'
+    body = {'username': name, 'email': f'{name}@example.com', 'password': PASSWORD}
+    yield 'POST register', 'POST', '/api/register/', body
+
+
+def deliver(ctx):
+    yield 'GET orders (crew)', 'GET', '/api/orders', None
+    yield 'PATCH update-status', 'PATCH', f'/api/orders/{ctx.choice(ctx.orders)}/update-status/', {'is_delivered': True}
+
+
+def manage_orders(ctx):
+    yield 'GET orders?page (manager)', 'GET', f'/api/orders?page={ctx.rng.randint(1, 50)}&perpage=10', None
+    yield 'GET orders?cursor (manager)', 'GET', '/api/orders?ordering=-date&cursor=&perpage=10', None
+    body = {'delivery_crew_id': ctx.choice(ctx.crew)}
+    yield 'PATCH assign-delivery', 'PATCH', f'/api/orders/{ctx.choice(ctx.orders)}/assign-delivery/', body
+
+
+def administer(ctx):
+    yield 'GET groups/manager/users', 'GET', '/api/groups/manager/users', None
+    yield 'PATCH feature', 'PATCH', f'/api/menu-items/{ctx.choice(ctx.items)}/feature/', None
+    yield 'PATCH assign-to-delivery-crew', 'PATCH', f'/api/assign-to-delivery-crew/{ctx.choice(ctx.crew)}/', None
+
+
+def extend_catalog(ctx):
+    name = f'{ctx.prefix}-{next(ctx.counter)}'
+    yield 'POST category', 'POST', '/api/category', {'slug': name, 'title': name}
+    body = {'title': name, 'price': '9.99', 'featured': False, 'category_id': ctx.choice(ctx.categories)}
+    yield 'POST menu-items', 'POST', '/api/menu-items', body
+
+
+# (scenario, role, weight)
+SCENARIOS = [
+    (browse, 'customer', 35),
+    (shop, 'customer', 20),
+    (order_history, 'customer', 10),
+    (login, 'customer', 5),
+    (register, None, 2),
+    (deliver, 'crew', 12),
+    (manage_orders, 'manager', 10),
+    (administer, 'admin', 4),
+    (extend_catalog, 'admin', 2),
+]
+
+
+class Context:
+    # Ids and credentials of the seeded dataset, shared by the virtual users
+
+    def __init__(self, rng, prefix):
+        self.rng = rng
+        self.prefix = prefix
+        self.counter = itertools.count()
+        self.categories = list(Category.objects.values_list('id', flat=True))
+        self.items = list(MenuItem.objects.values_list('id', flat=True))
+        self.orders = list(Order.objects.values_list('id', flat=True))
+        self.customers = list(User.objects.filter(username__startswith='customer').values_list('username', flat=True))
+        self.crew = list(User.objects.filter(groups__name=roles.DELIVERY_CREW).values_list('id', flat=True))
+        self.tokens = defaultdict(list)
+        for key, username in Token.objects.values_list('key', 'user__username'):
+            self.tokens[username.rstrip('0123456789')].append(key)
+
+    def choice(self, values):
+        return self.rng.choice(values)
+
+    def pick(self):
+        scenario, role, weight = self.rng.choices(SCENARIOS, weights=[weight for *_, weight in SCENARIOS])[0]
+        headers = {'Accept': 'application/json', 'Content-Type': 'application/json'}
+        if role is not None:
+            headers['Authorization'] = f'Token {self.choice(self.tokens[role])}'
+        return scenario, headers
+
+
+def seed(options, rng):
+    password = make_password(PASSWORD)
+    managers = Group.objects.create(name=roles.MANAGER)
+    crews = Group.objects.create(name=roles.DELIVERY_CREW)
+    categories = Category.objects.bulk_create(
+        Category(slug=f'category-{i}', title=f'Category {i}') for i in range(options['categories']))
+    items = MenuItem.objects.bulk_create(
+        MenuItem(title=f'Dish {i}', price=rng.randint(300, 3000) / 100, category=rng.choice(categories))
+        for i in range(options['items']))
+    users = User.objects.bulk_create(
+        [User(username='admin0', password=password, is_staff=True)]
+        + [User(username=f'manager{i}', password=password) for i in range(options['managers'])]
+        + [User(username=f'crew{i}', password=password) for i in range(options['crew'])]
+        + [User(username=f'customer{i}', password=password) for i in range(options['customers'])])
+    Token.objects.bulk_create(Token(user=user, key=Token.generate_key()) for user in users)
+    managers.user_set.add(*[user for user in users if user.username.startswith(('admin', 'manager'))])
+    crew = [user for user in users if user.username.startswith('crew')]
+    crews.user_set.add(*crew)
+    customers = [user for user in users if user.username.startswith('customer')]
+    today = datetime.date.today()
+    orders = Order.objects.bulk_create(
+        Order(user=customer, delivery_crew=rng.choice(crew + [None]), status=rng.random() < 0.7, total=0,
+              date=today - datetime.timedelta(days=rng.randint(0, 365)))
+        for customer in customers for _ in range(options['orders_per_customer']))
+    lines = []
+    for order in orders:
+        for item in rng.sample(items, 3):
+            quantity = rng.randint(1, 3)
+            lines.append(OrderItem(order=order, menuitem=item, quantity=quantity,
+                                   unit_price=item.price, price=item.price * quantity))
+            order.total += item.price * quantity
+    OrderItem.objects.bulk_create(lines, batch_size=5000)
+    Order.objects.bulk_update(orders, ['total'], batch_size=5000)
+
+
+def count_queries(ctx, rounds):
+    # SQL per request does not depend on load: replay every scenario in
+    # process through the test client, once to warm the caches, then measured
+    client = Client(HTTP_HOST='localhost')
+    queries = defaultdict(list)
+    rates = dict.fromkeys(throttling.UserRateThrottle.THROTTLE_RATES)
+    with mock.patch.dict(throttling.UserRateThrottle.THROTTLE_RATES, rates):
+        for measured in (False, True):
+            for _ in range(rounds):
+                for scenario, role, weight in SCENARIOS:
+                    headers = {}
+                    if role is not None:
+                        headers['HTTP_AUTHORIZATION'] = f'Token {ctx.tokens[role][0]}'
+                    for endpoint, method, path, body in scenario(ctx):
+                        contexts = [CaptureQueriesContext(connections[alias]) for alias in connections]
+                        for context in contexts:
+                            context.__enter__()
+                        try:
+                            client.generic(method, path, json.dumps(body) if body is not None else '',
+                                           content_type='application/json', **headers)
+                        finally:
+                            for context in contexts:
+                                context.__exit__(None, None, None)
+                        if measured:
+                            queries[endpoint].append(sum(len(context) for context in contexts))
+    return {endpoint: round(sum(counts) / len(counts), 1) for endpoint, counts in queries.items()}
+
+
+async def replay(ctx, port, concurrency, duration):
+    # Closed loop: every virtual user runs whole scenarios back to back
+    samples = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    stop = time.monotonic() + duration
+
+    async def virtual_user():
+        http = HTTPClient(port)
+        while time.monotonic() < stop:
+            scenario, headers = ctx.pick()
+            for endpoint, method, path, body in scenario(ctx):
+                start = time.perf_counter()
+                status, content = await http.request(
+                    method, path, headers, json.dumps(body).encode() if body is not None else None)
+                samples[endpoint].append((time.perf_counter() - start) * 1000)
+                statuses[endpoint][status] += 1
+        http.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+    return samples, statuses, time.perf_counter() - started
+
+
+def summary(latencies, elapsed):
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Seeds a scratch database, serves it locally and replays the notes.txt flows with weighted '
+            'scenarios. Reports throughput, p50/p95/p99 and SQL queries per endpoint.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50])
+        parser.add_argument('--duration', type=float, default=15, help='seconds per run')
+        parser.add_argument('--server', choices=sorted(SERVERS), default='wsgi')
+        parser.add_argument('--workers', type=int, default=2, help='server processes')
+        parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+        parser.add_argument('--customers', type=int, default=500)
+        parser.add_argument('--crew', type=int, default=20)
+        parser.add_argument('--managers', type=int, default=5)
+        parser.add_argument('--categories', type=int, default=12)
+        parser.add_argument('--items', type=int, default=300)
+        parser.add_argument('--orders-per-customer', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='write the results as JSON to this file')
+        parser.add_argument('--baseline', help='compare with the JSON results of an earlier run')
+
+    def handle(self, *args, **options):
+        if importlib.util.find_spec(SERVERS[options['server']][0]) is None:
+            raise CommandError(f"{SERVERS[options['server']][0]} is not installed")
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+        rng = random.Random(options['seed'])
+        results = {
+            'commit': git_commit(),
+            'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'options': {name: options[name] for name in (
+                'server', 'workers', 'threads', 'duration', 'customers', 'crew', 'managers',
+                'categories', 'items', 'orders_per_customer', 'seed')},
+            'runs': [],
+        }
+
+        with scratch_database() as path:
+            seed(options, rng)
+            ctx = Context(rng, prefix=f'bench{int(time.time())}')
+            queries = count_queries(ctx, rounds=3)
+            port = free_port()
+            command = server_command(options['server'], port, options['workers'], options['threads'])
+            # Throttles still run (and cost what they cost) but never reject
+            env = {**server_env(options['server'], path),
+                   'LITTLELEMON_ANON_THROTTLE_RATE': '1000000/s', 'LITTLELEMON_USER_THROTTLE_RATE': '1000000/s'}
+            with server(command, port, env):
+                asyncio.run(replay(ctx, port, 5, 1))
+                for concurrency in options['concurrency']:
+                    samples, statuses, elapsed = asyncio.run(replay(ctx, port, concurrency, options['duration']))
+                    run = {
+                        'concurrency': concurrency,
+                        'total': summary([ms for latencies in samples.values() for ms in latencies], elapsed),
+                        'endpoints': {},
+                    }
+                    for endpoint in sorted(samples):
+                        run['endpoints'][endpoint] = {
+                            **summary(samples[endpoint], elapsed),
+                            'queries': queries.get(endpoint),
+                            'statuses': {str(status): count for status, count in sorted(
+                                statuses[endpoint].items(), key=str)},
+                        }
+                    results['runs'].append(run)
+                    self.report(run, baseline)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def report(self, run, baseline):
+        before = {}
+        if baseline:
+            before = {r['concurrency']: r for r in baseline['runs']}.get(run['concurrency'], {}).get('endpoints', {})
+        total = run['total']
+        self.stdout.write(f"\nconcurrency {run['concurrency']}: {total['rps']} req/s, p50 {total['p50_ms']} ms, "
+                          f"p95 {total['p95_ms']} ms, p99 {total['p99_ms']} ms")
+        self.stdout.write(f"{'endpoint':<32}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'SQL':>6}  statuses")
+        for endpoint, row in run['endpoints'].items():
+            line = (f"{endpoint:<32}{row['rps']:>8}{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}"
+                    f"{row['queries'] if row['queries'] is not None else '-':>6}  {row['statuses']}")
+            if endpoint in before:
+                old = before[endpoint]
+                line += f"  | p95 {row['p95_ms'] - old['p95_ms']:+.2f} ms"
+                if row['queries'] is not None and old.get('queries') is not None:
+                    line += f", SQL {row['queries'] - old['queries']:+.1f}"
+            self.stdout.write(line)
@@ -0,0 +1,77 @@
+import datetime
+import importlib.util
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from LittlelemonAPI.models import Cart, Category, MenuItem, Order, OrderItem
+
+from ._bench import SERVERS, free_port, run_load, scratch_database, server, server_command, server_env
+
+
+class Command(BaseCommand):
+    help = ('Serves a seeded scratch database with gunicorn (WSGI, sync views) and uvicorn '
+            '(ASGI, async views) and compares req/s and p99 under the same read-heavy load.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[50, 100, 200, 500])
+        parser.add_argument('--duration', type=float, default=10, help='seconds per run')
+        parser.add_argument('--workers', type=int, default=2, help='server processes')
+        parser.add_argument('--threads', type=int, default=8, help='gunicorn threads per worker')
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--items', type=int, default=100)
+        parser.add_argument('--servers', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+        parser.add_argument('--seed', type=int, default=1)
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        category = Category.objects.create(slug='bench', title='Bench')
+        items = MenuItem.objects.bulk_create(
+            MenuItem(title=f'Dish {i}', price=rng.randint(1, 50), category=category)
+            for i in range(options['items']))
+        users = User.objects.bulk_create(User(username=f'bench{i}') for i in range(options['users']))
+        tokens = Token.objects.bulk_create(Token(user=user, key=Token.generate_key()) for user in users)
+        carts, orders = [], []
+        for user in users:
+            for item in rng.sample(items, 3):
+                carts.append(Cart(user=user, menuitem=item, quantity=1, unit_price=item.price, price=item.price))
+            for day in range(3):
+                orders.append(Order(user=user, total=10, date=datetime.date(2024, 1, day + 1)))
+        Cart.objects.bulk_create(carts)
+        Order.objects.bulk_create(orders)
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, menuitem=items[0], quantity=1, unit_price=10, price=10)
+            for order in Order.objects.all())
+        return [token.key for token in tokens]
+
+    def handle(self, *args, **options):
+        for name in options['servers']:
+            if importlib.util.find_spec(SERVERS[name][0]) is None:
+                raise CommandError(f'{SERVERS[name][0]} is not installed')
+
+        with scratch_database() as path:
+            keys = self.seed(options)
+            # The menu is public and cached, the cart and order history are per user
+            requests = [('/api/all-menu-items', {})]
+            for key in keys:
+                auth = {'Authorization': f'Token {key}'}
+                requests += [('/api/view-cart/', auth), ('/api/user-orders/', auth)]
+            random.Random(options['seed']).shuffle(requests)
+            self.stdout.write(f"{options['users']} users, {options['items']} menu items, "
+                              f"{options['workers']} workers, {options['duration']}s per run")
+
+            for name in options['servers']:
+                port = free_port()
+                command = server_command(name, port, options['workers'], options['threads'])
+                with server(command, port, server_env(name, path)):
+                    # Warm up connections, caches and the token/role lookups
+                    run_load(port, requests, 10, 1)
+                    for concurrency in options['concurrency']:
+                        result = run_load(port, requests, concurrency, options['duration'])
+                        errors = sum(count for status, count in result['statuses'].items() if status != 200)
+                        self.stdout.write(
+                            f"{name} ({SERVERS[name][0]}) c={concurrency:<4} {result['rps']:>8.1f} req/s"
+                            f"  p50 {result['p50_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms"
+                            f"  non-200 {errors}")
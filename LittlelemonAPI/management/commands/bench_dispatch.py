@@ -0,0 +1,60 @@
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from LittlelemonAPI import dispatch, roles
+from LittlelemonAPI.models import Order
+
+from ._bench import measure, scratch_database, summarize
+
+
+def manual_dispatch(manager, crew_ids):
+    # What a manager does today: one assign-delivery call per order, each a
+    # group check, an order fetch, a user fetch and a save
+    order_ids = Order.objects.filter(delivery_crew__isnull=True, status=False).order_by('pk').values_list('pk', flat=True)
+    for index, order_id in enumerate(list(order_ids)):
+        manager.groups.filter(name=roles.MANAGER).exists()
+        order = Order.objects.get(pk=order_id)
+        order.delivery_crew = User.objects.get(pk=crew_ids[index % len(crew_ids)])
+        order.save()
+
+
+class Command(BaseCommand):
+    help = 'Times assigning 10k unassigned orders to 200 delivery crew members, per-order calls vs one dispatch cycle.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--crew', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            crews = Group.objects.create(name=roles.DELIVERY_CREW)
+            manager = User.objects.create_user('manager')
+            manager.groups.add(Group.objects.create(name=roles.MANAGER))
+            crew = User.objects.bulk_create(User(username=f'crew{i}') for i in range(options['crew']))
+            crews.user_set.add(*crew)
+            crew_ids = [user.pk for user in crew]
+            customer = User.objects.create_user('customer')
+            # A quarter of the crew already has open orders to balance against
+            Order.objects.bulk_create(
+                Order(user=customer, total=10, delivery_crew_id=crew_ids[i % max(len(crew_ids) // 4, 1)])
+                for i in range(len(crew_ids)))
+            first = Order.objects.bulk_create(
+                (Order(user=customer, total=10) for _ in range(options['orders'])), batch_size=1000)[0].pk
+
+            def unassign():
+                Order.objects.filter(pk__gte=first).update(delivery_crew=None)
+
+            results = {}
+            for name, func in (('per order', lambda: manual_dispatch(manager, crew_ids)),
+                               ('dispatch', dispatch.dispatch)):
+                def run():
+                    with transaction.atomic():
+                        func()
+                results[name] = summarize(measure(run, options['repeat'], setup=unassign))
+            loads = sorted(dispatch.crew_loads().values())
+            before, after = results['per order']['median_ms'], results['dispatch']['median_ms']
+            self.stdout.write(
+                f"{options['orders']} orders, {len(crew_ids)} crew  per order {before:.1f} ms"
+                f"  dispatch {after:.1f} ms  ({before / after:.1f}x)  open load {loads[0]}..{loads[-1]}")
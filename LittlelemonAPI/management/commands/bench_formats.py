@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from LittlelemonAPI import formats, listings, middleware, serializers
+from LittlelemonAPI.models import Cart, Category, MenuItem, Order, OrderItem
+
+from ._bench import measure, scratch_database, summarize
+
+
+class Command(BaseCommand):
+    help = 'Reports bytes on the wire and encode time per format (JSON, MessagePack, CSV) and compression.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        with scratch_database():
+            categories = Category.objects.bulk_create(Category(slug=f'c{i}', title=f'Category {i}') for i in range(20))
+            items = MenuItem.objects.bulk_create(
+                (MenuItem(title=f'Dish {i}', price=f'{i % 40 + 1}.50', category=categories[i % 20])
+                 for i in range(rows)), batch_size=1000)
+            user = User.objects.create_user('bench')
+            Cart.objects.bulk_create(Cart(user=user, menuitem=item, quantity=2, unit_price=item.price, price=10)
+                                     for item in items[:20])
+            orders = Order.objects.bulk_create((Order(user=user, total='30.00') for _ in range(rows)), batch_size=1000)
+            order_items = OrderItem.objects.bulk_create(
+                (OrderItem(order=order, menuitem=items[(i * 3 + line) % rows], quantity=2, unit_price=5, price=10)
+                 for i, order in enumerate(orders) for line in range(3)), batch_size=1000)
+            for order, lines in zip(orders, zip(*[iter(order_items)] * 3)):
+                order.summary = serializers.order_summary(lines)
+            Order.objects.bulk_update(orders, ['summary'], batch_size=1000)
+
+            endpoints = {
+                'all-menu-items': listings.menu_items(listings.menu_item_rows(MenuItem.objects.all())),
+                'view-cart': serializers.CartSerializer(
+                    serializers.CartSerializer.setup_eager_loading(Cart.objects.all()), many=True).data,
+                'orders': listings.orders(listings.order_rows(Order.objects.all())),
+            }
+            encodings = ['gzip'] + (['br'] if middleware.brotli is not None else [])
+            self.stdout.write(f'{"endpoint":<15}{"format":<9}{"encode ms":>10}{"bytes":>11}'
+                              + ''.join(f'{name:>11}{name + " ms":>10}' for name in encodings))
+            for endpoint, data in endpoints.items():
+                for renderer_class in formats.RENDERERS:
+                    if renderer_class.format == 'api':
+                        continue
+                    renderer = renderer_class()
+                    content = renderer.render(data)
+                    encode = summarize(measure(lambda: renderer.render(data), repeat))['median_ms']
+                    line = f'{endpoint:<15}{renderer.format:<9}{encode:>10.1f}{len(content):>11}'
+                    for encoding in encodings:
+                        request = RequestFactory().get('/', headers={'Accept-Encoding': encoding})
+                        compressed = middleware.compress(request, HttpResponse(content)).content
+                        elapsed = summarize(measure(
+                            lambda: middleware.compress(request, HttpResponse(content)), repeat))['median_ms']
+                        line += f'{len(compressed):>11}{elapsed:>10.1f}'
+                    self.stdout.write(line)
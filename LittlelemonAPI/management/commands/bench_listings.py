@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from LittlelemonAPI import listings, serializers
+from LittlelemonAPI.models import Category, MenuItem, Order, OrderItem
+
+from ._bench import measure, scratch_database, summarize
+
+
+class Command(BaseCommand):
+    help = 'Times serializing and rendering 10k menu items and 10k orders, serializers vs the listings fast path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with scratch_database():
+            categories = Category.objects.bulk_create(Category(slug=f'c{i}', title=f'Category {i}') for i in range(20))
+            items = MenuItem.objects.bulk_create(
+                (MenuItem(title=f'Dish {i}', price=f'{i % 40 + 1}.50', category=categories[i % 20])
+                 for i in range(rows)), batch_size=1000)
+            user = User.objects.create_user('bench')
+            orders = Order.objects.bulk_create((Order(user=user, total='30.00') for _ in range(rows)), batch_size=1000)
+            order_items = OrderItem.objects.bulk_create(
+                (OrderItem(order=order, menuitem=items[(i * 3 + line) % rows], quantity=2, unit_price=5, price=10)
+                 for i, order in enumerate(orders) for line in range(3)), batch_size=1000)
+            # Summaries as place_order writes them
+            for order, lines in zip(orders, zip(*[iter(order_items)] * 3)):
+                order.summary = serializers.order_summary(lines)
+            Order.objects.bulk_update(orders, ['summary'], batch_size=1000)
+
+            menu = MenuItem.objects.all()
+            history = Order.objects.all()
+            cases = {
+                'menu items': (
+                    lambda: JSONRenderer().render(serializers.MenuItemSerializer(
+                        serializers.MenuItemSerializer.setup_eager_loading(menu), many=True).data),
+                    lambda: listings.FastJSONRenderer().render(listings.menu_items(listings.menu_item_rows(menu))),
+                ),
+                'orders': (
+                    lambda: JSONRenderer().render(serializers.OrderHistorySerializer(history, many=True).data),
+                    lambda: listings.FastJSONRenderer().render(listings.orders(listings.order_rows(history))),
+                ),
+            }
+            encoder = 'orjson' if listings.orjson is not None else 'json'
+            for name, (slow, fast) in cases.items():
+                assert slow() == fast(), f'{name}: output differs'
+                before = summarize(measure(slow, options['repeat']))['median_ms']
+                after = summarize(measure(fast, options['repeat']))['median_ms']
+                self.stdout.write(f'{rows} {name:<10}  serializer {before:8.1f} ms'
+                                  f'  listings ({encoder}) {after:8.1f} ms  ({before / after:.1f}x)')
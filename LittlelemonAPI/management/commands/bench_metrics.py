@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from rest_framework.authtoken.models import Token
+
+from LittlelemonAPI.models import Category, MenuItem, Order, OrderItem
+
+from ._bench import measure, scratch_database, summarize
+
+
+class Command(BaseCommand):
+    help = 'Measures the per-request cost of the metrics middleware (Server-Timing, histograms).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=500)
+        parser.add_argument('--orders', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            category = Category.objects.create(slug='bench', title='Bench')
+            items = MenuItem.objects.bulk_create(
+                MenuItem(title=f'Dish {i}', price=i % 20 + 1, category=category) for i in range(50))
+            user = User.objects.create_user('bench')
+            token = Token.objects.create(user=user)
+            orders = Order.objects.bulk_create(Order(user=user, total=10) for _ in range(options['orders']))
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, menuitem=items[i % 50], quantity=1, unit_price=1, price=1)
+                for i, order in enumerate(orders))
+
+            client = Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Token {token.key}')
+            # A cached, query-free endpoint shows the fixed cost; the order
+            # history adds the per-query and per-serializer cost
+            for path in ('/api/all-menu-items', '/api/user-orders/'):
+                results = {}
+                for enabled in (False, True, False, True):
+                    with override_settings(METRICS_ENABLED=enabled):
+                        client.get(path)
+                        results[enabled] = summarize(measure(lambda: client.get(path), options['repeat']))
+                off, on = results[False]['median_ms'], results[True]['median_ms']
+                self.stdout.write(f'{path:<22} off {off:.3f} ms  on {on:.3f} ms  overhead {on - off:+.3f} ms')
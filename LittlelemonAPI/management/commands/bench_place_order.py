@@ -0,0 +1,61 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from LittlelemonAPI import checkout
+from LittlelemonAPI.models import Cart, Category, MenuItem, Order, OrderItem
+
+from ._bench import measure, scratch_database, summarize
+
+
+def legacy_place_order(user):
+    # place_order as it was before the transactional rewrite
+    cart_items = Cart.objects.filter(user=user)
+    if not cart_items:
+        return None
+    order = Order(user=user, total=0)
+    order.save()
+    total = 0
+    for item in cart_items:
+        order_item = OrderItem(
+            order=order,
+            menuitem=item.menuitem,
+            quantity=item.quantity,
+            price=item.price,
+            unit_price=item.unit_price
+        )
+        order_item.save()
+        total += item.price * item.quantity
+    order.total = total
+    order.save()
+    cart_items.delete()
+    return order
+
+
+class Command(BaseCommand):
+    help = 'Times order placement for carts of 1, 10 and 100 lines, legacy loop vs transactional bulk path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 100])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            user = User.objects.create_user('bench')
+            category = Category.objects.create(slug='bench', title='Bench')
+            items = MenuItem.objects.bulk_create(
+                MenuItem(title=f'Item {i}', price=i % 50 + 1, category=category)
+                for i in range(max(options['lines'])))
+
+            for lines in options['lines']:
+                def fill_cart():
+                    Cart.objects.bulk_create(
+                        Cart(user=user, menuitem=item, quantity=2, unit_price=item.price, price=item.price * 2)
+                        for item in items[:lines])
+                results = {}
+                for name, func in (('before', legacy_place_order), ('after', checkout.place_order)):
+                    samples = measure(lambda: func(user), options['repeat'], setup=fill_cart)
+                    results[name] = summarize(samples)
+                speedup = results['before']['median_ms'] / results['after']['median_ms']
+                self.stdout.write(
+                    f"{lines:>4} lines  before {results['before']['median_ms']:>9.3f} ms"
+                    f"  after {results['after']['median_ms']:>9.3f} ms  ({speedup:.1f}x)")
@@ -0,0 +1,55 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from LittlelemonAPI import search
+from LittlelemonAPI.models import Category, MenuItem
+
+from ._bench import measure, scratch_database, summarize
+
+DISHES = [
+    'greek', 'salad', 'lemon', 'dessert', 'bruschetta', 'grilled', 'fish', 'pasta', 'lamb', 'souvlaki',
+    'feta', 'olive', 'tomato', 'basil', 'garlic', 'roasted', 'chicken', 'spinach', 'pie', 'honey',
+    'yogurt', 'baklava', 'hummus', 'pita', 'octopus', 'calamari', 'risotto', 'mushroom', 'saffron', 'mint',
+]
+SYLLABLES = ['ka', 'lo', 'mi', 'ran', 'te', 'so', 'vu', 'zel', 'pa', 'dri', 'no', 'che']
+
+
+class Command(BaseCommand):
+    help = 'Compares LIKE %%term%% with the FTS5 index for a paginated menu title search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        # A few common dish words plus a long tail of house names, like a real menu
+        names = sorted({''.join(rng.choices(SYLLABLES, k=3)) for _ in range(5000)})
+        with scratch_database():
+            category = Category.objects.create(slug='bench', title='Bench')
+            MenuItem.objects.bulk_create((
+                MenuItem(title=f'{rng.choice(names)} {" ".join(rng.sample(DISHES, 2))}',
+                         price=rng.randint(1, 50), category=category)
+                for i in range(options['items'])), batch_size=5000)
+            self.stdout.write(f"{options['items']} menu items, FTS5 available: {search.available()}")
+
+            for term in (names[100], names[200][:4], f'{names[300]} {DISHES[0]}', 'greek salad', 'lem'):
+                like = MenuItem.objects.all()
+                for word in term.split():
+                    like = like.filter(title__icontains=word)
+                fts = search.search_menu_items(MenuItem.objects.all(), term)
+                rows = None
+                results = {}
+                for name, queryset in (('LIKE', like), ('FTS5', fts)):
+                    def run():
+                        # what a paginated ?search= request runs: count + first page
+                        nonlocal rows
+                        queryset.count()
+                        rows = list(queryset[:10])
+                    results[name] = summarize(measure(run, options['repeat']))
+                self.stdout.write(
+                    f"{term!r:>22}  LIKE {results['LIKE']['median_ms']:>8.3f} ms"
+                    f"  FTS5 {results['FTS5']['median_ms']:>8.3f} ms"
+                    f"  ({results['LIKE']['median_ms'] / results['FTS5']['median_ms']:.1f}x)")
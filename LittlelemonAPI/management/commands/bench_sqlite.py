@@ -0,0 +1,99 @@
+import multiprocessing
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, transaction
+from django.test import override_settings
+
+from LittlelemonAPI import checkout
+from LittlelemonAPI.models import Category, MenuItem, Order
+
+from ._bench import percentile, scratch_database
+
+
+def read(user):
+    list(MenuItem.objects.select_related('category')[:50])
+    list(Order.objects.filter(user=user).prefetch_related('items'))
+
+
+def worker(role, index, conn_max_age, duration, results):
+    # Each request starts and ends like a real one: close_old_connections()
+    # closes the connection unless CONN_MAX_AGE keeps it
+    connection.close()
+    connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+    rng = random.Random(index)
+    user = User.objects.get(username=f'stress{index}')
+    items = list(MenuItem.objects.all())
+    close_old_connections()
+    latencies, errors, stop = [], 0, time.monotonic() + duration
+    while time.monotonic() < stop:
+        start = time.perf_counter()
+        try:
+            if role == 'read':
+                read(user)
+            else:
+                # Every write places an order, in one transaction that reads
+                # (the price) before it writes
+                with transaction.atomic():
+                    checkout.add_to_cart(user, {rng.choice(items).pk: 1})
+                    checkout.place_order(user)
+        except OperationalError:
+            # "database is locked"
+            errors += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+        close_old_connections()
+    connection.close()
+    results.put((role, latencies, errors))
+
+
+class Command(BaseCommand):
+    help = ('Runs concurrent reader and writer processes (add to cart, place order, menu and '
+            'order reads) against a scratch database, with and without the SQLite profile.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5, help='seconds per run')
+        parser.add_argument('--items', type=int, default=200)
+
+    def run(self, options, profile, conn_max_age):
+        # A scratch database per run: WAL mode sticks to the file
+        with override_settings(SQLITE_PROFILE=profile), scratch_database():
+            category = Category.objects.create(slug='stress', title='Stress')
+            MenuItem.objects.bulk_create(
+                MenuItem(title=f'Dish {i}', price=i % 20 + 1, category=category) for i in range(options['items']))
+            workers = options['readers'] + options['writers']
+            User.objects.bulk_create(User(username=f'stress{i}') for i in range(workers))
+            connection.close()
+
+            context = multiprocessing.get_context('fork')
+            results = context.Queue()
+            processes = [
+                context.Process(target=worker, args=(
+                    'read' if i < options['readers'] else 'write', i, conn_max_age, options['duration'], results))
+                for i in range(workers)]
+            for process in processes:
+                process.start()
+            totals = {'read': ([], 0), 'write': ([], 0)}
+            for _ in processes:
+                role, latencies, errors = results.get()
+                totals[role] = (totals[role][0] + latencies, totals[role][1] + errors)
+            for process in processes:
+                process.join()
+
+            line = f'{profile:>10}, CONN_MAX_AGE={conn_max_age:<4}'
+            for role, (latencies, errors) in totals.items():
+                ok = len(latencies) - errors
+                line += (f'  {role}s {ok / options["duration"]:>8.1f}/s'
+                         f' p99 {percentile(latencies, 99) if latencies else 0:>8.2f} ms locked {errors:<5}')
+            self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError('bench_sqlite needs the fork start method')
+        self.stdout.write(f"{options['readers']} readers, {options['writers']} writers, "
+                          f"{options['duration']}s per run")
+        self.run(options, 'default', 0)
+        self.run(options, 'production', 600)
@@ -0,0 +1,128 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ._bench import scratch_database
+
+# Run in a fresh interpreter: builds the WSGI application and serves one
+# request, like a new worker taking its first request
+FIRST_REQUEST = '''
+import io, json, sys, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+ready = time.perf_counter()
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '', 'SERVER_NAME': '127.0.0.1',
+    'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_ACCEPT': 'application/json',
+    'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+    'wsgi.multithread': False, 'wsgi.multiprocess': True, 'wsgi.run_once': False, 'wsgi.version': (1, 0),
+}
+statuses = []
+b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+done = time.perf_counter()
+print(json.dumps({'status': statuses[0], 'setup_ms': (ready - start) * 1000, 'first_response_ms': (done - start) * 1000,
+                  'modules': len(sys.modules)}))
+'''
+
+PROFILES = {'full': 'Littlelemon.settings', 'api': 'Littlelemon.settings_api'}
+
+
+def parse_importtime(stderr):
+    # (total ms, {top-level package: cumulative ms}) from -X importtime output
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if name.startswith('  '):
+            continue  # counted in the cumulative time of its importer
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(cumulative) / 1000
+    return sum(packages.values()), packages
+
+
+class Command(BaseCommand):
+    help = ('Measures a new worker\'s import time (-X importtime) and time to its first response, '
+            'for the full and the API-only settings.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=9)
+        parser.add_argument('--path', default='/api/all-menu-items')
+        parser.add_argument('--top', type=int, default=8, help='Slowest top-level imports to list.')
+        parser.add_argument('--baseline', metavar='DIR',
+                            help='Another checkout of the project (e.g. `git worktree add DIR <rev>`) to compare '
+                                 'against, run with its full settings.')
+        parser.add_argument('--target', type=float, default=10,
+                            help='Cut in time to first response the API-only profile should reach, in percent '
+                                 '(against --baseline, else against the full settings).')
+
+    def run(self, project_dir, settings_module, db_path, path, importtime=False):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module, 'LITTLELEMON_DB_PATH': str(db_path),
+               'LITTLELEMON_METRICS': '0'}
+        command = [sys.executable, *(['-X', 'importtime'] if importtime else []), '-c', FIRST_REQUEST, path]
+        start = time.perf_counter()
+        process = subprocess.run(command, cwd=project_dir, env=env, capture_output=True, text=True)
+        wall = (time.perf_counter() - start) * 1000
+        if process.returncode:
+            raise RuntimeError(process.stderr[-2000:])
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        result['process_ms'] = wall
+        if importtime:
+            result['import_ms'], result['packages'] = parse_importtime(process.stderr)
+        return result
+
+    def measure(self, project_dir, settings_module, db_path, options):
+        # Warm the bytecode cache first; workers start from compiled files
+        self.run(project_dir, settings_module, db_path, options['path'])
+        runs = [self.run(project_dir, settings_module, db_path, options['path']) for _ in range(options['repeat'])]
+        imports = [self.run(project_dir, settings_module, db_path, options['path'], importtime=True)
+                   for _ in range(options['repeat'])]
+        # Best of `repeat`: start-up work is fixed, the rest is noise from
+        # the machine
+        return {
+            'status': runs[0]['status'],
+            'modules': runs[0]['modules'],
+            'setup_ms': min(run['setup_ms'] for run in runs),
+            'first_response_ms': min(run['first_response_ms'] for run in runs),
+            'process_ms': min(run['process_ms'] for run in runs),
+            'import_ms': min(run['import_ms'] for run in imports),
+            'packages': {name: min(run['packages'].get(name, 0) for run in imports)
+                         for name in imports[0]['packages']},
+        }
+
+    def handle(self, *args, **options):
+        project_dir = settings.BASE_DIR
+        with scratch_database() as db_path:
+            results = {}
+            if options['baseline']:
+                results['baseline'] = self.measure(options['baseline'], PROFILES['full'], db_path, options)
+            for name, settings_module in PROFILES.items():
+                results[name] = self.measure(project_dir, settings_module, db_path, options)
+        self.stdout.write(f'First GET {options["path"]}, best of {options["repeat"]} fresh processes')
+        self.stdout.write(f'{"profile":<10}{"status":>16}{"modules":>9}{"imports ms":>12}{"setup ms":>10}'
+                          f'{"first resp ms":>15}{"process ms":>12}')
+        for name, result in results.items():
+            self.stdout.write(f'{name:<10}{result["status"]:>16}{result["modules"]:>9}{result["import_ms"]:>12.1f}'
+                              f'{result["setup_ms"]:>10.1f}{result["first_response_ms"]:>15.1f}'
+                              f'{result["process_ms"]:>12.1f}')
+        reference = results.get('baseline', results['full'])
+        against = 'the baseline' if 'baseline' in results else 'full'
+        cuts = {}
+        for name in ('full', 'api'):
+            if results[name] is reference:
+                continue
+            cuts[name] = {key: 1 - results[name][key] / reference[key] for key in ('import_ms', 'first_response_ms')}
+            self.stdout.write(f'{name}: imports {cuts[name]["import_ms"]:.0%} and first response '
+                              f'{cuts[name]["first_response_ms"]:.0%} faster than {against}')
+        for name, result in results.items():
+            slowest = sorted(result['packages'].items(), key=lambda item: -item[1])[:options['top']]
+            self.stdout.write(f'{name} slowest imports: ' + ', '.join(f'{package} {ms:.0f}' for package, ms in slowest))
+        met = cuts['api']['first_response_ms'] * 100 >= options['target']
+        self.stdout.write(f'Target: API-only first response {options["target"]:g}% faster than {against}: '
+                          + ('met' if met else 'missed'))
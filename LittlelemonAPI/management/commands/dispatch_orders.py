@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from LittlelemonAPI import dispatch
+
+
+class Command(BaseCommand):
+    help = 'Assigns unassigned open orders to the least loaded delivery crew members.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help='Orders per cycle (default: all).')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Keep running, one cycle every INTERVAL seconds.')
+
+    def handle(self, *args, **options):
+        while True:
+            assignments = dispatch.dispatch(options['limit'])
+            assigned = sum(len(ids) for ids in assignments.values())
+            self.stdout.write(f'Assigned {assigned} orders to {len(assignments)} crew members.')
+            if options['interval'] is None:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
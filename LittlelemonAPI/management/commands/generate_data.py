@@ -0,0 +1,247 @@
+import datetime
+import itertools
+import math
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
+from django.contrib.auth.models import Group, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from LittlelemonAPI import catalog, roles, rollups, serializers
+from LittlelemonAPI.models import Cart, Category, MenuItem, Order, OrderItem
+
+CATEGORIES = ['Starters', 'Soups', 'Salads', 'Mains', 'Pasta', 'Pizza', 'Grill', 'Seafood', 'Vegetarian', 'Sides',
+              'Desserts', 'Drinks', 'Breakfast', 'Kids', 'Specials']
+ADJECTIVES = ['Grilled', 'Roasted', 'Lemon', 'Spiced', 'Smoked', 'Crispy', 'Greek', 'Garlic', 'Herb', 'Braised',
+              'Fresh', 'Honey', 'Stuffed', 'Charred', 'Classic', 'Sicilian', 'Creamy', 'Wild', 'Golden', 'Harissa']
+DISHES = ['Bruschetta', 'Salad', 'Lamb', 'Chicken', 'Sea Bass', 'Risotto', 'Falafel', 'Hummus', 'Souvlaki', 'Gyro',
+          'Moussaka', 'Calamari', 'Octopus', 'Flatbread', 'Halloumi', 'Orzo', 'Linguine', 'Baklava', 'Tiramisu',
+          'Panna Cotta', 'Lemonade', 'Soup', 'Kebab', 'Couscous', 'Tart', 'Shrimp', 'Burger', 'Gelato', 'Pita', 'Feta']
+# Lines per order (1-6) and quantity per line (1-4)
+LINE_WEIGHTS = [35, 30, 18, 10, 5, 2]
+QUANTITY_WEIGHTS = [70, 20, 7, 3]
+# Orders per weekday, Monday first
+WEEKDAY_WEIGHTS = [0.8, 0.85, 0.9, 1.0, 1.3, 1.45, 1.1]
+# Menu item popularity follows Zipf's law with this exponent
+ZIPF_EXPONENT = 1.07
+# Share of the last day's orders already assigned to a crew member
+ASSIGNED_TODAY = 0.6
+
+
+class Command(BaseCommand):
+    help = ('Fills the database with a synthetic restaurant: categories, menu items, managers, delivery crew, '
+            'customers, carts and an order history, in bulk. The same --seed on the same database gives the '
+            'same data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--categories', type=int, default=12)
+        parser.add_argument('--menu-items', type=int, default=200)
+        parser.add_argument('--managers', type=int, default=3)
+        parser.add_argument('--delivery-crew', type=int, default=20)
+        parser.add_argument('--customers', type=int, default=1000)
+        parser.add_argument('--carts', type=int, default=100, help='Customers with an open cart.')
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=365, help='Days of order history.')
+        parser.add_argument('--until', type=datetime.date.fromisoformat, default=None,
+                            help='Date of the newest orders, YYYY-MM-DD (default: today).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per insert transaction.')
+        parser.add_argument('--prefix', default=None, help='Username prefix (default: gen<seed>).')
+        parser.add_argument('--password', default=None,
+                            help='Password of every generated user (default: none, they cannot log in).')
+
+    def handle(self, *args, **options):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError('generate_data needs a database that returns primary keys from bulk inserts.')
+        if options['customers'] < 1 and options['orders']:
+            raise CommandError('Orders need at least one customer.')
+        if options['menu_items'] < 1 and (options['orders'] or options['carts']):
+            raise CommandError('Orders and carts need at least one menu item.')
+        if options['categories'] < 1 and options['menu_items']:
+            raise CommandError('Menu items need at least one category.')
+        self.prefix = options['prefix'] or f'gen{options["seed"]}'
+        if User.objects.filter(username__startswith=self.prefix + '-').exists():
+            raise CommandError(f'Users named {self.prefix}-* exist already; pick another --seed or --prefix.')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        start = time.perf_counter()
+        self.rows = 0
+
+        categories = self.categories(options['categories'])
+        items = self.menu_items(options['menu_items'], categories)
+        managers = self.users('manager', options['managers'], roles.MANAGER, options['password'])
+        crew = self.users('crew', options['delivery_crew'], roles.DELIVERY_CREW, options['password'])
+        customers = self.users('customer', options['customers'], None, options['password'])
+        self.carts(options['carts'], customers, items)
+        self.orders(options['orders'], options['days'], options['until'] or timezone.localdate(),
+                    customers, crew, items)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'Generated {self.rows} rows in {elapsed:.1f} s ({self.rows / max(elapsed, 1e-9):.0f} rows/s): '
+                          f'{len(categories)} categories, {len(items)} menu items, '
+                          f'{len(managers) + len(crew) + len(customers)} users, {options["orders"]} orders.')
+
+    def insert(self, model, objs):
+        # One transaction per batch: memory stays flat and a long run
+        # commits as it goes
+        created = []
+        for start in range(0, len(objs), self.batch_size):
+            with transaction.atomic():
+                created += model.objects.bulk_create(objs[start:start + self.batch_size])
+            # Under DEBUG every insert, parameters and all, is kept in
+            # connection.queries
+            reset_queries()
+        self.rows += len(created)
+        return created
+
+    def log(self, message):
+        if self.verbosity > 1:
+            self.stdout.write(message)
+
+    def categories(self, count):
+        rng = self.rng
+        names = [CATEGORIES[i % len(CATEGORIES)] + (f' {i // len(CATEGORIES) + 1}' if i >= len(CATEGORIES) else '')
+                 for i in range(count)]
+        categories = self.insert(Category, [Category(slug=slugify(name), title=name) for name in names])
+        # Typical price and share of the menu of each category
+        for category in categories:
+            category.base_price = min(40.0, rng.lognormvariate(math.log(12), 0.4))
+            category.share = rng.uniform(0.5, 2.0)
+        self.log(f'{len(categories)} categories')
+        return categories
+
+    def menu_items(self, count, categories):
+        rng = self.rng
+        if not count:
+            return []
+        picked = rng.choices(categories, weights=[category.share for category in categories], k=count)
+        items = []
+        for category in picked:
+            # Prices spread log-normally around the category's, in 0.50 steps
+            price = min(99.5, max(1.0, round(category.base_price * rng.lognormvariate(0, 0.3) * 2) / 2))
+            items.append(MenuItem(title=f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}', price=Decimal(f'{price:.2f}'),
+                                  category=category))
+        # Popularity by Zipf's law over a random ranking
+        ranks = list(range(1, count + 1))
+        rng.shuffle(ranks)
+        self.popularity = list(itertools.accumulate(1 / rank ** ZIPF_EXPONENT for rank in ranks))
+        if not MenuItem.objects.filter(featured=True).exists():
+            items[ranks.index(1)].featured = True
+        items = self.insert(MenuItem, items)
+        # Order summaries embed each item as the serializer renders it
+        self.summaries = list(serializers.MenuItemSerializer(items, many=True).data)
+        catalog.bump_version()
+        self.log(f'{len(items)} menu items')
+        return items
+
+    def users(self, role, count, group_name, password):
+        # One hash for everyone; hashing is slow by design
+        password = make_password(password) if password else UNUSABLE_PASSWORD_PREFIX
+        users = self.insert(User, [
+            User(username=f'{self.prefix}-{role}-{n}', email=f'{self.prefix}-{role}-{n}@example.com', password=password)
+            for n in range(1, count + 1)])
+        if group_name is not None and users:
+            group, _ = Group.objects.get_or_create(name=group_name)
+            self.insert(User.groups.through, [User.groups.through(user_id=user.pk, group_id=group.pk) for user in users])
+        self.log(f'{len(users)} {role} users')
+        return users
+
+    def carts(self, count, customers, items):
+        rng = self.rng
+        rows = []
+        for customer in rng.sample(customers, min(count, len(customers))):
+            picks = set(rng.choices(range(len(items)), cum_weights=self.popularity, k=rng.randint(1, 4)))
+            for index in sorted(picks):
+                quantity = rng.choices(range(1, len(QUANTITY_WEIGHTS) + 1), QUANTITY_WEIGHTS)[0]
+                unit_price = items[index].price
+                rows.append(Cart(user=customer, menuitem=items[index], quantity=quantity, unit_price=unit_price,
+                                 price=unit_price * quantity))
+        self.insert(Cart, rows)
+        self.log(f'{len(rows)} cart rows')
+
+    def orders(self, count, days, until, customers, crew, items):
+        rng = self.rng
+        if not count:
+            return
+        dates = [until - datetime.timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+        # Volume grows over the period, peaks at weekends and varies day to day
+        weights = [(0.6 + 0.4 * n / max(days - 1, 1)) * WEEKDAY_WEIGHTS[date.weekday()] * rng.uniform(0.85, 1.15)
+                   for n, date in enumerate(dates)]
+        per_day = [0] * days
+        for day in rng.choices(range(days), weights=weights, k=count):
+            per_day[day] += 1
+        # A few regulars place most orders
+        activity = list(itertools.accumulate(rng.paretovariate(1.2) for _ in customers))
+        line_counts = range(1, len(LINE_WEIGHTS) + 1)
+        quantities = range(1, len(QUANTITY_WEIGHTS) + 1)
+
+        delta = rollups.Delta()
+        pending = []
+        done = 0
+        for date, orders_today in zip(dates, per_day):
+            buyers = rng.choices(customers, cum_weights=activity, k=orders_today)
+            for customer in buyers:
+                lines = {}
+                for index in rng.choices(range(len(items)), cum_weights=self.popularity,
+                                         k=rng.choices(line_counts, LINE_WEIGHTS)[0]):
+                    # The same dish twice is one line with a larger quantity
+                    lines[index] = lines.get(index, 0) + rng.choices(quantities, QUANTITY_WEIGHTS)[0]
+                # Past orders were delivered; some of the last day's are on their way
+                if date < until:
+                    delivered, courier = True, rng.choice(crew) if crew else None
+                else:
+                    delivered = False
+                    courier = rng.choice(crew) if crew and rng.random() < ASSIGNED_TODAY else None
+                rows, summary = [], []
+                for index, quantity in lines.items():
+                    item = items[index]
+                    price = item.price * quantity
+                    rows.append((item, quantity, price))
+                    summary.append({'menuitem': self.summaries[index], 'quantity': quantity,
+                                    'unit_price': str(item.price), 'price': str(price)})
+                total = sum(price for _, _, price in rows)
+                order = Order(user_id=customer.pk, delivery_crew_id=courier and courier.pk, status=delivered,
+                              total=total, summary=summary)
+                pending.append((date, order, rows))
+                delta.add(date, total, [(item.pk, item.category_id, quantity, price) for item, quantity, price in rows])
+                if len(pending) >= self.batch_size:
+                    done += self.save_orders(pending)
+                    pending = []
+                    self.log(f'{done}/{count} orders')
+        done += self.save_orders(pending)
+        with transaction.atomic():
+            delta.save()
+        self.log(f'{done} orders, sales rollups updated')
+
+    def save_orders(self, pending):
+        if not pending:
+            return 0
+        with transaction.atomic():
+            orders = Order.objects.bulk_create([order for _, order, _ in pending])
+            # Order items are the largest table: inserted without model
+            # instances, which would cost most of the run
+            lines = [(order.pk, item.pk, quantity, item.price, price)
+                     for order, (_, _, rows) in zip(orders, pending) for item, quantity, price in rows]
+            qn = connection.ops.quote_name
+            columns = ', '.join(qn(OrderItem._meta.get_field(name).column)
+                                for name in ['order', 'menuitem', 'quantity', 'unit_price', 'price'])
+            with connection.cursor() as cursor:
+                cursor.executemany(f'INSERT INTO {qn(OrderItem._meta.db_table)} ({columns}) '
+                                   f'VALUES (%s, %s, %s, %s, %s)', lines)
+            # Order.date is auto_now, so bulk_create stamped today
+            by_date = {}
+            for date, order, _ in pending:
+                by_date.setdefault(date, []).append(order.pk)
+            for date, pks in by_date.items():
+                size = connection.ops.bulk_batch_size(['pk'], pks)
+                for start in range(0, len(pks), size):
+                    Order.objects.filter(pk__in=pks[start:start + size]).update(date=date)
+        reset_queries()
+        self.rows += len(orders) + len(lines)
+        return len(orders)
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from LittlelemonAPI import rollups
+from LittlelemonAPI.models import DailyItemSales, DailySales
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the sales rollups from orders, reports rows that differed and replaces them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only compare; exit with an error if the rollups are out of date.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            days, items = rollups.recompute().rows()
+            tables = (
+                (DailySales, ['date'], ['orders', 'revenue'], days),
+                (DailyItemSales, ['date', 'menuitem_id', 'category_id'], ['quantity', 'revenue'], items),
+            )
+            differed = 0
+            for model, keys, counters, rows in tables:
+                expected = {tuple(row[:len(keys)]): tuple(row[len(keys):]) for row in rows}
+                stored = {
+                    tuple(row[:len(keys)]): tuple(row[len(keys):])
+                    for row in model.objects.values_list(*keys, *counters) if any(row[len(keys):])
+                }
+                mismatched = {key for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key)}
+                differed += len(mismatched)
+                self.stdout.write(f'{model.__name__}: {len(expected)} rows, {len(mismatched)} differed')
+                if not options['check']:
+                    model.objects.all().delete()
+                    model.objects.bulk_create(
+                        [model(**dict(zip([*keys, *counters], row))) for row in rows], batch_size=500)
+        if options['check'] and differed:
+            raise CommandError(f'{differed} rollup rows are out of date; run rebuild_sales_rollups.')
+        self.stdout.write('Rollups match.' if not differed else 'Rollups rebuilt.')
@@ -0,0 +1,43 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from LittlelemonAPI import jobs
+
+# Seconds between deletions of old done jobs
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Runs background jobs (see LittlelemonAPI/jobs.py) until interrupted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2)
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--burst', action='store_true', help='Run the jobs that are due, then exit.')
+
+    def handle(self, *args, **options):
+        if options['burst']:
+            self.stdout.write(f'Ran {jobs.run_pending()} jobs, deleted {jobs.purge()} old ones.')
+            return
+        stop, threads = jobs.start_workers(options['threads'], options['poll_interval'])
+        # Finish the current jobs on SIGTERM/Ctrl-C; run more processes for
+        # more parallelism
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        self.stdout.write(f'Running {len(threads)} job workers.')
+        next_purge = time.monotonic()
+        try:
+            while True:
+                if time.monotonic() >= next_purge:
+                    # The connection has been idle since the last purge
+                    close_old_connections()
+                    jobs.purge()
+                    next_purge += PURGE_INTERVAL
+                if stop.wait(1):
+                    break
+        except KeyboardInterrupt:
+            stop.set()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,273 @@
+import contextvars
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+# Per-request timings (SQL count, DB time, serializer time, total time),
+# reported in a Server-Timing header and aggregated into per-view latency
+# histograms. Recording costs a few counter updates per request and per
+# query; each process counts in memory and adds its counts to a small
+# SQLite file shared by the workers on this host every
+# METRICS_FLUSH_INTERVAL seconds, so /api/metrics sees every worker.
+
+# Seconds; the SQL count histogram uses QUERY_BUCKETS
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+HISTOGRAMS = {
+    'littlelemon_request_duration_seconds': ('Time from the first middleware to the response.', BUCKETS),
+    'littlelemon_db_duration_seconds': ('Time spent executing SQL.', BUCKETS),
+    'littlelemon_serializer_duration_seconds': ('Time spent in serializer to_representation().', BUCKETS),
+    'littlelemon_db_queries': ('SQL queries per request.', QUERY_BUCKETS),
+}
+
+
+class RequestTimings:
+    __slots__ = ('start', 'queries', 'db', 'serializer', 'depth')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.serializer = 0.0
+        self.depth = 0
+
+    def server_timing(self, total):
+        return (f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries", '
+                f'serializer;dur={self.serializer * 1000:.1f}, total;dur={total * 1000:.1f}')
+
+
+_current = contextvars.ContextVar('littlelemon_request_timings', default=None)
+
+
+def enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def begin_request():
+    return _current.set(RequestTimings())
+
+
+def end_request(token, request, response):
+    timings = _current.get()
+    _current.reset(token)
+    total = time.perf_counter() - timings.start
+    response['Server-Timing'] = timings.server_timing(total)
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match is not None else '<unresolved>'
+    registry.observe(view, request.method, response.status_code, timings, total)
+
+
+def record_query(execute, sql, params, many, context):
+    # execute_wrapper installed on every connection (see signals.py)
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db += time.perf_counter() - start
+        timings.queries += 1
+
+
+def install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class SerializerTimingMixin:
+    # Only the outermost serializer is timed; nested ones are part of it
+
+    def to_representation(self, instance):
+        timings = _current.get()
+        if timings is None or timings.depth:
+            return super().to_representation(instance)
+        timings.depth = 1
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            timings.depth = 0
+            timings.serializer += time.perf_counter() - start
+
+
+def serializer_timed(func):
+    # Counts func as serializer time, for code that renders rows without
+    # serializers (see listings.py)
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _current.get()
+        if timings is None or timings.depth:
+            return func(*args, **kwargs)
+        timings.depth = 1
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.depth = 0
+            timings.serializer += time.perf_counter() - start
+    return wrapper
+
+
+def _bucket_index(buckets, value):
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            return index
+    return len(buckets)
+
+
+def _add(a, b):
+    return [x + y for x, y in zip(a, b)] if isinstance(a, list) else a + b
+
+
+class Registry:
+    # This process's counts since its last flush:
+    # {(name, labels): [bucket counts..., +Inf count, sum]} and response counts
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+        self.statuses = {}
+        self.flushed = time.monotonic()
+
+    def _observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(buckets) + 2)
+        series[_bucket_index(buckets, value)] += 1
+        series[-1] += value
+
+    def observe(self, view, method, status, timings, total):
+        labels = json.dumps({'view': view, 'method': method})
+        with self.lock:
+            self._observe('littlelemon_request_duration_seconds', labels, total)
+            self._observe('littlelemon_db_duration_seconds', labels, timings.db)
+            self._observe('littlelemon_serializer_duration_seconds', labels, timings.serializer)
+            self._observe('littlelemon_db_queries', labels, timings.queries)
+            key = ('littlelemon_responses_total', json.dumps({'view': view, 'method': method, 'status': str(status)}))
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+        if time.monotonic() - self.flushed >= getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            self.flushed = time.monotonic()
+            rows = [(name, labels, values) for (name, labels), values in [*self.series.items(), *self.statuses.items()]]
+            self.series, self.statuses = {}, {}
+        if rows:
+            get_store().save(rows)
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+            self.statuses.clear()
+
+
+registry = Registry()
+
+
+def _after_fork():
+    # A forked worker is a new process; the parent flushes its own counts
+    registry.__init__()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+_SCHEMA = '''CREATE TABLE IF NOT EXISTS totals (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    series_values TEXT NOT NULL,
+    PRIMARY KEY (name, labels)
+) WITHOUT ROWID'''
+
+
+class MetricsStore:
+    # Totals over every process, one row per series: a flush adds the
+    # worker's counts since its previous flush, so counts of exited or
+    # recycled workers stay in and nothing is kept per process
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.local = threading.local()
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(_SCHEMA)
+            self.local.connection, self.local.pid = connection, os.getpid()
+        return connection
+
+    def save(self, rows):
+        # rows: (name, labels, counts to add)
+        connection = self.connection()
+        with connection:
+            # Read-modify-write, so take the write lock up front
+            connection.execute('BEGIN IMMEDIATE')
+            for name, labels, values in rows:
+                row = connection.execute(
+                    'SELECT series_values FROM totals WHERE name = ? AND labels = ?', (name, labels)).fetchone()
+                if row is not None:
+                    values = _add(json.loads(row[0]), values)
+                connection.execute('INSERT OR REPLACE INTO totals (name, labels, series_values) VALUES (?, ?, ?)',
+                                   (name, labels, json.dumps(values)))
+
+    def load(self):
+        return {(name, labels): json.loads(values) for name, labels, values
+                in self.connection().execute('SELECT name, labels, series_values FROM totals')}
+
+    def clear(self):
+        self.connection().execute('DELETE FROM totals')
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    path = str(getattr(settings, 'METRICS_DATABASE', settings.BASE_DIR / 'metrics.sqlite3'))
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = MetricsStore(path)
+        return _stores[path]
+
+
+def _label_text(labels, **extra):
+    labels = {**json.loads(labels), **extra}
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def render_prometheus():
+    # Prometheus text exposition format (version 0.0.4)
+    registry.flush()
+    totals = get_store().load()
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (series_name, labels), values in sorted(totals.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, count in zip([*buckets, '+Inf'], values[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_label_text(labels, le=bound)} {cumulative}')
+            lines.append(f'{name}_sum{_label_text(labels)} {values[-1]}')
+            lines.append(f'{name}_count{_label_text(labels)} {cumulative}')
+    lines += ['# HELP littlelemon_responses_total Responses by view, method and status.',
+              '# TYPE littlelemon_responses_total counter']
+    for (name, labels), value in sorted(totals.items()):
+        if name == 'littlelemon_responses_total':
+            lines.append(f'{name}{_label_text(labels)} {value}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,113 @@
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.text import compress_string
+
+from . import metrics, routers
+
+try:
+    import brotli
+except ImportError:  # in the Pipfile; gzip only without it
+    brotli = None
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    # Scopes ReadReplicaRouter's per-request state (see routers.py)
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = routers.begin_request(request.method)
+            try:
+                return await get_response(request)
+            finally:
+                routers.end_request(token)
+    else:
+        def middleware(request):
+            token = routers.begin_request(request.method)
+            try:
+                return get_response(request)
+            finally:
+                routers.end_request(token)
+    return middleware
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    # Outermost middleware: times the whole request (see metrics.py)
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not metrics.enabled():
+                return await get_response(request)
+            token = metrics.begin_request()
+            response = await get_response(request)
+            metrics.end_request(token, request, response)
+            return response
+    else:
+        def middleware(request):
+            if not metrics.enabled():
+                return get_response(request)
+            token = metrics.begin_request()
+            response = get_response(request)
+            metrics.end_request(token, request, response)
+            return response
+    return middleware
+
+# Brotli quality for responses compressed on the fly: 11 (the library
+# default) costs far more CPU for a few percent fewer bytes
+BROTLI_QUALITY = 5
+
+
+def _accepted_encodings(header):
+    encodings = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = params.strip().removeprefix('q=')
+        try:
+            if params and float(q) <= 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(coding.strip().lower())
+    return encodings
+
+
+def compress(request, response):
+    # Brotli or gzip (with Django's BREACH padding) for complete responses
+    # of at least COMPRESS_MIN_SIZE bytes; streams are left alone. HTML
+    # (the browsable API, which carries the CSRF token) is only gzipped:
+    # brotli output has nowhere to put the random padding.
+    if (response.streaming or response.has_header('Content-Encoding')
+            or len(response.content) < getattr(settings, 'COMPRESS_MIN_SIZE', 1024)):
+        return response
+    patch_vary_headers(response, ['Accept-Encoding'])
+    accepted = _accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    html = response.get('Content-Type', '').startswith('text/html')
+    if brotli is not None and 'br' in accepted and not html:
+        encoding, content = 'br', brotli.compress(response.content, quality=BROTLI_QUALITY)
+    elif 'gzip' in accepted:
+        encoding, content = 'gzip', compress_string(response.content, max_random_bytes=GZipMiddleware.max_random_bytes)
+    else:
+        return response
+    if len(content) >= len(response.content):
+        return response
+    response.content = content
+    response['Content-Length'] = str(len(content))
+    response['Content-Encoding'] = encoding
+    # The representation changed: a strong ETag may no longer claim byte equality
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    return response
+
+
+@sync_and_async_middleware
+def compression_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            return compress(request, await get_response(request))
+    else:
+        def middleware(request):
+            return compress(request, get_response(request))
+    return middleware
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from LittlelemonAPI import search
+    search.install(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    from LittlelemonAPI import search
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittlelemonAPI', '0004_alter_orderitem_unique_together_and_more'),
+    ]
+
+    operations = [
+        # SQLite FTS5 index over MenuItem.title, see LittlelemonAPI/search.py
+        migrations.RunPython(install, uninstall),
+    ]
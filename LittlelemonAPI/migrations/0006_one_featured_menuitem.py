@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:18
+
+from django.db import migrations, models
+
+
+def keep_latest_featured(apps, schema_editor):
+    MenuItem = apps.get_model('LittlelemonAPI', 'MenuItem')
+    latest = MenuItem.objects.filter(featured=True).order_by('-id').first()
+    if latest is not None:
+        MenuItem.objects.filter(featured=True).exclude(pk=latest.pk).update(featured=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittlelemonAPI', '0005_menuitem_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_latest_featured, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='menuitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('featured', True)), fields=('featured',), name='one_featured_menuitem'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:53
+
+import LittlelemonAPI.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittlelemonAPI', '0010_job_queue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='summary',
+            field=models.JSONField(editable=False, encoder=LittlelemonAPI.models.CompactJSONEncoder, null=True),
+        ),
+    ]
@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 
 class Category(models.Model):
     slug = models.SlugField()
@@ -12,8 +14,24 @@ class MenuItem(models.Model):
     price = models.DecimalField(max_digits=6, decimal_places=2, db_index=True)
     featured = models.BooleanField(db_index=True, default=False)
     category = models.ForeignKey(Category, on_delete=models.PROTECT, default=1)
+    class Meta:
+        indexes = [
+            # menu browsing by category, sorted by price
+            models.Index(fields=['category', 'price'], name='menuitem_category_price_idx'),
+        ]
+        constraints = [
+            # At most one item of the day; also keeps featured=True lookups on a tiny index
+            models.UniqueConstraint(fields=['featured'], condition=models.Q(featured=True), name='one_featured_menuitem'),
+        ]
     def __str__(self):
         return self.title
+    def save(self, *args, **kwargs):
+        if not self.featured:
+            return super().save(*args, **kwargs)
+        with transaction.atomic(using=kwargs.get('using')):
+            # Switching the item of the day touches the previous one only
+            MenuItem.objects.filter(featured=True).exclude(pk=self.pk).update(featured=False)
+            super().save(*args, **kwargs)
 
 class Cart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -24,12 +42,31 @@ class Cart(models.Model):
     class Meta:
         unique_together = ('menuitem', 'user')
 
+class CompactJSONEncoder(DjangoJSONEncoder):
+    # Stores JSON the way the API renders it (no spaces, UTF-8), so
+    # listings.py can copy stored text into responses without re-encoding
+    def __init__(self, *args, **kwargs):
+        kwargs.update(separators=(',', ':'), ensure_ascii=False)
+        super().__init__(*args, **kwargs)
+
 class Order(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     delivery_crew = models.ForeignKey(User, on_delete=models.SET_NULL, related_name="delivery_crew", null=True)
     status = models.BooleanField(db_index=True, default=False)
     total = models.DecimalField(max_digits=6, decimal_places=2)
     date = models.DateField(db_index=True, auto_now=True)
+    # Lines as OrderItemSerializer rendered them when the order was placed,
+    # so order history is read from this table alone (see checkout.py)
+    summary = models.JSONField(null=True, editable=False, encoder=CompactJSONEncoder)
+    class Meta:
+        indexes = [
+            # customer history, optionally by date range
+            models.Index(fields=['user', 'date'], name='order_user_date_idx'),
+            # crew view and open load per crew member
+            models.Index(fields=['delivery_crew', 'status'], name='order_crew_status_idx'),
+            # manager filters by status over a date range
+            models.Index(fields=['status', 'date'], name='order_status_date_idx'),
+        ]
     def __str__(self):
         return f"Order {self.id} by {self.user.username} on {self.date}"
 
@@ -38,4 +75,46 @@ class OrderItem(models.Model):
     menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
     quantity = models.SmallIntegerField()
     unit_price = models.DecimalField(max_digits=6, decimal_places=2)
-    price = models.DecimalField(max_digits=6, decimal_places=2)
\ No newline at end of file
+    price = models.DecimalField(max_digits=6, decimal_places=2)
+# Sales rollups, kept current by rollups.py and checked by the
+# rebuild_sales_rollups command. Menu item and category ids are plain
+# integers: sales history outlives the menu.
+class DailySales(models.Model):
+    date = models.DateField(unique=True)
+    orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+class DailyItemSales(models.Model):
+    date = models.DateField()
+    menuitem_id = models.IntegerField()
+    category_id = models.IntegerField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    class Meta:
+        constraints = [
+            # upsert key; also serves date-range scans
+            models.UniqueConstraint(fields=['date', 'menuitem_id', 'category_id'], name='dailyitemsales_key'),
+        ]
+
+# Background work (see jobs.py). Rows live in the main database so a job is
+# enqueued in the same transaction as the change that needs it.
+class Job(models.Model):
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    result = models.JSONField(null=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, related_name='+')
+    status = models.CharField(max_length=10, default=QUEUED)
+    attempts = models.SmallIntegerField(default=0)
+    max_attempts = models.SmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    # A running job whose lease ran out (its worker died) is claimed again
+    locked_until = models.DateTimeField(null=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True)
+    class Meta:
+        indexes = [
+            # due and expired jobs, oldest first
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
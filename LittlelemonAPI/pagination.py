@@ -0,0 +1,151 @@
+import base64
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    # Keyset (cursor) pagination over the queryset's own ordering plus 'id'
+    # as a tie-breaker. Each page is a range scan starting after the last
+    # row seen: no COUNT(*) and no OFFSET, so deep pages cost the same as
+    # the first one. Cursors are opaque to clients.
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'perpage'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    # Only non-null columns can be used as keys
+    ordering_fields = ('id',)
+
+    def __init__(self, ordering_fields=None, page_size=None):
+        if ordering_fields is not None:
+            self.ordering_fields = tuple(ordering_fields)
+        if page_size is not None:
+            self.page_size = page_size
+
+    @classmethod
+    def requested(cls, request):
+        return cls.cursor_query_param in request.query_params
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            raise ValidationError({self.page_size_query_param: 'A positive integer is required.'})
+        if size < 1:
+            raise ValidationError({self.page_size_query_param: 'A positive integer is required.'})
+        return min(size, self.max_page_size)
+
+    def get_keys(self, queryset):
+        keys = []
+        for term in queryset.query.order_by or ('id',):
+            if not isinstance(term, str):
+                raise ValidationError({'ordering': 'Unsupported ordering for cursor pagination.'})
+            field = term.lstrip('-')
+            field = 'id' if field == 'pk' else field
+            if field not in self.ordering_fields:
+                raise ValidationError({'ordering': f"'{field}' cannot be used with cursor pagination."})
+            keys.append((field, term.startswith('-')))
+        if 'id' not in [field for field, descending in keys]:
+            # Same direction as the last key so a (key, id) index serves the sort
+            keys.append(('id', keys[-1][1] if keys else False))
+        return keys
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({'v': values, 'r': reverse}, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            values, reverse = payload['v'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound('Invalid cursor.')
+        if not isinstance(values, list) or len(values) != len(self.keys):
+            raise NotFound('Invalid cursor.')
+        return values, reverse
+
+    def seek(self, values, reverse):
+        # (k1, k2, ...) strictly after `values` in the (possibly reversed) ordering
+        condition = Q()
+        for index, (field, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending != reverse else 'gt'
+            step = Q(**{previous: values[i] for i, (previous, _) in enumerate(self.keys[:index])})
+            condition |= step & Q(**{f'{field}__{lookup}': values[index]})
+        return condition
+
+    def page_queryset(self, queryset, request):
+        # The one query a page needs; evaluate it (sync or async) and pass
+        # the rows to set_page()
+        self.request = request
+        self.keys = self.get_keys(queryset)
+        self.size = self.get_page_size(request)
+        self.values, self.reverse = self.decode_cursor(request)
+        ordering = [('-' if descending != self.reverse else '') + field for field, descending in self.keys]
+        queryset = queryset.order_by(*ordering)
+        if self.values is not None:
+            queryset = queryset.filter(self.seek(self.values, self.reverse))
+        return queryset[:self.size + 1]
+
+    def set_page(self, rows):
+        rows = list(rows)
+        has_more = len(rows) > self.size
+        rows = rows[:self.size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = self.values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.values is not None
+        self.rows = rows
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(self.page_queryset(queryset, request))
+
+    def position(self, row):
+        return [getattr(row, field) for field, descending in self.keys]
+
+    def get_link(self, reverse):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        row = self.rows[0] if reverse else self.rows[-1]
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.position(row), reverse))
+
+    def get_next_link(self):
+        return self.get_link(False) if self.has_next and self.rows else None
+
+    def get_previous_link(self):
+        return self.get_link(True) if self.has_previous and self.rows else None
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class MenuItemPagination(PageNumberPagination):
+    # Page numbers for existing clients; ?cursor= (empty for the first page)
+    # switches to keyset pagination over ?ordering=price / title.
+    keyset_fields = ('id', 'price', 'title')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if KeysetPagination.requested(request):
+            self.keyset = KeysetPagination(self.keyset_fields)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
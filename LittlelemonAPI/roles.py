@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.core.cache import cache
+
+MANAGER = 'Manager'
+DELIVERY_CREW = 'Delivery crew'
+
+# Group names are memoized on the user instance for the rest of the request
+# and shared between requests (and workers, with a shared cache backend)
+# through the configured cache for ROLE_CACHE_TIMEOUT seconds.
+_ATTR = '_littlelemon_roles'
+
+
+def _cache_key(user_id):
+    return f'littlelemon:roles:{user_id}'
+
+
+def get_roles(user):
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, _ATTR, None)
+    if roles is not None:
+        return roles
+    key = _cache_key(user.pk)
+    roles = cache.get(key)
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        cache.set(key, roles, getattr(settings, 'ROLE_CACHE_TIMEOUT', 300))
+    setattr(user, _ATTR, roles)
+    return roles
+
+
+async def aget_roles(user):
+    # Async counterpart of get_roles() for async_views
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, _ATTR, None)
+    if roles is not None:
+        return roles
+    key = _cache_key(user.pk)
+    roles = await cache.aget(key)
+    if roles is None:
+        roles = frozenset([name async for name in user.groups.values_list('name', flat=True)])
+        await cache.aset(key, roles, getattr(settings, 'ROLE_CACHE_TIMEOUT', 300))
+    setattr(user, _ATTR, roles)
+    return roles
+
+
+def has_role(user, name):
+    return name in get_roles(user)
+
+
+def is_manager(user):
+    return has_role(user, MANAGER)
+
+
+def is_delivery_crew(user):
+    return has_role(user, DELIVERY_CREW)
+
+
+def invalidate_roles(*users):
+    # Accepts User instances or primary keys
+    keys = []
+    for user in users:
+        if hasattr(user, 'pk'):
+            user.__dict__.pop(_ATTR, None)
+            user = user.pk
+        keys.append(_cache_key(user))
+    if keys:
+        cache.delete_many(keys)
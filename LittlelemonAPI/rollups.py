@@ -0,0 +1,148 @@
+import contextlib
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connections, router
+from django.db.models import Sum
+
+from .models import Category, DailyItemSales, DailySales, MenuItem, Order, OrderItem
+
+# Daily sales and daily sales per menu item and category, maintained by
+# delta: placing an order adds it, deleting one subtracts it and changing
+# one (its total, or its date, which auto_now moves on every save)
+# subtracts the old version and adds the new one. Each change is one
+# upsert per table, run in the caller's transaction.
+
+
+def order_lines(order):
+    # [(menuitem_id, category_id, quantity, price)] as sold: from the
+    # summary when there is one, so later menu changes do not move sales
+    if order.summary is not None:
+        return [(line['menuitem']['id'], line['menuitem']['category']['id'], line['quantity'], Decimal(line['price']))
+                for line in order.summary]
+    return list(order.items.values_list('menuitem_id', 'menuitem__category_id', 'quantity', 'price'))
+
+
+class Delta:
+
+    def __init__(self):
+        self.days = defaultdict(lambda: [0, Decimal(0)])
+        self.items = defaultdict(lambda: [0, Decimal(0)])
+
+    def add(self, date, total, lines, sign=1):
+        day = self.days[date]
+        day[0] += sign
+        day[1] += sign * total
+        return self.add_lines(date, lines, sign)
+
+    def add_lines(self, date, lines, sign=1):
+        for menuitem_id, category_id, quantity, price in lines:
+            item = self.items[date, menuitem_id, category_id]
+            item[0] += sign * quantity
+            item[1] += sign * price
+        return self
+
+    def rows(self):
+        # Non-zero (date, orders, revenue) and (date, menuitem_id,
+        # category_id, quantity, revenue) rows
+        return ([(date, *values) for date, values in self.days.items() if any(values)],
+                [(*key, *values) for key, values in self.items.items() if any(values)])
+
+    def save(self):
+        days, items = self.rows()
+        _upsert(DailySales, ['date'], ['orders', 'revenue'], days)
+        _upsert(DailyItemSales, ['date', 'menuitem_id', 'category_id'], ['quantity', 'revenue'], items)
+
+
+def _upsert(model, keys, counters, rows):
+    # INSERT ... ON CONFLICT DO UPDATE adding to the counters, as in
+    # checkout.add_to_cart()
+    if not rows:
+        return
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = [*keys, *counters]
+    field = model._meta.get_field
+    updates = ', '.join(
+        f'{qn(name)} = ROUND({table}.{qn(name)} + excluded.{qn(name)}, 2)' if name == 'revenue'
+        else f'{qn(name)} = {table}.{qn(name)} + excluded.{qn(name)}'
+        for name in counters)
+    # Batched under the backend's query parameter limit (large deltas come
+    # from generate_data and the like)
+    batch_size = max(1, connection.ops.bulk_batch_size(columns, rows))
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            params = []
+            for row in batch:
+                params += [field(name).get_db_prep_save(value, connection) for name, value in zip(columns, row)]
+            placeholders = ', '.join(['(' + ', '.join(['%s'] * len(columns)) + ')'] * len(batch))
+            cursor.execute(
+                f'INSERT INTO {table} ({", ".join(qn(name) for name in columns)}) VALUES {placeholders} '
+                f'ON CONFLICT ({", ".join(qn(name) for name in keys)}) DO UPDATE SET {updates}', params)
+
+
+def recompute():
+    # The rollups as a Delta from scratch, from orders and their summaries
+    # (items for orders without one)
+    delta = Delta()
+    orders = Order.objects.only('date', 'total', 'summary').order_by('pk')
+    for order in orders.iterator(chunk_size=2000):
+        delta.add(order.date, order.total, order_lines(order) if order.summary is not None else [])
+    legacy_items = OrderItem.objects.filter(order__summary__isnull=True).values_list(
+        'order__date', 'menuitem_id', 'menuitem__category_id', 'quantity', 'price')
+    for date, *line in legacy_items.iterator(chunk_size=2000):
+        delta.add_lines(date, [line])
+    return delta
+
+
+def order_placed(order, lines=None):
+    Delta().add(order.date, order.total, order_lines(order) if lines is None else lines).save()
+
+
+def order_deleted(order):
+    # Call before deleting: the fallback lines are read from its items
+    Delta().add(order.date, order.total, order_lines(order), -1).save()
+
+
+@contextlib.contextmanager
+def order_changing(order):
+    # with order_changing(order): order.save()
+    date, total = order.date, order.total
+    yield
+    if (order.date, order.total) != (date, total):
+        lines = order_lines(order)
+        Delta().add(date, total, lines, -1).add(order.date, order.total, lines).save()
+
+
+def sales_report(date_from=None, date_to=None, top=10):
+    # Daily figures, top sellers by quantity and revenue per category over
+    # [date_from, date_to], read from the rollups only
+    days, items = DailySales.objects.order_by('date'), DailyItemSales.objects.all()
+    if date_from:
+        days, items = days.filter(date__gte=date_from), items.filter(date__gte=date_from)
+    if date_to:
+        days, items = days.filter(date__lte=date_to), items.filter(date__lte=date_to)
+    days = list(days.filter(orders__gt=0))
+    totals = {'units': Sum('quantity'), 'sales': Sum('revenue')}
+    top_items = list(items.values('menuitem_id').annotate(**totals)
+                     .filter(units__gt=0).order_by('-units', '-sales', 'menuitem_id')[:top])
+    categories = list(items.values('category_id').annotate(**totals)
+                      .filter(units__gt=0).order_by('-sales', 'category_id'))
+    # Titles as the menu has them now; None once an item or category is gone
+    titles = dict(MenuItem.objects.filter(pk__in=[row['menuitem_id'] for row in top_items]).values_list('id', 'title'))
+    for row in top_items:
+        row['title'] = titles.get(row['menuitem_id'])
+    titles = dict(Category.objects.filter(pk__in=[row['category_id'] for row in categories]).values_list('id', 'title'))
+    for row in categories:
+        row['title'] = titles.get(row['category_id'])
+    return {
+        'date_from': date_from,
+        'date_to': date_to,
+        'orders': sum(day.orders for day in days),
+        'revenue': sum((day.revenue for day in days), Decimal(0)),
+        'days': days,
+        'top_items': top_items,
+        'categories': categories,
+    }
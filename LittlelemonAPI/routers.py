@@ -0,0 +1,53 @@
+import contextvars
+
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Routing state of the current request, set by the replica routing
+# middleware. A dict so that writes made in a sync_to_async thread are seen
+# by the rest of the request. Outside a request everything uses the primary.
+_state = contextvars.ContextVar('littlelemon_db_routing', default=None)
+
+
+def begin_request(method):
+    return _state.set({'replica': method in SAFE_METHODS})
+
+
+def end_request(token):
+    _state.reset(token)
+
+
+def stick_to_primary():
+    # Read-your-writes: once a request has written, it reads from the primary
+    state = _state.get()
+    if state is not None:
+        state['replica'] = False
+
+
+def reading_from_replica():
+    state = _state.get()
+    return (state is not None and state['replica'] and REPLICA in settings.DATABASES
+            and not connections[PRIMARY].in_atomic_block)
+
+
+class ReadReplicaRouter:
+    # Reads of safe-method requests go to the read-only REPLICA connection
+    # until the request writes; everything else goes to the primary.
+
+    def db_for_read(self, model, **hints):
+        return REPLICA if reading_from_replica() else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        stick_to_primary()
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != REPLICA
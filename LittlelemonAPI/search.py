@@ -0,0 +1,116 @@
+import re
+
+from django.db import OperationalError, connections
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+from .models import MenuItem
+from .pagination import KeysetPagination
+
+# Menu titles are indexed in an SQLite FTS5 table that reads its content
+# from the menu item table; triggers keep it in sync on insert, update and
+# delete. Other databases, or SQLite builds without FTS5, fall back to
+# title__icontains.
+MENUITEM_TABLE = MenuItem._meta.db_table
+FTS_TABLE = MENUITEM_TABLE + '_fts'
+
+_INSTALL = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS "{FTS_TABLE}" USING fts5(
+        title, content='{MENUITEM_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')''',
+    f'''CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_ai" AFTER INSERT ON "{MENUITEM_TABLE}" BEGIN
+        INSERT INTO "{FTS_TABLE}"(rowid, title) VALUES (new.id, new.title);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_ad" AFTER DELETE ON "{MENUITEM_TABLE}" BEGIN
+        INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}", rowid, title) VALUES ('delete', old.id, old.title);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_au" AFTER UPDATE OF title ON "{MENUITEM_TABLE}" BEGIN
+        INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}", rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO "{FTS_TABLE}"(rowid, title) VALUES (new.id, new.title);
+    END''',
+]
+_TRIGGERS = [f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+
+
+def install(connection):
+    # Idempotent. Also run after every migrate, because SQLite table rebuilds
+    # during later migrations drop the triggers.
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)", [FTS_TABLE] + _TRIGGERS)
+        existing = {row[0] for row in cursor.fetchall()}
+        if len(existing) == 4:
+            return True
+        try:
+            for statement in _INSTALL:
+                cursor.execute(statement)
+        except OperationalError:
+            # No FTS5 in this SQLite build
+            return False
+        cursor.execute(f'INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}") VALUES (\'rebuild\')')
+    connection.__dict__.pop('_littlelemon_fts', None)
+    return True
+
+
+def uninstall(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for trigger in _TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS "{trigger}"')
+        cursor.execute(f'DROP TABLE IF EXISTS "{FTS_TABLE}"')
+    connection.__dict__.pop('_littlelemon_fts', None)
+
+
+def available(using='default'):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    if '_littlelemon_fts' not in connection.__dict__:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+            connection._littlelemon_fts = cursor.fetchone() is not None
+    return connection._littlelemon_fts
+
+
+def match_expression(terms):
+    # Every term must match as a prefix: 'brus cake' -> "brus"* AND "cake"*
+    tokens = [token for term in terms for token in re.findall(r'\w+', term)]
+    return ' AND '.join(f'"{token}"*' for token in tokens)
+
+
+def search_menu_items(queryset, terms, rank=True):
+    if isinstance(terms, str):
+        terms = terms.split()
+    if not available(queryset.db):
+        for term in terms:
+            queryset = queryset.filter(title__icontains=term)
+        return queryset
+    expression = match_expression(terms)
+    if not expression:
+        return queryset
+    if rank and not queryset.query.order_by:
+        # Joined so SQLite drives the query from the index and reads bm25
+        # rank (lower is more relevant) for matching rows only
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'"{FTS_TABLE}".rowid = "{MENUITEM_TABLE}"."id"', f'"{FTS_TABLE}" MATCH %s'],
+            params=[expression],
+            select={'search_rank': f'"{FTS_TABLE}".rank'},
+            order_by=['search_rank'],
+        )
+    queryset = queryset.filter(id__in=RawSQL(
+        f'SELECT rowid FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH %s', (expression,)))
+    return queryset
+
+
+class MenuSearchFilter(SearchFilter):
+    # ?search= on menu titles through the full-text index
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or queryset.model is not MenuItem:
+            return super().filter_queryset(request, queryset, view)
+        # Keyset pages need a column ordering, so relevance order is skipped there
+        return search_menu_items(queryset, terms, rank=not KeysetPagination.requested(request))
@@ -1,32 +1,57 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User, Group
-from . import models
+from django.db.models import Prefetch, prefetch_related_objects
+from . import metrics, models
 
-class GroupSerializer(serializers.ModelSerializer):    
+# setup_eager_loading() returns the queryset a serializer needs to render
+# many rows with a fixed number of queries: to-one relations are joined,
+# to-many relations are prefetched and unused User columns (password hash,
+# names, timestamps) are never loaded.
+USER_FIELDS = ['id', 'username', 'email']
+
+class TimedModelSerializer(metrics.SerializerTimingMixin, serializers.ModelSerializer):
+    # Reported as serializer time in Server-Timing and /api/metrics
+    pass
+
+class GroupSerializer(TimedModelSerializer):    
     class Meta:
         model = Group
         fields = ['name']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedModelSerializer):
     groups = GroupSerializer(read_only=True, many=True)
     class Meta:
         model = User
         fields = ['username', 'id', 'email', 'groups']
 
-class CategorySerializer(serializers.ModelSerializer):
+    @staticmethod
+    def setup_eager_loading(queryset, prefix=''):
+        queryset = queryset.prefetch_related(
+            Prefetch(prefix + 'groups', queryset=Group.objects.only('id', 'name')))
+        if not prefix:
+            queryset = queryset.only(*USER_FIELDS)
+        return queryset
+
+class CategorySerializer(TimedModelSerializer):
     class Meta:
         model = models.Category
         fields = ['id', 'slug', 'title']
         
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuItemSerializer(TimedModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.IntegerField(write_only=True)
     class Meta:
         model = models.MenuItem
         fields = ['id', 'title', 'price', 'featured', 'category', 'category_id']
         depth = 1
+        # MenuItem.save() moves the item of the day instead of rejecting a second one
+        extra_kwargs = {'featured': {'validators': []}}
 
-class CartSerializer(serializers.ModelSerializer):
+    @staticmethod
+    def setup_eager_loading(queryset, prefix=''):
+        return queryset.select_related(prefix + 'category')
+
+class CartSerializer(TimedModelSerializer):
     menuitem = MenuItemSerializer(read_only=True)
     menuitem_id = serializers.IntegerField(write_only=True)
     user = UserSerializer(read_only=True)
@@ -35,18 +60,105 @@ class CartSerializer(serializers.ModelSerializer):
         model = models.Cart
         fields = ['user', 'user_id', 'menuitem', 'menuitem_id', 'quantity', 'unit_price', 'price']
 
-class OrderItemSerializer(serializers.ModelSerializer):
-    user_id = serializers.IntegerField()
+    @staticmethod
+    def setup_eager_loading(queryset):
+        queryset = MenuItemSerializer.setup_eager_loading(queryset, prefix='menuitem__')
+        queryset = UserSerializer.setup_eager_loading(queryset.select_related('user'), prefix='user__')
+        return queryset.defer(*[
+            'user__' + field.name for field in User._meta.concrete_fields
+            if field.name not in USER_FIELDS
+        ])
+
+class CartEntrySerializer(serializers.Serializer):
+    # One line of an add-to-cart request
+    menu_item_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(default=1, min_value=1, max_value=1000)
+
+class OrderItemSerializer(TimedModelSerializer):
     menuitem = MenuItemSerializer(read_only=True)
     menuitem_id = serializers.IntegerField(write_only=True)
     class Meta:
         model = models.OrderItem
-        fields = ['user_id', 'menuitem', 'menuitem_id', 'quantity', 'unit_price', 'price']
+        fields = ['menuitem', 'menuitem_id', 'quantity', 'unit_price', 'price']
 
-class OrderSerializer(serializers.ModelSerializer):
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return MenuItemSerializer.setup_eager_loading(queryset, prefix='menuitem__')
+
+class OrderSerializer(TimedModelSerializer):
     user_id = serializers.IntegerField(write_only=True)
-    orderitem = OrderItemSerializer(read_only=True)
-    orderitem_id = serializers.IntegerField(write_only=True)
+    items = OrderItemSerializer(read_only=True, many=True)
     class Meta:
         model = models.Order
-        fields = ['id', 'user_id', 'delivery_crew','status', 'total', 'date', 'orderitem', 'orderitem_id']
\ No newline at end of file
+        fields = ['id', 'user_id', 'delivery_crew','status', 'total', 'date', 'items']
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        items = OrderItemSerializer.setup_eager_loading(models.OrderItem.objects.all())
+        return queryset.prefetch_related(Prefetch('items', queryset=items))
+
+def order_summary(order_items):
+    # Order.summary: the lines exactly as OrderItemSerializer renders them
+    # (decimals are already strings, so this is plain JSON)
+    return list(OrderItemSerializer(order_items, many=True).data)
+
+class OrderHistoryListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        orders = list(data.all() if hasattr(data, 'all') else data)
+        OrderHistorySerializer.prefetch_missing_items(orders)
+        return super().to_representation(orders)
+
+class OrderHistorySerializer(OrderSerializer):
+    # Read-only listing served from Order.summary; orders placed before
+    # summaries existed (see backfill_order_summaries) fall back to the join
+    items = serializers.SerializerMethodField()
+    class Meta(OrderSerializer.Meta):
+        list_serializer_class = OrderHistoryListSerializer
+
+    def get_items(self, order):
+        if order.summary is not None:
+            return order.summary
+        return OrderItemSerializer(order.items.all(), many=True).data
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset
+
+    @staticmethod
+    def prefetch_missing_items(orders):
+        # One query for all orders without a summary, none otherwise
+        items = OrderItemSerializer.setup_eager_loading(models.OrderItem.objects.all())
+        prefetch_related_objects(
+            [order for order in orders if order.summary is None], Prefetch('items', queryset=items))
+
+class JobSerializer(TimedModelSerializer):
+    class Meta:
+        model = models.Job
+        fields = ['id', 'name', 'status', 'attempts', 'result', 'error', 'created', 'finished']
+
+class DailySalesSerializer(TimedModelSerializer):
+    class Meta:
+        model = models.DailySales
+        fields = ['date', 'orders', 'revenue']
+
+class ItemSalesSerializer(serializers.Serializer):
+    menuitem_id = serializers.IntegerField()
+    title = serializers.CharField(allow_null=True)
+    quantity = serializers.IntegerField(source='units')
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2, source='sales')
+
+class CategorySalesSerializer(serializers.Serializer):
+    category_id = serializers.IntegerField()
+    title = serializers.CharField(allow_null=True)
+    quantity = serializers.IntegerField(source='units')
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2, source='sales')
+
+class SalesReportSerializer(serializers.Serializer):
+    # rollups.sales_report()
+    date_from = serializers.DateField(allow_null=True)
+    date_to = serializers.DateField(allow_null=True)
+    orders = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    days = DailySalesSerializer(many=True)
+    top_items = ItemSalesSerializer(many=True)
+    categories = CategorySalesSerializer(many=True)
@@ -0,0 +1,68 @@
+from django.contrib.auth.models import User, Group
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from . import authentication, catalog, database, metrics, roles, search
+from .models import Category, MenuItem
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles_on_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        # user.groups.add(...) / remove(...) / clear()
+        roles.invalidate_roles(instance)
+    elif action == 'pre_clear':
+        # group.user_set.clear()
+        roles.invalidate_roles(*instance.user_set.values_list('pk', flat=True))
+    else:
+        # group.user_set.add(...) / remove(...)
+        roles.invalidate_roles(*pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_roles_on_group_change(sender, instance, created=False, **kwargs):
+    if not created:
+        roles.invalidate_roles(*instance.user_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalog_version(sender, **kwargs):
+    # Bumped now and again after commit, so a reader that cached
+    # pre-commit rows under the new version is invalidated as well.
+    catalog.bump_version()
+    transaction.on_commit(catalog.bump_version)
+
+
+@receiver(post_migrate)
+def install_search_index(sender, using, **kwargs):
+    if sender.name == 'LittlelemonAPI':
+        search.install(connections[using])
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def forget_cached_token(sender, instance, **kwargs):
+    authentication.forget_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_cached_user_tokens(sender, instance, created=False, **kwargs):
+    if not created:
+        authentication.forget_user_tokens(instance)
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    database.apply_pragmas(connection)
+    database.begin_immediate(connection)
+    metrics.install(connection)
@@ -1,3 +1,1688 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User, Group
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import authentication, catalog, checkout, dispatch, formats, jobs, listings, metrics, middleware, models, roles, routers, search, serializers, throttling
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    THROTTLE_DATABASE=Path(tempfile.gettempdir()) / f'littlelemon-test-throttle-{os.getpid()}.sqlite3',
+    METRICS_DATABASE=Path(tempfile.gettempdir()) / f'littlelemon-test-metrics-{os.getpid()}.sqlite3',
+)
+class LittlelemonTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.managers = Group.objects.create(name=roles.MANAGER)
+        cls.crews = Group.objects.create(name=roles.DELIVERY_CREW)
+        cls.admin = User.objects.create_user('admin', password='admin', is_staff=True)
+        cls.manager = User.objects.create_user('manager1', password='manager')
+        cls.manager.groups.add(cls.managers)
+        cls.crew = User.objects.create_user('delivery1', password='delivery')
+        cls.crew.groups.add(cls.crews)
+        cls.customer = User.objects.create_user('customer1', password='customer')
+        cls.category = models.Category.objects.create(slug='mains', title='Mains')
+
+    def setUp(self):
+        # Throttle history, roles and tokens live in the caches
+        for backend in caches.all():
+            backend.clear()
+        throttling.get_store().clear()
+        metrics.registry.clear()
+        metrics.get_store().clear()
+
+    def client_for(self, user):
+        token, created = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        return client
+
+
+class RoleCacheTests(LittlelemonTestCase):
+
+    def fresh(self, user):
+        # A new instance, like the one the authentication class loads per request
+        return User.objects.get(pk=user.pk)
+
+    def test_roles_are_resolved_once_per_request(self):
+        user = self.fresh(self.manager)
+        with self.assertNumQueries(1):
+            self.assertTrue(roles.is_manager(user))
+            self.assertFalse(roles.is_delivery_crew(user))
+            self.assertTrue(roles.is_manager(user))
+
+    def test_warm_cache_costs_no_queries(self):
+        roles.get_roles(self.fresh(self.crew))
+        user = self.fresh(self.crew)
+        with self.assertNumQueries(0):
+            self.assertTrue(roles.is_delivery_crew(user))
+            self.assertFalse(roles.is_manager(user))
+
+    def test_anonymous_user_has_no_roles(self):
+        from django.contrib.auth.models import AnonymousUser
+        with self.assertNumQueries(0):
+            self.assertEqual(roles.get_roles(AnonymousUser()), frozenset())
+
+    def test_endpoint_role_check_costs_no_queries_on_warm_cache(self):
+        client = self.client_for(self.customer)
+        client.patch('/api/orders/1/update-status/')
+        # Neither the token nor the roles hit the database once cached
+        with self.assertNumQueries(0):
+            response = client.patch('/api/orders/1/update-status/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_manager_set_invalidates(self):
+        self.assertFalse(roles.is_manager(self.fresh(self.customer)))
+        response = self.client_for(self.manager).post(
+            '/api/groups/manager/users', {'username': 'customer1'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(roles.is_manager(self.fresh(self.customer)))
+
+    def test_manager_delete_invalidates(self):
+        other = User.objects.create_user('manager2', password='manager')
+        other.groups.add(self.managers)
+        self.assertTrue(roles.is_manager(self.fresh(other)))
+        response = self.client_for(self.manager).delete(f'/api/groups/manager/users/{other.pk}')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(roles.is_manager(self.fresh(other)))
+
+    def test_delivery_set_invalidates(self):
+        self.assertFalse(roles.is_delivery_crew(self.fresh(self.customer)))
+        response = self.client_for(self.manager).post(
+            '/api/groups/delivery-crew/users', {'username': 'customer1'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(roles.is_delivery_crew(self.fresh(self.customer)))
+
+    def test_delivery_delete_invalidates(self):
+        self.assertTrue(roles.is_delivery_crew(self.fresh(self.crew)))
+        response = self.client_for(self.manager).delete(f'/api/groups/delivery-crew/{self.crew.pk}')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(roles.is_delivery_crew(self.fresh(self.crew)))
+
+    def test_assign_to_delivery_crew_invalidates(self):
+        self.assertFalse(roles.is_delivery_crew(self.fresh(self.customer)))
+        response = self.client_for(self.admin).patch(f'/api/assign-to-delivery-crew/{self.customer.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(roles.is_delivery_crew(self.fresh(self.customer)))
+
+    def test_group_clear_invalidates(self):
+        self.assertTrue(roles.is_manager(self.fresh(self.manager)))
+        self.managers.user_set.clear()
+        self.assertFalse(roles.is_manager(self.fresh(self.manager)))
+
+
+class QueryBudgetTests(LittlelemonTestCase):
+    # Queries per request, token lookup included, on a warm role cache.
+    # The budget must hold whatever the number of rows.
+
+    def seed(self, rows):
+        start = models.MenuItem.objects.count()
+        for i in range(start, start + rows):
+            category = models.Category.objects.create(slug=f'c{i}', title=f'Category {i}')
+            item = models.MenuItem.objects.create(title=f'Item {i}', price=i + 1, category=category)
+            models.Cart.objects.create(user=self.customer, menuitem=item, quantity=2,
+                                       unit_price=item.price, price=item.price * 2)
+            order = models.Order.objects.create(user=self.customer, delivery_crew=self.crew, total=item.price)
+            for quantity in (1, 2):
+                models.OrderItem.objects.create(order=order, menuitem=item, quantity=quantity,
+                                                unit_price=item.price, price=item.price * quantity)
+            user = User.objects.create_user(f'staff{i}', password='staff')
+            user.groups.add(self.managers, self.crews)
+
+    def assertQueryBudget(self, user, url, budget):
+        client = self.client_for(user)
+        client.get(url)
+        counts = []
+        for rows in (2, 10):
+            self.seed(rows)
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertLessEqual(len(context), budget, [q['sql'] for q in context])
+            for query in context:
+                if 'authtoken_token' not in query['sql']:
+                    self.assertNotIn('"password"', query['sql'])
+            counts.append(len(context))
+        self.assertEqual(counts[0], counts[1], f'{url} issues queries per row')
+
+    def test_all_menu_items(self):
+        self.assertQueryBudget(self.customer, '/api/all-menu-items', 2)
+
+    def test_menu_items(self):
+        self.assertQueryBudget(self.customer, '/api/menu-items?ordering=price', 3)
+
+    def test_category(self):
+        self.assertQueryBudget(self.customer, '/api/category', 2)
+
+    def test_view_cart(self):
+        self.assertQueryBudget(self.customer, '/api/view-cart/', 3)
+
+    def test_user_orders(self):
+        self.assertQueryBudget(self.customer, '/api/user-orders/', 3)
+
+    def test_orders_as_manager(self):
+        self.assertQueryBudget(self.manager, '/api/orders?perpage=50', 4)
+
+    def test_orders_as_delivery_crew(self):
+        self.assertQueryBudget(self.crew, '/api/orders', 3)
+
+    def test_orders_as_customer(self):
+        self.assertQueryBudget(self.customer, '/api/orders', 3)
+
+    def test_manager_users(self):
+        self.assertQueryBudget(self.manager, '/api/groups/manager/users', 3)
+
+    def test_delivery_crew_users(self):
+        self.assertQueryBudget(self.manager, '/api/groups/delivery-crew/users', 3)
+
+
+class PlaceOrderTests(LittlelemonTestCase):
+
+    def fill_cart(self, lines, user=None):
+        user = user or self.customer
+        for i in range(lines):
+            item = models.MenuItem.objects.create(title=f'Dish {i}', price=i + 1, category=self.category)
+            models.Cart.objects.create(user=user, menuitem=item, quantity=2,
+                                       unit_price=item.price, price=item.price * 2)
+
+    def test_place_order(self):
+        self.fill_cart(3)
+        response = self.client_for(self.customer).post('/api/place-order/')
+        self.assertEqual(response.status_code, 201)
+        order = models.Order.objects.get(user=self.customer)
+        self.assertEqual(order.total, 2 * (1 + 2 + 3))
+        self.assertEqual(order.items.count(), 3)
+        self.assertFalse(models.Cart.objects.filter(user=self.customer).exists())
+
+    def test_empty_cart(self):
+        response = self.client_for(self.customer).post('/api/place-order/')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(models.Order.objects.exists())
+
+    def test_second_submit_finds_empty_cart(self):
+        self.fill_cart(2)
+        self.assertIsNotNone(checkout.place_order(self.customer))
+        self.assertIsNone(checkout.place_order(self.customer))
+        self.assertEqual(models.Order.objects.count(), 1)
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        self.fill_cart(1)
+        with CaptureQueriesContext(connection) as small:
+            checkout.place_order(self.customer)
+        self.fill_cart(50)
+        with CaptureQueriesContext(connection) as large:
+            checkout.place_order(self.customer)
+        self.assertEqual(len(small), len(large))
+
+    def test_failure_rolls_back(self):
+        self.fill_cart(2)
+        with mock.patch.object(models.OrderItem.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                checkout.place_order(self.customer)
+        self.assertFalse(models.Order.objects.exists())
+        self.assertEqual(models.Cart.objects.filter(user=self.customer).count(), 2)
+
+    def test_legacy_orders_post(self):
+        client = self.client_for(self.customer)
+        self.assertEqual(client.post('/api/orders').status_code, 404)
+        self.fill_cart(2)
+        self.assertEqual(client.post('/api/orders').status_code, 201)
+        self.assertEqual(models.OrderItem.objects.filter(order__user=self.customer).count(), 2)
+
+
+class CatalogCacheTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.item = models.MenuItem.objects.create(title='Bruschetta', price=5, category=self.category)
+        self.client = APIClient()
+
+    def test_warm_catalog_costs_no_queries(self):
+        first = self.client.get('/api/all-menu-items')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/all-menu-items')
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get('/api/all-menu-items')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/all-menu-items', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_menu_items_view_is_cached_per_query(self):
+        by_price = self.client.get('/api/menu-items?ordering=price')['ETag']
+        by_title = self.client.get('/api/menu-items?ordering=-price')['ETag']
+        self.assertNotEqual(by_price, by_title)
+        response = self.client.get('/api/menu-items?ordering=price', HTTP_IF_NONE_MATCH=by_price)
+        self.assertEqual(response.status_code, 304)
+
+    def assertBumped(self, write):
+        etag = self.client.get('/api/all-menu-items')['ETag']
+        write()
+        response = self.client.get('/api/all-menu-items', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def test_other_workers_see_the_bump(self):
+        # Another worker, with its own connection to the version file
+        other = catalog.VersionStore(catalog.get_store().path)
+        self.assertBumped(other.bump)
+        etag = self.client.get('/api/all-menu-items')['ETag']
+        self.assertEqual(etag.split('-')[0], f'"{other.get()}')
+
+    def test_menu_item_update_bumps(self):
+        client = self.client_for(self.manager)
+        response = self.assertBumped(lambda: client.patch(
+            f'/api/menu-items/{self.item.pk}', {'title': 'Focaccia'}, format='json'))
+        self.assertEqual(response.json()[0]['title'], 'Focaccia')
+
+    def test_menu_item_delete_bumps(self):
+        client = self.client_for(self.manager)
+        response = self.assertBumped(lambda: client.delete(f'/api/menu-items/{self.item.pk}'))
+        self.assertEqual(response.json(), [])
+
+    def test_menu_item_create_bumps(self):
+        client = self.client_for(self.admin)
+        self.assertBumped(lambda: client.post('/api/menu-items', {
+            'title': 'Leftovers', 'price': '9.99', 'featured': False, 'category_id': self.category.pk,
+        }, format='json'))
+
+    def test_item_of_the_day_bumps(self):
+        client = self.client_for(self.admin)
+        response = self.assertBumped(lambda: client.patch(f'/api/menu-items/{self.item.pk}/feature/'))
+        self.assertTrue(response.json()[0]['featured'])
+
+    def test_category_write_bumps(self):
+        client = self.client_for(self.manager)
+        self.assertBumped(lambda: client.patch(
+            f'/api/category/{self.category.pk}', {'title': 'Starters'}, format='json'))
+
+
+class KeysetPaginationTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Duplicate prices exercise the id tie-breaker
+        for i in range(7):
+            models.MenuItem.objects.create(title=f'Dish {i}', price=[3, 1, 2][i % 3], category=self.category)
+        self.client = APIClient()
+
+    def walk(self, client, url, key='next'):
+        ids, pages = [], 0
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in context))
+            ids.extend(row['id'] for row in response.json()['results'])
+            url = response.json()[key]
+            pages += 1
+        return ids, pages
+
+    def test_menu_items_forward(self):
+        ids, pages = self.walk(self.client, '/api/menu-items?ordering=price&cursor=')
+        expected = list(models.MenuItem.objects.order_by('price', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_menu_items_backward(self):
+        url = '/api/menu-items?ordering=-price&cursor=&perpage=2'
+        response = self.client.get(url)
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'])
+        last_page = [row['id'] for row in response.json()['results']]
+        ids, pages = self.walk(self.client, response.json()['previous'], key='previous')
+        expected = list(models.MenuItem.objects.order_by('-price', '-id').values_list('id', flat=True))
+        # Pages come back in reverse, rows within a page keep their order
+        self.assertEqual(sorted(ids + last_page), sorted(expected))
+        self.assertEqual(ids[:2], expected[-3:-1])
+
+    def test_page_numbers_still_work(self):
+        response = self.client.get('/api/menu-items?page=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 7)
+
+    def test_unsupported_ordering(self):
+        response = self.client.get('/api/menu-items?ordering=category&cursor=')
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/menu-items?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+    def test_manager_orders_by_date(self):
+        for i in range(5):
+            models.Order.objects.create(user=self.customer, total=i)
+        ids, pages = self.walk(self.client_for(self.manager), '/api/orders?ordering=-date&cursor=')
+        expected = list(models.Order.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_manager_order_pages_are_ordered(self):
+        import warnings
+        from django.core.paginator import UnorderedObjectListWarning
+        for i in range(5):
+            models.Order.objects.create(user=self.customer, total=i)
+        client = self.client_for(self.manager)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UnorderedObjectListWarning)
+            ids = [order['id'] for page in (1, 2, 3) for order in client.get(f'/api/orders?page={page}').json()]
+        self.assertEqual(ids, list(models.Order.objects.order_by('pk').values_list('id', flat=True)))
+
+
+class ExportOrdersTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        item = models.MenuItem.objects.create(title='Lasagne', price=12, category=self.category)
+        for day in (1, 2, 3):
+            order = models.Order.objects.create(user=self.customer, total=24)
+            models.Order.objects.filter(pk=order.pk).update(date=datetime.date(2024, 5, day))
+            models.OrderItem.objects.create(order=order, menuitem=item, quantity=2, unit_price=12, price=24)
+        models.Order.objects.filter(date=datetime.date(2024, 5, 3)).first().items.all().delete()
+
+    def content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response = self.client_for(self.manager).get('/api/orders/export.ndjson')
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in self.content(response).splitlines()]
+        self.assertEqual([row['date'] for row in rows], ['2024-05-01', '2024-05-02', '2024-05-03'])
+        self.assertEqual(rows[0]['items'], [{
+            'menuitem_id': 1, 'title': 'Lasagne', 'quantity': 2, 'unit_price': '12.00', 'price': '24.00',
+        }])
+        self.assertEqual(rows[2]['items'], [])
+
+    def test_csv_with_date_range(self):
+        response = self.client_for(self.manager).get('/api/orders/export.csv?from=2024-05-02&to=2024-05-03')
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.DictReader(io.StringIO(self.content(response))))
+        self.assertEqual([row['date'] for row in rows], ['2024-05-02', '2024-05-03'])
+        self.assertEqual(rows[0]['menuitem_title'], 'Lasagne')
+        self.assertEqual(rows[1]['menuitem_id'], '')
+
+    def test_query_count_does_not_grow_with_orders(self):
+        client = self.client_for(self.manager)
+        client.get('/api/orders/export.ndjson')
+        with CaptureQueriesContext(connection) as context:
+            self.content(client.get('/api/orders/export.ndjson'))
+        # orders, items
+        self.assertEqual(len(context), 2)
+
+    def test_invalid_date(self):
+        response = self.client_for(self.manager).get('/api/orders/export.csv?from=May')
+        self.assertEqual(response.status_code, 400)
+
+    def test_managers_only(self):
+        response = self.client_for(self.customer).get('/api/orders/export.csv')
+        self.assertEqual(response.status_code, 403)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        import warnings
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+        token, created = await sync_to_async(Token.objects.get_or_create)(user=self.manager)
+        for fmt in ('ndjson', 'csv'):
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                response = await AsyncClient().get(f'/api/orders/export.{fmt}',
+                                                   headers={'Authorization': 'Token ' + token.key})
+                self.assertTrue(response.is_async)
+                content = b''.join([chunk async for chunk in response.streaming_content]).decode()
+            self.assertFalse([w for w in caught if 'synchronous iterators' in str(w.message)])
+            self.assertEqual(len(content.splitlines()), 3 if fmt == 'ndjson' else 4)
+
+
+class MenuSearchTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for title in ('Greek salad', 'Greek Greek salad', 'Bruschetta', 'Lemon dessert'):
+            models.MenuItem.objects.create(title=title, price=5, category=self.category)
+        self.client = APIClient()
+
+    def titles(self, query):
+        response = self.client.get('/api/menu-items?search=' + query)
+        self.assertEqual(response.status_code, 200)
+        return [row['title'] for row in response.json()['results']]
+
+    def test_index_is_installed(self):
+        self.assertTrue(search.available())
+
+    def test_prefix_match(self):
+        self.assertEqual(self.titles('brus'), ['Bruschetta'])
+
+    def test_all_terms_must_match(self):
+        self.assertEqual(sorted(self.titles('gre sal')), ['Greek Greek salad', 'Greek salad'])
+        self.assertEqual(self.titles('greek lemon'), [])
+
+    def test_ranked_by_relevance(self):
+        self.assertEqual(self.titles('greek'), ['Greek Greek salad', 'Greek salad'])
+
+    def test_explicit_ordering_wins(self):
+        response = self.client.get('/api/menu-items?search=greek&ordering=-title')
+        self.assertEqual([row['title'] for row in response.json()['results']], ['Greek salad', 'Greek Greek salad'])
+
+    def test_index_follows_writes(self):
+        item = models.MenuItem.objects.get(title='Bruschetta')
+        item.title = 'Focaccia'
+        item.save()
+        self.assertEqual(self.titles('brus'), [])
+        self.assertEqual(self.titles('foc'), ['Focaccia'])
+        item.delete()
+        self.assertEqual(self.titles('foc'), [])
+        models.MenuItem.objects.create(title='Tiramisu', price=6, category=self.category)
+        self.assertEqual(self.titles('tira'), ['Tiramisu'])
+
+    def test_punctuation_is_not_query_syntax(self):
+        self.assertEqual(self.titles('"lemon OR*'), [])
+        self.assertEqual(self.titles('lemon-'), ['Lemon dessert'])
+
+    def test_fallback_without_index(self):
+        with mock.patch.object(search, 'available', return_value=False):
+            self.assertEqual(self.titles('ruschet'), ['Bruschetta'])
+
+
+class ItemOfTheDayTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.items = [models.MenuItem.objects.create(title=f'Dish {i}', price=5, category=self.category)
+                      for i in range(20)]
+
+    def feature(self, item):
+        return self.client_for(self.admin).patch(f'/api/menu-items/{item.pk}/feature/')
+
+    def test_switch_touches_two_rows(self):
+        self.feature(self.items[3])
+        with CaptureQueriesContext(connection) as context:
+            response = self.feature(self.items[7])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['featured'])
+        updates = [query['sql'] for query in context if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)
+        self.assertIn('"featured"', updates[0].split('WHERE')[1])
+        self.assertEqual(list(models.MenuItem.objects.filter(featured=True)), [self.items[7]])
+
+    def test_featured_write_through_serializer_switches(self):
+        self.feature(self.items[0])
+        response = self.client_for(self.admin).post('/api/menu-items', {
+            'title': 'Special', 'price': '9.99', 'featured': True, 'category_id': self.category.pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(list(models.MenuItem.objects.filter(featured=True).values_list('title', flat=True)),
+                         ['Special'])
+
+    def test_only_one_featured_row_allowed(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.MenuItem.objects.filter(pk__in=[self.items[0].pk, self.items[1].pk]).update(featured=True)
+
+    def test_featured_read_is_index_backed(self):
+        sql, params = models.MenuItem.objects.filter(featured=True).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('USING INDEX', plan)
+
+
+class QueryPlanTests(LittlelemonTestCase):
+    # Runs EXPLAIN QUERY PLAN on every query an endpoint issues and fails on
+    # a temporary B-tree sort, or on a full scan of any table the endpoint is
+    # not meant to list in full.
+
+    def setUp(self):
+        super().setUp()
+        item = models.MenuItem.objects.create(title='Moussaka', price=14, category=self.category)
+        models.Cart.objects.create(user=self.customer, menuitem=item, quantity=1, unit_price=14, price=14)
+        order = models.Order.objects.create(user=self.customer, delivery_crew=self.crew, total=14)
+        models.OrderItem.objects.create(order=order, menuitem=item, quantity=1, unit_price=14, price=14)
+
+    def assertIndexed(self, user, url, allow_scan=()):
+        allowed = [models.MenuItem._meta.db_table if name == 'menuitem' else f'LittlelemonAPI_{name}'
+                   for name in allow_scan]
+        client = self.client_for(user) if user else APIClient()
+        client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        checked = 0
+        for query in context:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or 'authtoken_token' in sql or 'auth_group' in sql:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+            checked += 1
+            for step in plan:
+                self.assertNotIn('TEMP B-TREE', step, f'{url}: {sql}\n{plan}')
+                if step.startswith('SCAN ') and 'VIRTUAL TABLE' not in step:
+                    table = step.split()[1]
+                    self.assertIn(table, allowed, f'{url}: full scan\n{sql}\n{plan}')
+        self.assertGreater(checked, 0)
+
+    def test_all_menu_items(self):
+        self.assertIndexed(None, '/api/all-menu-items', allow_scan=['menuitem'])
+
+    def test_menu_items_by_category_sorted_by_price(self):
+        self.assertIndexed(None, f'/api/menu-items?category={self.category.pk}&ordering=price')
+
+    def test_menu_items_keyset_by_price(self):
+        self.assertIndexed(None, '/api/menu-items?ordering=-price&cursor=', allow_scan=['menuitem'])
+
+    def test_menu_search(self):
+        self.assertIndexed(None, '/api/menu-items?search=mous')
+
+    def test_view_cart(self):
+        self.assertIndexed(self.customer, '/api/view-cart/')
+
+    def test_user_orders(self):
+        self.assertIndexed(self.customer, '/api/user-orders/')
+
+    def test_orders_as_customer(self):
+        self.assertIndexed(self.customer, '/api/orders')
+
+    def test_orders_as_delivery_crew(self):
+        self.assertIndexed(self.crew, '/api/orders')
+
+    def test_orders_as_manager_by_date(self):
+        self.assertIndexed(self.manager, '/api/orders?ordering=-date&cursor=', allow_scan=['order'])
+
+    def test_order_export_by_date_range(self):
+        self.assertIndexed(self.manager, '/api/orders/export.ndjson?from=2024-01-01&to=2024-12-31')
+
+
+class CachedTokenAuthenticationTests(LittlelemonTestCase):
+
+    def test_warm_token_costs_no_queries(self):
+        client = self.client_for(self.customer)
+        client.get('/api/view-cart/')
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(client.get('/api/view-cart/').status_code, 200)
+        self.assertFalse(any('authtoken_token' in query['sql'] for query in context))
+
+    def test_login_flow_is_unchanged(self):
+        response = APIClient().post('/api/login/', {'username': 'customer1', 'password': 'customer'}, format='json')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + response.json()['token'])
+        self.assertEqual(client.get('/api/view-cart/').status_code, 200)
+
+    def test_deleted_token_is_rejected(self):
+        client = self.client_for(self.customer)
+        client.get('/api/view-cart/')
+        Token.objects.filter(user=self.customer).delete()
+        self.assertEqual(client.get('/api/view-cart/').status_code, 401)
+
+    def test_rotated_token_is_rejected(self):
+        client = self.client_for(self.customer)
+        client.get('/api/view-cart/')
+        Token.objects.filter(user=self.customer).delete()
+        new = self.client_for(self.customer)
+        self.assertEqual(client.get('/api/view-cart/').status_code, 401)
+        self.assertEqual(new.get('/api/view-cart/').status_code, 200)
+
+    def test_deactivated_user_is_rejected(self):
+        client = self.client_for(self.customer)
+        client.get('/api/view-cart/')
+        self.customer.is_active = False
+        self.customer.save()
+        self.assertEqual(client.get('/api/view-cart/').status_code, 401)
+
+    def test_password_hash_is_not_cached(self):
+        token, created = Token.objects.get_or_create(user=self.customer)
+        backend = authentication.CachedTokenAuthentication()
+        backend.authenticate_credentials(token.key)
+        entry = authentication._cache().get(authentication._cache_key(token.key))
+        self.assertNotIn(self.customer.password, entry[-1])
+        # The cached user is complete apart from the deferred hash
+        user, cached = backend.authenticate_credentials(token.key)
+        self.assertEqual((cached.pk, cached.user_id, cached.created), (token.pk, token.user_id, token.created))
+        self.assertEqual((user.pk, user.username, user.is_active), (self.customer.pk, 'customer1', True))
+        self.assertEqual(user.get_deferred_fields(), {'password'})
+        user.first_name = 'Renamed'
+        user.save()
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.first_name, 'Renamed')
+        self.assertTrue(self.customer.check_password('customer'))
+
+    def test_unknown_token_is_rejected(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token ' + 'x' * 40)
+        self.assertEqual(client.get('/api/view-cart/').status_code, 401)
+
+
+def _consume_in_worker(path, attempts, results):
+    store = throttling.BucketStore(path)
+    results.put(sum(store.consume('user_1', 4, 4 / 60)[0] for _ in range(attempts)))
+
+
+class TokenBucketThrottleTests(LittlelemonTestCase):
+
+    @skipUnless('fork' in multiprocessing.get_all_start_methods(), 'needs fork')
+    def test_limit_holds_across_processes(self):
+        path = throttling.get_store().path
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [context.Process(target=_consume_in_worker, args=(path, 5, results)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(30)
+        # 'user': 4/minute, 20 attempts from 4 processes
+        self.assertEqual(sum(results.get(timeout=5) for _ in workers), 4)
+
+    def test_bucket_refills(self):
+        store = throttling.get_store()
+        self.assertEqual([store.consume('k', 2, 1, now=100)[0] for _ in range(3)], [True, True, False])
+        allowed, wait = store.consume('k', 2, 1, now=100.25)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 0.75)
+        self.assertTrue(store.consume('k', 2, 1, now=101)[0])
+
+    def test_check_cost_does_not_grow_with_history(self):
+        store = throttling.get_store()
+        for i in range(500):
+            store.consume('busy', 1000, 1, now=200)
+        self.assertEqual(store.connection().execute('SELECT COUNT(*) FROM buckets').fetchone()[0], 1)
+
+    def test_endpoint_is_throttled(self):
+        with mock.patch.object(throttling.UserRateThrottle, 'THROTTLE_RATES', {'user': '3/minute'}), \
+                mock.patch.object(throttling.AnonRateThrottle, 'THROTTLE_RATES', {'anon': '2/minute'}):
+            anonymous = [APIClient().get('/api/throttle').status_code for _ in range(3)]
+            client = self.client_for(self.customer)
+            user = [client.get('/api/throttle').status_code for _ in range(4)]
+        self.assertEqual(anonymous, [200, 200, 429])
+        self.assertEqual(user, [200, 200, 200, 429])
+
+
+class AsyncViewTests(LittlelemonTestCase):
+    # The async views must answer exactly like the DRF views they replace
+
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            item = models.MenuItem.objects.create(title=f'Dish {i}', price=i + 1, category=self.category)
+            models.Cart.objects.create(user=self.customer, menuitem=item, quantity=1,
+                                       unit_price=item.price, price=item.price)
+        for i in range(3):
+            order = models.Order.objects.create(user=self.customer, delivery_crew=self.crew if i else None,
+                                                total=i + 1, date=datetime.date(2024, 1, i + 1))
+            models.OrderItem.objects.create(order=order, menuitem=item, quantity=1, unit_price=1, price=1)
+
+    def headers(self, user):
+        token, created = Token.objects.get_or_create(user=user)
+        return {'Authorization': 'Token ' + token.key}
+
+    async def compare(self, view, url, user=None):
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncRequestFactory
+        headers = await sync_to_async(self.headers)(user) if user else {}
+        expected = await sync_to_async(APIClient().get)(url, headers={'Accept': 'application/json', **headers})
+        response = await view(AsyncRequestFactory().get(url, headers=headers))
+        self.assertEqual(response.status_code, expected.status_code)
+        if expected.status_code == 200:
+            self.assertEqual(json.loads(response.content), expected.json())
+        return response
+
+    async def test_parity(self):
+        from . import async_views
+        await self.compare(async_views.all_menu_items, '/api/all-menu-items')
+        await self.compare(async_views.category, '/api/category', self.customer)
+        await self.compare(async_views.view_cart, '/api/view-cart/', self.customer)
+        await self.compare(async_views.view_user_orders, '/api/user-orders/', self.customer)
+        for user in (self.customer, self.crew, self.manager, self.admin):
+            await self.compare(async_views.order, '/api/orders', user)
+        await self.compare(async_views.order, '/api/orders?page=2&perpage=2&ordering=-total', self.manager)
+        await self.compare(async_views.order, '/api/orders?ordering=-date&cursor=', self.manager)
+
+    async def test_unauthenticated(self):
+        from . import async_views
+        response = await self.compare(async_views.view_cart, '/api/view-cart/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    async def test_not_modified(self):
+        from django.test import AsyncRequestFactory
+        from . import async_views
+        response = await async_views.all_menu_items(AsyncRequestFactory().get('/api/all-menu-items'))
+        response = await async_views.all_menu_items(
+            AsyncRequestFactory().get('/api/all-menu-items', headers={'If-None-Match': response['ETag']}))
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_use_the_sync_view(self):
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncRequestFactory
+        from . import async_views
+        # The pool thread has its own connection, which cannot see this
+        # test's transaction, so only check the request reaches the DRF view
+        request = AsyncRequestFactory().post('/api/category', {}, content_type='application/json')
+        response = async_to_sync(async_views.category)(request)
+        self.assertEqual(response.status_code, 401)
+
+
+class SQLiteProfileTests(LittlelemonTestCase):
+
+    def open(self, path):
+        # A second connection to a file database, configured like any new one
+        default = connections['default']
+        wrapper = default.__class__({**default.settings_dict, 'NAME': str(path)}, alias='profile')
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        return wrapper.connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_production_profile(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(SQLITE_PROFILE='production'):
+            wrapper = self.open(Path(tmp) / 'profile.sqlite3')
+            self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+            self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+            self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+            self.assertEqual(self.pragma(wrapper, 'cache_size'), -64 * 1024)
+            wrapper.close()
+
+    def test_default_profile_keeps_sqlite_settings(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(SQLITE_PROFILE='default'):
+            wrapper = self.open(Path(tmp) / 'profile.sqlite3')
+            self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+            wrapper.close()
+
+    def test_production_profile_is_opt_in(self):
+        # manage.py must not switch the tracked db.sqlite3 to WAL; asgi.py
+        # and wsgi.py (deployment) opt in
+        script = ('import sys{}; from django.db import connection; connection.ensure_connection(); '
+                  'print(connection.connection.execute("PRAGMA journal_mode").fetchone()[0])')
+        modes = []
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {name: value for name, value in os.environ.items() if name != 'LITTLELEMON_SQLITE_PROFILE'}
+            env['DJANGO_SETTINGS_MODULE'] = 'Littlelemon.settings'
+            for i, setup in enumerate(('; import django; django.setup()', '; import Littlelemon.asgi',
+                                       '; import Littlelemon.wsgi')):
+                env['LITTLELEMON_DB_PATH'] = str(Path(tmp) / f'db{i}.sqlite3')
+                modes.append(subprocess.run([sys.executable, '-c', script.format(setup)], cwd=settings.BASE_DIR,
+                                            env=env, capture_output=True, text=True, check=True).stdout.strip())
+        self.assertEqual(modes, ['delete', 'wal', 'wal'])
+
+    def test_readers_do_not_wait_for_the_writer(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(SQLITE_PROFILE='production'):
+            writer = self.open(Path(tmp) / 'profile.sqlite3')
+            reader = self.open(Path(tmp) / 'profile.sqlite3')
+            writer.connection.execute('CREATE TABLE t (x)')
+            writer.connection.execute('BEGIN IMMEDIATE')
+            writer.connection.execute('INSERT INTO t VALUES (1)')
+            # The reader sees the last committed state instead of blocking
+            self.assertEqual(reader.connection.execute('SELECT COUNT(*) FROM t').fetchone()[0], 0)
+            writer.connection.execute('COMMIT')
+            self.assertEqual(reader.connection.execute('SELECT COUNT(*) FROM t').fetchone()[0], 1)
+            reader.close()
+            writer.close()
+
+    def test_concurrent_orders_never_see_a_locked_database(self):
+        # Processes placing orders against one WAL file at the same time:
+        # each either waits for the write lock or gets it, none fails
+        worker = (
+            'import json, sys, django; django.setup(); '
+            'from django.contrib.auth.models import User; from django.db import OperationalError, transaction; '
+            'from LittlelemonAPI import checkout; from LittlelemonAPI.models import MenuItem; '
+            'user = User.objects.create(username=f"stress{sys.argv[1]}"); item = MenuItem.objects.get(); '
+            'placed = locked = 0\n'
+            'for _ in range(25):\n'
+            '    try:\n'
+            # "Buy now": add_to_cart reads the price before its first write
+            '        with transaction.atomic():\n'
+            '            checkout.add_to_cart(user, {item.pk: 1}); placed += checkout.place_order(user) is not None\n'
+            '    except OperationalError:\n'
+            '        locked += 1\n'
+            'print(json.dumps([placed, locked]))'
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'Littlelemon.settings', 'LITTLELEMON_METRICS': '0',
+                   'LITTLELEMON_DB_PATH': str(Path(tmp) / 'stress.sqlite3'), 'LITTLELEMON_SQLITE_PROFILE': 'production'}
+            subprocess.run([sys.executable, '-c', (
+                'import django; django.setup(); from django.core.management import call_command; '
+                'call_command("migrate", verbosity=0); from LittlelemonAPI.models import Category, MenuItem; '
+                'MenuItem.objects.create(title="Dish", price=5, category=Category.objects.create(slug="s", title="S"))'
+            )], cwd=settings.BASE_DIR, env=env, check=True, capture_output=True)
+            processes = [subprocess.Popen([sys.executable, '-c', worker, str(n)], cwd=settings.BASE_DIR, env=env,
+                                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                         for n in range(6)]
+            results = [json.loads(process.communicate(timeout=120)[0]) for process in processes]
+        self.assertEqual(results, [[25, 0]] * 6)
+
+    def test_rejects_unsafe_pragmas(self):
+        from . import database
+        with self.assertRaises(ValueError):
+            database.apply_pragmas(connection, {'journal_mode': 'wal; DROP TABLE x'})
+
+
+class ReadReplicaRouterTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.router = routers.ReadReplicaRouter()
+        # TestCase wraps every test in a transaction, which pins reads to
+        # the primary; pretend it does not
+        patcher = mock.patch.object(connections[routers.PRIMARY], 'in_atomic_block', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def route(self, method):
+        token = routers.begin_request(method)
+        self.addCleanup(routers.end_request, token)
+
+    def test_outside_requests_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(models.MenuItem), routers.PRIMARY)
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.route('GET')
+        self.assertEqual(self.router.db_for_read(models.MenuItem), routers.REPLICA)
+
+    def test_unsafe_requests_read_from_the_primary(self):
+        self.route('POST')
+        self.assertEqual(self.router.db_for_read(models.MenuItem), routers.PRIMARY)
+
+    def test_reads_after_a_write_stick_to_the_primary(self):
+        self.route('GET')
+        self.assertEqual(self.router.db_for_write(models.Cart), routers.PRIMARY)
+        self.assertEqual(self.router.db_for_read(models.MenuItem), routers.PRIMARY)
+
+    def test_transactions_read_from_the_primary(self):
+        self.route('GET')
+        with mock.patch.object(connections[routers.PRIMARY], 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(models.MenuItem), routers.PRIMARY)
+
+    def test_middleware_scopes_the_request(self):
+        from django.test import RequestFactory
+        from .middleware import replica_routing_middleware
+        seen = []
+        def view(request):
+            seen.append(self.router.db_for_read(models.MenuItem))
+            self.router.db_for_write(models.Cart)
+            seen.append(self.router.db_for_read(models.MenuItem))
+        replica_routing_middleware(view)(RequestFactory().get('/'))
+        self.assertEqual(seen, [routers.REPLICA, routers.PRIMARY])
+        self.assertEqual(self.router.db_for_read(models.MenuItem), routers.PRIMARY)
+
+    def test_replica_is_never_migrated(self):
+        self.assertFalse(self.router.allow_migrate(routers.REPLICA, 'LittlelemonAPI'))
+        self.assertTrue(self.router.allow_migrate(routers.PRIMARY, 'LittlelemonAPI'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ReadReplicaRequestTests(TransactionTestCase):
+    # Outside a test transaction, so requests really use the replica alias
+    databases = {routers.PRIMARY, routers.REPLICA}
+
+    def test_get_reads_from_the_replica(self):
+        user = User.objects.create_user('reader', password='reader')
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connections[routers.REPLICA]) as replica, \
+                CaptureQueriesContext(connections[routers.PRIMARY]) as primary:
+            response = client.get('/api/category')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(replica.captured_queries)
+        self.assertFalse(primary.captured_queries)
+
+
+def _flush_in_worker(labels, results):
+    # One response in a freshly forked worker
+    key = ('littlelemon_responses_total', labels)
+    results.put(metrics.registry.statuses.get(key, 0))
+    metrics.registry.statuses[key] = metrics.registry.statuses.get(key, 0) + 1
+    metrics.registry.flush()
+
+
+class MetricsTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            models.MenuItem.objects.create(title=f'Dish {i}', price=i + 1, category=self.category)
+
+    def timing(self, response):
+        entries = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            entries[name] = dict(param.split('=', 1) for param in params)
+        return entries
+
+    def test_server_timing_header(self):
+        client = self.client_for(self.customer)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get('/api/user-orders/')
+        entries = self.timing(response)
+        self.assertEqual(entries['db']['desc'], f'"{len(context)} queries"')
+        self.assertGreater(float(entries['total']['dur']), 0)
+        self.assertIn('serializer', entries)
+
+    def test_serializer_time(self):
+        with mock.patch.object(metrics, 'registry') as registry:
+            response = APIClient().get('/api/all-menu-items')
+        self.assertEqual(response.status_code, 200)
+        view, method, status, timings, total = registry.observe.call_args.args
+        self.assertEqual((view, method, status), ('all-menu-items', 'GET', 200))
+        self.assertGreater(timings.serializer, 0)
+        self.assertGreaterEqual(total, timings.serializer + timings.db)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertNotIn('Server-Timing', APIClient().get('/api/all-menu-items'))
+
+    def test_endpoint_is_for_admins(self):
+        self.assertEqual(self.client_for(self.customer).get('/api/metrics').status_code, 403)
+        self.assertEqual(APIClient().get('/api/metrics').status_code, 401)
+
+    def test_prometheus_histograms(self):
+        for _ in range(3):
+            APIClient().get('/api/all-menu-items')
+        response = self.client_for(self.admin).get('/api/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        labels = 'view="all-menu-items",method="GET"'
+        self.assertIn('# TYPE littlelemon_request_duration_seconds histogram', text)
+        self.assertIn(f'littlelemon_request_duration_seconds_count{{{labels}}} 3', text)
+        self.assertIn(f'littlelemon_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3', text)
+        self.assertIn(f'littlelemon_responses_total{{{labels},status="200"}} 3', text)
+
+    def test_workers_are_summed(self):
+        store = metrics.get_store()
+        labels = json.dumps({'method': 'GET', 'view': 'category'})
+        store.save([('littlelemon_responses_total', labels, 2)])
+        store.save([('littlelemon_responses_total', labels, 5)])
+        store.save([('littlelemon_db_queries', labels, [1, 0, 2])])
+        store.save([('littlelemon_db_queries', labels, [0, 3, 4])])
+        self.assertEqual(store.load(), {('littlelemon_responses_total', labels): 7,
+                                        ('littlelemon_db_queries', labels): [1, 3, 6]})
+
+    def test_flush_adds_counts_since_the_last_flush(self):
+        # One row per series, however many times or workers flush
+        for _ in range(3):
+            APIClient().get('/api/all-menu-items')
+            metrics.registry.flush()
+        self.assertEqual(metrics.registry.statuses, {})
+        totals = metrics.get_store().load()
+        labels = json.dumps({'view': 'all-menu-items', 'method': 'GET', 'status': '200'})
+        self.assertEqual(totals[('littlelemon_responses_total', labels)], 3)
+        self.assertEqual(metrics.get_store().connection().execute('SELECT COUNT(*) FROM totals').fetchone()[0],
+                         len(totals))
+
+    @skipUnless('fork' in multiprocessing.get_all_start_methods(), 'needs fork')
+    def test_forked_worker_adds_its_own_counts(self):
+        # The child starts without the parent's unflushed counts
+        labels = json.dumps({'method': 'GET', 'view': 'category'})
+        metrics.registry.statuses[('littlelemon_responses_total', labels)] = 2
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        child = context.Process(target=_flush_in_worker, args=(labels, results))
+        child.start()
+        child.join(30)
+        self.assertEqual(results.get(timeout=5), 0)
+        metrics.registry.flush()
+        self.assertEqual(metrics.get_store().load()[('littlelemon_responses_total', labels)], 3)
+
+
+class AddToCartTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.items = [models.MenuItem.objects.create(title=f'Dish {i}', price=f'{i + 1}.10', category=self.category)
+                      for i in range(20)]
+        self.client = self.client_for(self.customer)
+        # Warm the token and role caches
+        self.client.get('/api/view-cart/')
+
+    def cart(self):
+        return {line.menuitem_id: (line.quantity, line.price)
+                for line in models.Cart.objects.filter(user=self.customer)}
+
+    def test_add_and_increment(self):
+        item = self.items[0]
+        for _ in range(2):
+            response = self.client.post('/api/add-to-cart/', {'menu_item_id': item.pk, 'quantity': 3}, format='json')
+            self.assertEqual(response.status_code, 200)
+        quantity, price = self.cart()[item.pk]
+        self.assertEqual(quantity, 6)
+        self.assertEqual(price, Decimal('6.60'))
+
+    def test_default_quantity(self):
+        self.client.post('/api/add-to-cart/', {'menu_item_id': self.items[1].pk}, format='json')
+        self.assertEqual(self.cart()[self.items[1].pk], (1, Decimal('2.10')))
+
+    def test_batch(self):
+        entries = [{'menu_item_id': item.pk, 'quantity': 2} for item in self.items[:3]]
+        entries.append({'menu_item_id': self.items[0].pk})
+        response = self.client.post('/api/add-to-cart/batch/', entries, format='json')
+        self.assertEqual(response.status_code, 200)
+        cart = self.cart()
+        self.assertEqual(cart[self.items[0].pk], (3, Decimal('3.30')))
+        self.assertEqual(cart[self.items[2].pk], (2, Decimal('6.20')))
+
+    def test_unknown_item_writes_nothing(self):
+        entries = [{'menu_item_id': self.items[0].pk}, {'menu_item_id': 999999}]
+        response = self.client.post('/api/add-to-cart/batch/', entries, format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['menu_item_ids'], [999999])
+        self.assertEqual(self.cart(), {})
+
+    def test_invalid_entries(self):
+        for body in ([], [{'quantity': 1}], [{'menu_item_id': self.items[0].pk, 'quantity': 0}]):
+            self.assertEqual(self.client.post('/api/add-to-cart/batch/', body, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/api/add-to-cart/', {}, format='json').status_code, 400)
+
+    def test_constant_queries(self):
+        with CaptureQueriesContext(connection) as one:
+            self.client.post('/api/add-to-cart/batch/', [{'menu_item_id': self.items[0].pk}], format='json')
+        entries = [{'menu_item_id': item.pk} for item in self.items]
+        with CaptureQueriesContext(connection) as many:
+            self.client.post('/api/add-to-cart/batch/', entries, format='json')
+        self.assertEqual(len(one), len(many))
+        self.assertEqual(len(many), 2)
+        self.assertEqual(sum('INSERT' in query['sql'] for query in many), 1)
+        self.assertEqual(len(self.cart()), 20)
+
+    def test_cart_is_checked_out(self):
+        entries = [{'menu_item_id': item.pk, 'quantity': 2} for item in self.items[:2]]
+        self.client.post('/api/add-to-cart/batch/', entries, format='json')
+        order = checkout.place_order(self.customer)
+        self.assertEqual(order.total, Decimal('6.40'))
+
+
+class OrderSummaryTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.items = [models.MenuItem.objects.create(title=f'Dish {i}', price=f'{i + 1}.25', category=self.category)
+                      for i in range(3)]
+        self.client = self.client_for(self.customer)
+
+    def place(self):
+        checkout.add_to_cart(self.customer, {item.pk: index + 1 for index, item in enumerate(self.items)})
+        return checkout.place_order(self.customer)
+
+    def live(self, order):
+        order = serializers.OrderSerializer.setup_eager_loading(models.Order.objects.filter(pk=order.pk)).get()
+        return serializers.OrderSerializer(order).data
+
+    def test_history_matches_live_join(self):
+        order = self.place()
+        self.assertEqual(len(order.summary), 3)
+        for url in ('/api/user-orders/', '/api/orders'):
+            self.assertEqual(self.client.get(url).json(), [json.loads(json.dumps(self.live(order)))])
+
+    def test_history_reads_one_table(self):
+        self.place()
+        self.place()
+        self.client.get('/api/user-orders/')
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/user-orders/')
+        self.assertEqual(len(context), 1)
+        self.assertFalse(any('orderitem' in query['sql'] or 'menuitem' in query['sql'] for query in context))
+
+    def test_summary_is_immutable(self):
+        self.place()
+        models.MenuItem.objects.filter(pk=self.items[0].pk).update(title='Renamed', price=99)
+        line = self.client.get('/api/user-orders/').json()[0]['items'][0]
+        self.assertEqual(line['menuitem']['title'], 'Dish 0')
+        self.assertEqual(line['unit_price'], '1.25')
+
+    def test_backfill(self):
+        order = self.place()
+        legacy = models.Order.objects.create(user=self.customer, total=2)
+        models.OrderItem.objects.create(order=legacy, menuitem=self.items[1], quantity=1, unit_price=2, price=2)
+        expected = json.loads(json.dumps(self.live(legacy)))
+        # Unsummarized orders are still listed, from the join
+        self.assertEqual(self.client.get('/api/user-orders/').json()[1], expected)
+        out = io.StringIO()
+        call_command('backfill_order_summaries', batch_size=1, stdout=out)
+        self.assertIn('Backfilled 1 ', out.getvalue())
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.summary, expected['items'])
+        self.assertEqual(self.client.get('/api/user-orders/').json()[1], expected)
+        call_command('backfill_order_summaries', stdout=out)
+        self.assertIn('Backfilled 0 ', out.getvalue())
+        self.assertEqual(models.Order.objects.get(pk=order.pk).summary, order.summary)
+
+
+class DispatchTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.crew_members = [self.crew]
+        for i in range(2, 4):
+            user = User.objects.create_user(f'delivery{i}', password='delivery')
+            user.groups.add(self.crews)
+            self.crew_members.append(user)
+
+    def orders(self, count, **fields):
+        return models.Order.objects.bulk_create(
+            models.Order(user=self.customer, total=1, **fields) for _ in range(count))
+
+    def open_load(self):
+        return {user.pk: models.Order.objects.filter(delivery_crew=user, status=False).count()
+                for user in self.crew_members}
+
+    def test_balances_by_open_load(self):
+        self.orders(4, delivery_crew=self.crew)
+        self.orders(5, delivery_crew=self.crew_members[1], status=True)
+        self.orders(8)
+        assignments = dispatch.dispatch()
+        self.assertEqual(sum(len(ids) for ids in assignments.values()), 8)
+        self.assertEqual(self.open_load(), {self.crew.pk: 4, self.crew_members[1].pk: 4, self.crew_members[2].pk: 4})
+        self.assertFalse(models.Order.objects.filter(delivery_crew__isnull=True).exists())
+        self.assertEqual(dispatch.dispatch(), {})
+
+    def test_one_update_per_batch(self):
+        self.orders(50)
+        with CaptureQueriesContext(connection) as context:
+            dispatch.dispatch()
+        statements = [query['sql'] for query in context if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(len(statements), 4)
+        self.assertEqual(sum(sql.startswith('UPDATE') for sql in statements), 1)
+
+    def test_backlog_above_the_parameter_limit(self):
+        self.orders(1500)
+        batch_size = connection.ops.bulk_batch_size(['pk', 'delivery_crew'], range(1500))
+        with CaptureQueriesContext(connection) as context:
+            assignments = dispatch.dispatch()
+        self.assertEqual(sum(len(ids) for ids in assignments.values()), 1500)
+        self.assertEqual(self.open_load(), dict.fromkeys(self.open_load(), 500))
+        updates = sum(query['sql'].startswith('UPDATE') for query in context)
+        self.assertEqual(updates, -(-1500 // batch_size))
+
+    def test_plans_inside_the_transaction(self):
+        self.orders(2)
+        real_loads = dispatch.crew_loads
+        outside = len(connection.savepoint_ids)
+
+        def loads():
+            self.assertGreater(len(connection.savepoint_ids), outside)
+            return real_loads()
+
+        with mock.patch.object(dispatch, 'crew_loads', loads):
+            dispatch.dispatch()
+
+    def test_limit_takes_oldest_and_skips_delivered(self):
+        delivered = self.orders(1, status=True)[0]
+        orders = self.orders(5)
+        assignments = dispatch.dispatch(limit=3)
+        self.assertEqual(sorted(sum(assignments.values(), [])), [order.pk for order in orders[:3]])
+        delivered.refresh_from_db()
+        self.assertIsNone(delivered.delivery_crew)
+
+    def test_keeps_manual_assignment(self):
+        orders = self.orders(3)
+        real_plan = dispatch.plan
+
+        def plan_then_assign(order_ids, loads):
+            models.Order.objects.filter(pk=orders[0].pk).update(delivery_crew=self.manager)
+            return real_plan(order_ids, loads)
+
+        with mock.patch.object(dispatch, 'plan', plan_then_assign):
+            dispatch.dispatch()
+        self.assertEqual(models.Order.objects.get(pk=orders[0].pk).delivery_crew, self.manager)
+
+    def test_command(self):
+        self.orders(3)
+        out = io.StringIO()
+        call_command('dispatch_orders', stdout=out)
+        self.assertIn('Assigned 3 orders to 3 crew members.', out.getvalue())
+
+
+class SalesRollupTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.sides = models.Category.objects.create(slug='sides', title='Sides')
+        self.items = [
+            models.MenuItem.objects.create(title='Lasagne', price='12.50', category=self.category),
+            models.MenuItem.objects.create(title='Fries', price='3.00', category=self.sides),
+        ]
+        self.client = self.client_for(self.manager)
+
+    def place(self, *quantities):
+        checkout.add_to_cart(self.customer, dict(zip([item.pk for item in self.items], quantities)))
+        return checkout.place_order(self.customer)
+
+    def move(self, order, day):
+        # What the rollups saw, on another day
+        date = datetime.date(2024, 5, day)
+        models.DailySales.objects.filter(date=order.date).update(date=date)
+        models.DailyItemSales.objects.filter(date=order.date).update(date=date)
+        models.Order.objects.filter(pk=order.pk).update(date=date)
+
+    def assertRollupsMatch(self):
+        out = io.StringIO()
+        call_command('rebuild_sales_rollups', check=True, stdout=out)
+        self.assertIn('Rollups match.', out.getvalue())
+
+    def test_place_order(self):
+        self.place(2, 1)
+        self.place(1, 3)
+        day = models.DailySales.objects.get()
+        self.assertEqual((day.orders, day.revenue), (2, Decimal('49.50')))
+        fries = models.DailyItemSales.objects.get(menuitem_id=self.items[1].pk)
+        self.assertEqual((fries.category_id, fries.quantity, fries.revenue), (self.sides.pk, 4, Decimal('12.00')))
+        self.assertRollupsMatch()
+        # Updated during placement, nothing left for run_jobs
+        self.assertFalse(models.Job.objects.exists())
+
+    def test_order_single_changes(self):
+        kept, changed, deleted = self.place(1, 1), self.place(2, 0), self.place(0, 5)
+        for order in (kept, changed, deleted):
+            self.move(order, 1)
+        # PUT changes the total; saving moves the order to today
+        response = self.client.put(f'/api/orders/{changed.pk}', {'user_id': self.customer.pk, 'total': '20.00'})
+        self.assertEqual(response.status_code, 205, response.content)
+        self.client.delete(f'/api/orders/{deleted.pk}')
+        old, new = models.DailySales.objects.order_by('date')
+        self.assertEqual((old.date, old.orders, old.revenue), (datetime.date(2024, 5, 1), 1, Decimal('15.50')))
+        self.assertEqual((new.orders, new.revenue), (1, Decimal('20.00')))
+        self.assertRollupsMatch()
+
+    def test_rebuild(self):
+        self.place(1, 2)
+        legacy = models.Order.objects.create(user=self.customer, total=12)
+        models.OrderItem.objects.create(order=legacy, menuitem=self.items[0], quantity=1, unit_price=12, price=12)
+        models.DailySales.objects.update(orders=7)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_sales_rollups', check=True, stdout=io.StringIO())
+        call_command('rebuild_sales_rollups', stdout=io.StringIO())
+        day = models.DailySales.objects.get()
+        self.assertEqual((day.orders, day.revenue), (2, Decimal('30.50')))
+        self.assertEqual(models.DailyItemSales.objects.get(menuitem_id=self.items[0].pk).quantity, 2)
+        self.assertRollupsMatch()
+
+    def test_analytics(self):
+        self.move(self.place(1, 4), 1)
+        self.move(self.place(2, 0), 2)
+        self.place(0, 1)
+        response = self.client.get('/api/analytics/sales?from=2024-05-01&to=2024-05-31&top=1')
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual((report['orders'], report['revenue']), (2, '49.50'))
+        self.assertEqual(report['days'], [
+            {'date': '2024-05-01', 'orders': 1, 'revenue': '24.50'},
+            {'date': '2024-05-02', 'orders': 1, 'revenue': '25.00'},
+        ])
+        self.assertEqual(report['top_items'], [
+            {'menuitem_id': self.items[1].pk, 'title': 'Fries', 'quantity': 4, 'revenue': '12.00'}])
+        self.assertEqual([row['title'] for row in report['categories']], ['Mains', 'Sides'])
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/analytics/sales')
+        self.assertFalse(any('_order' in query['sql'] for query in context))
+
+    def test_analytics_managers_only(self):
+        self.assertEqual(self.client_for(self.customer).get('/api/analytics/sales').status_code, 403)
+        self.assertEqual(self.client.get('/api/analytics/sales?from=May').status_code, 400)
+
+
+class JobQueueTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        tasks = mock.patch.dict(jobs.TASKS, {'test.record': self.record})
+        tasks.start()
+        self.addCleanup(tasks.stop)
+
+    def record(self, value, fail=0):
+        self.calls.append(value)
+        if len(self.calls) <= fail:
+            raise RuntimeError('try again')
+        return {'value': value}
+
+    def make_due(self):
+        models.Job.objects.update(run_after=timezone.now())
+
+    def test_accepted_mode(self):
+        item = models.MenuItem.objects.create(title='Lasagne', price=12, category=self.category)
+        checkout.add_to_cart(self.customer, {item.pk: 2})
+        client = self.client_for(self.customer)
+        response = client.post('/api/place-order/', HTTP_PREFER='respond-async')
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(models.Order.objects.exists())
+        location = response['Location']
+        self.assertEqual(client.get(location).json()['status'], 'queued')
+        self.assertEqual(jobs.run_pending(), 1)
+        job = client.get(location).json()
+        order = models.Order.objects.get()
+        self.assertEqual((job['status'], job['result']), ('done', {'order_id': order.pk}))
+        self.assertEqual(order.total, 24)
+        self.assertEqual(self.client_for(self.crew).get(location).status_code, 403)
+        # The legacy endpoint too; an empty cart is a result, not a failure
+        response = client.post('/api/orders', HTTP_PREFER='respond-async')
+        self.assertEqual(response.status_code, 202)
+        call_command('run_jobs', burst=True, stdout=io.StringIO())
+        self.assertEqual(client.get(response['Location']).json()['result'], {'order_id': None})
+
+    def test_enqueued_with_the_transaction(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            jobs.enqueue('test.record', {'value': 1})
+            raise RuntimeError
+        self.assertFalse(models.Job.objects.exists())
+        with self.assertRaises(KeyError):
+            jobs.enqueue('test.unknown')
+
+    def test_retry_with_backoff(self):
+        job = jobs.enqueue('test.record', {'value': 1, 'fail': 1})
+        with self.assertLogs('LittlelemonAPI.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), ('queued', 1, 'RuntimeError: try again'))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(jobs.run_pending(), 0)
+        self.make_due()
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result, job.error), ('done', 2, {'value': 1}, ''))
+        self.assertLess(jobs.backoff(1), jobs.backoff(4))
+
+    def test_gives_up_after_max_attempts(self):
+        job = jobs.enqueue('test.record', {'value': 1, 'fail': 10})
+        with self.assertLogs('LittlelemonAPI.jobs', 'ERROR'):
+            for _ in range(job.max_attempts):
+                self.make_due()
+                jobs.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 5))
+        self.assertEqual(len(self.calls), 5)
+        self.make_due()
+        self.assertEqual(jobs.run_pending(), 0)
+
+    def test_expired_lease_runs_once(self):
+        jobs.enqueue('test.record', {'value': 1})
+        stale = jobs.claim()
+        self.assertIsNone(jobs.claim())
+        models.Job.objects.update(locked_until=timezone.now() - datetime.timedelta(seconds=1))
+        fresh = jobs.claim()
+        self.assertEqual(fresh.attempts, 2)
+        self.assertIsNone(jobs.run(stale))
+        self.assertEqual(jobs.run(fresh), 'done')
+        self.assertEqual(self.calls, [1])
+
+    def test_expired_lease_on_last_attempt_fails(self):
+        job = jobs.enqueue('test.record', {'value': 1})
+        models.Job.objects.update(status='running', attempts=job.max_attempts,
+                                  locked_until=timezone.now() - datetime.timedelta(seconds=1))
+        with self.assertLogs('LittlelemonAPI.jobs', 'ERROR'):
+            self.assertIsNone(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', job.max_attempts))
+        self.assertEqual(self.calls, [])
+
+    def test_purge(self):
+        done, recent, failed = [jobs.enqueue('test.record', {'value': n}) for n in range(3)]
+        self.assertEqual(jobs.run_pending(), 3)
+        old = timezone.now() - datetime.timedelta(days=8)
+        models.Job.objects.filter(pk__in=[done.pk, failed.pk]).update(finished=old)
+        models.Job.objects.filter(pk=failed.pk).update(status='failed')
+        self.assertEqual(jobs.purge(), 1)
+        self.assertEqual(set(models.Job.objects.values_list('pk', flat=True)), {recent.pk, failed.pk})
+        out = io.StringIO()
+        call_command('run_jobs', burst=True, stdout=out)
+        self.assertEqual(out.getvalue(), 'Ran 0 jobs, deleted 0 old ones.\n')
+
+
+class ListingsTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        sides = models.Category.objects.create(slug='sides', title='Sides \u2028 & co')
+        self.items = [
+            models.MenuItem.objects.create(title='Lasagne', price='12.5', category=self.category, featured=True),
+            models.MenuItem.objects.create(title='Frites «maison»', price=3, category=sides),
+            models.MenuItem.objects.create(title='Soup', price='4.05', category=sides),
+        ]
+        checkout.add_to_cart(self.customer, {self.items[0].pk: 2, self.items[1].pk: 1})
+        checkout.place_order(self.customer)
+        legacy = models.Order.objects.create(user=self.customer, delivery_crew=self.crew, status=True, total='7.1')
+        for item in self.items[1:]:
+            models.OrderItem.objects.create(order=legacy, menuitem=item, quantity=1, unit_price=item.price,
+                                            price=item.price)
+        models.Order.objects.create(user=self.customer, total=0)
+
+    def assertSameJSON(self, fast, slow):
+        self.assertEqual(listings.FastJSONRenderer().render(fast), JSONRenderer().render(slow))
+        self.assertEqual(json.loads(listings.FastJSONRenderer().render(fast)), json.loads(JSONRenderer().render(slow)))
+
+    def test_menu_items_parity(self):
+        queryset = models.MenuItem.objects.all()
+        fast = listings.menu_items(listings.menu_item_rows(queryset))
+        slow = serializers.MenuItemSerializer(serializers.MenuItemSerializer.setup_eager_loading(queryset), many=True).data
+        self.assertEqual(len(fast), 3)
+        self.assertSameJSON(fast, slow)
+
+    def test_orders_parity(self):
+        queryset = models.Order.objects.all()
+        with CaptureQueriesContext(connection) as context:
+            fast = listings.orders(listings.order_rows(queryset))
+        # orders, then the items of the two orders without a summary
+        self.assertEqual(len(context), 2)
+        slow = serializers.OrderHistorySerializer(queryset, many=True).data
+        self.assertEqual([len(order['items']) for order in slow], [2, 2, 0])
+        self.assertSameJSON(fast, slow)
+        slow = serializers.OrderSerializer(serializers.OrderSerializer.setup_eager_loading(queryset), many=True).data
+        self.assertSameJSON(fast, slow)
+
+    def test_summaries_copied_unparsed(self):
+        summary = models.Order.objects.filter(summary__isnull=False).values_list(
+            Cast('summary', TextField()), flat=True).get()
+        self.assertNotIn(', ', summary)
+        fast = listings.orders(listings.order_rows(models.Order.objects.all()))
+        slow = serializers.OrderHistorySerializer(models.Order.objects.all(), many=True).data
+        self.assertEqual(fast[0]['items'], listings.RawJSON(summary))
+        with mock.patch.object(listings, 'orjson', None):
+            self.assertSameJSON(fast, slow)
+        indented = 'application/json; indent=2'
+        self.assertEqual(listings.FastJSONRenderer().render(fast, indented), JSONRenderer().render(slow, indented))
+        # A value that looks like the splice placeholder is rendered as data
+        fast[1]['status'] = slow[1]['status'] = '\x00raw\x00'
+        self.assertSameJSON(fast, slow)
+
+    def test_renderer_fallbacks(self):
+        data = {'title': 'a\u2028b', 1: Decimal('1.50'), 'when': datetime.datetime(2024, 5, 1, 12, 0, 0, 123456)}
+        self.assertEqual(listings.FastJSONRenderer().render(data), JSONRenderer().render(data))
+        with mock.patch.object(listings, 'orjson', None):
+            self.assertEqual(listings.FastJSONRenderer().render(data), JSONRenderer().render(data))
+        indented = 'application/json; indent=2'
+        self.assertEqual(listings.FastJSONRenderer().render(data, indented), JSONRenderer().render(data, indented))
+
+    def test_endpoints(self):
+        client = self.client_for(self.customer)
+        response = client.get('/api/user-orders/')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(len(response.json()), 3)
+        response = client.get('/api/all-menu-items', HTTP_ACCEPT='text/html')
+        self.assertTrue(response['Content-Type'].startswith('text/html'))
+        manager = self.client_for(self.manager).get('/api/orders?perpage=2&page=2').json()
+        self.assertEqual([order['id'] for order in manager], [models.Order.objects.order_by('pk').last().pk])
+
+
+class FormatsTests(LittlelemonTestCase):
+
+    def setUp(self):
+        super().setUp()
+        sides = models.Category.objects.create(slug='sides', title='Sides, etc.')
+        self.items = [
+            models.MenuItem.objects.create(title='Lasagne', price='12.5', category=self.category, featured=True),
+            models.MenuItem.objects.create(title='Frites «maison»', price=3, category=sides),
+        ]
+        checkout.add_to_cart(self.customer, {item.pk: 2 for item in self.items})
+        checkout.place_order(self.customer)
+        models.Order.objects.create(user=self.customer, total=0)
+        checkout.add_to_cart(self.customer, {self.items[0].pk: 1})
+
+    def get(self, url, **headers):
+        return self.client_for(self.customer).get(url, headers=headers)
+
+    def test_csv(self):
+        response = self.get('/api/all-menu-items', Accept='text/csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(response.content.decode())))
+        self.assertEqual(list(rows[0]), ['id', 'title', 'price', 'featured', 'category.id', 'category.slug',
+                                         'category.title'])
+        self.assertEqual([(row['title'], row['price'], row['category.title']) for row in rows],
+                         [('Lasagne', '12.50', 'Mains'), ('Frites «maison»', '3.00', 'Sides, etc.')])
+        # One row per order item, and one for the order without items
+        rows = list(csv.DictReader(io.StringIO(self.get('/api/user-orders/?format=csv').content.decode())))
+        self.assertEqual([(row['total'], row['items.menuitem.title'], row['items.quantity']) for row in rows],
+                         [('31.00', 'Lasagne', '2'), ('31.00', 'Frites «maison»', '2'), ('0.00', '', '')])
+        rows = list(csv.DictReader(io.StringIO(self.get('/api/view-cart/', Accept='text/csv').content.decode())))
+        self.assertEqual(len(rows), 1)
+
+    @skipUnless(formats.msgpack, 'needs msgpack')
+    def test_msgpack(self):
+        for url in ('/api/all-menu-items', '/api/view-cart/', '/api/user-orders/', '/api/orders'):
+            response = self.get(url, Accept='application/msgpack')
+            self.assertEqual(response['Content-Type'], 'application/msgpack')
+            self.assertEqual(formats.msgpack.unpackb(response.content), self.get(url).json())
+
+    def test_requested(self):
+        from django.test import RequestFactory
+        factory = RequestFactory()
+        self.assertEqual(formats.requested(factory.get('/', headers={'Accept': 'text/csv'})), 'csv')
+        self.assertEqual(formats.requested(factory.get('/?format=csv')), 'csv')
+        self.assertIsNone(formats.requested(factory.get('/?format=json', headers={'Accept': 'text/csv'})))
+        self.assertIsNone(formats.requested(factory.get('/', headers={'Accept': 'application/json'})))
+
+    @override_settings(COMPRESS_MIN_SIZE=200)
+    def test_compression(self):
+        import gzip
+        for i in range(20):
+            models.MenuItem.objects.create(title=f'Dish {i}', price=i + 1, category=self.category)
+        plain = self.get('/api/all-menu-items')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        response = self.get('/api/all-menu-items', **{'Accept-Encoding': 'gzip, br;q=0'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept, Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        # Revalidates with the weak ETag
+        response = self.get('/api/all-menu-items', **{'Accept-Encoding': 'gzip', 'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        # Small responses are sent as they are
+        response = self.get('/api/category', **{'Accept-Encoding': 'gzip'})
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @skipUnless(middleware.brotli, 'needs brotli')
+    @override_settings(COMPRESS_MIN_SIZE=200)
+    def test_brotli(self):
+        for i in range(20):
+            models.MenuItem.objects.create(title=f'Dish {i}', price=i + 1, category=self.category)
+        response = self.get('/api/all-menu-items', **{'Accept-Encoding': 'gzip, deflate, br'})
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(middleware.brotli.decompress(response.content), self.get('/api/all-menu-items').content)
+        # The browsable API gets gzip with its BREACH padding instead
+        response = self.get('/api/all-menu-items', Accept='text/html', **{'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+class StartupTests(LittlelemonTestCase):
+
+    def loaded_after(self, code, settings_module='Littlelemon.settings'):
+        # Runs `code` after django.setup() in a fresh interpreter and returns
+        # the LittlelemonAPI.views modules it loaded
+        script = ('import json, sys, django; django.setup(); ' + code + '; '
+                  'print(json.dumps(sorted(name for name in sys.modules if name.startswith("LittlelemonAPI.views."))))')
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module}
+        output = subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        return json.loads(output)
+
+    def test_view_modules_load_on_first_use(self):
+        from django.urls import resolve
+        self.assertEqual(self.loaded_after('from django.urls import resolve; resolve("/api/orders")'), [])
+        self.assertEqual(self.loaded_after('from LittlelemonAPI import views'), [])
+        self.assertEqual(self.loaded_after('from LittlelemonAPI.views import cart'), ['LittlelemonAPI.views.cart'])
+        match = resolve('/api/orders')
+        self.assertEqual(match.view_name, 'LittlelemonAPI.views.orders.order')
+        self.assertTrue(match.func.csrf_exempt)
+
+    def test_api_only_settings(self):
+        from django.urls import resolve
+        self.assertEqual(self.loaded_after(
+            'from django.apps import apps; from django.urls import resolve; resolve("/api/menu-items"); '
+            'assert not apps.is_installed("djoser") and not apps.is_installed("django.contrib.admin")',
+            'Littlelemon.settings_api'), [])
+        self.assertEqual(resolve('/api/users/').url_name, 'user-list')
+
+
+class GenerateDataTests(LittlelemonTestCase):
+
+    def generate(self, prefix, **options):
+        options = {'seed': 7, 'categories': 3, 'menu_items': 25, 'managers': 1, 'delivery_crew': 2, 'customers': 10,
+                   'carts': 4, 'orders': 60, 'days': 10, 'until': datetime.date(2026, 1, 31), 'batch_size': 16,
+                   'prefix': prefix, **options}
+        call_command('generate_data', stdout=io.StringIO(), **options)
+        orders = models.Order.objects.filter(user__username__startswith=prefix + '-').order_by('pk')
+        return orders, [
+            (order.user.username.partition('-')[2], order.date, order.total, order.status,
+             order.delivery_crew is not None,
+             [(line['menuitem']['title'], line['menuitem']['price'], line['quantity']) for line in order.summary])
+            for order in orders]
+
+    def test_counts_and_consistency(self):
+        orders, _ = self.generate('a')
+        self.assertEqual(orders.count(), 60)
+        self.assertEqual(models.Category.objects.count(), 4)
+        self.assertEqual(models.MenuItem.objects.count(), 25)
+        self.assertEqual(models.MenuItem.objects.filter(featured=True).count(), 1)
+        self.assertEqual(User.objects.filter(username__startswith='a-').count(), 13)
+        self.assertEqual(User.objects.filter(username__startswith='a-crew-', groups=self.crews).count(), 2)
+        self.assertEqual(User.objects.filter(username__startswith='a-manager-', groups=self.managers).count(), 1)
+        self.assertEqual(models.Cart.objects.values('user').distinct().count(), 4)
+        dates = list(orders.values_list('date', flat=True))
+        self.assertEqual(dates, sorted(dates))
+        self.assertTrue(datetime.date(2026, 1, 22) <= dates[0] and dates[-1] <= datetime.date(2026, 1, 31))
+        self.assertFalse(orders.filter(date__lt=datetime.date(2026, 1, 31), status=False).exists())
+        for order in orders.prefetch_related('items'):
+            # Summaries as place_order writes them
+            self.assertEqual(order.summary, serializers.order_summary(
+                serializers.OrderItemSerializer.setup_eager_loading(order.items.all())))
+            self.assertEqual(order.total, sum(item.price for item in order.items.all()))
+        call_command('rebuild_sales_rollups', check=True, stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            self.generate('a')
+
+    def test_deterministic_under_seed(self):
+        _, first = self.generate('a')
+        _, second = self.generate('b')
+        _, other = self.generate('c', seed=8)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from rest_framework import throttling
+
+# Token-bucket throttles whose state lives in a small SQLite file shared by
+# every worker process on the host, so DEFAULT_THROTTLE_RATES hold globally
+# instead of once per worker. Each check is one UPSERT on the bucket row:
+# O(1) whatever the request history, and atomic under SQLite's write lock.
+# An absent row is a full bucket, so idle rows are pruned once they refill.
+
+_SCHEMA = '''CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    expires REAL NOT NULL
+) WITHOUT ROWID'''
+
+# Refill, then take one token if at least one is available. No row comes
+# back when the bucket is empty.
+_CONSUME = '''INSERT INTO buckets (key, tokens, updated, expires)
+VALUES (:key, :capacity - 1, :now, :expires)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = MIN(:capacity, tokens + (:now - updated) * :rate) - 1,
+    updated = :now,
+    expires = :expires
+WHERE MIN(:capacity, tokens + (:now - updated) * :rate) >= 1
+RETURNING tokens'''
+
+_PRUNE_EVERY = 1000
+
+
+class BucketStore:
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.local = threading.local()
+        self.calls = 0
+
+    def connection(self):
+        # One connection per thread and per process (never reused after fork)
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Throttle state is disposable, durability is not worth an fsync
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(_SCHEMA)
+            self.local.connection, self.local.pid = connection, os.getpid()
+        return connection
+
+    def consume(self, key, capacity, rate, now=None):
+        # Returns (allowed, seconds until the next token)
+        now = time.time() if now is None else now
+        connection = self.connection()
+        row = connection.execute(_CONSUME, {
+            'key': key, 'capacity': capacity, 'rate': rate, 'now': now,
+            'expires': now + capacity / rate,
+        }).fetchone()
+        self.calls += 1
+        if self.calls % _PRUNE_EVERY == 0:
+            connection.execute('DELETE FROM buckets WHERE expires < ?', (now,))
+        if row is not None:
+            return True, 0
+        tokens, updated = connection.execute(
+            'SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+        available = min(capacity, tokens + (now - updated) * rate)
+        return False, max(0.0, (1 - available) / rate)
+
+    def clear(self):
+        self.connection().execute('DELETE FROM buckets')
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    path = str(getattr(settings, 'THROTTLE_DATABASE', settings.BASE_DIR / 'throttle.sqlite3'))
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = BucketStore(path)
+        return _stores[path]
+
+
+class TokenBucketMixin:
+    # Same scopes, rates and cache keys as the DRF throttle it is mixed into;
+    # only the bookkeeping changes. A 'N/minute' rate is a bucket of N tokens
+    # refilled at N per minute.
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        allowed, self._wait = get_store().consume(key, self.num_requests, self.num_requests / self.duration)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class AnonRateThrottle(TokenBucketMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(TokenBucketMixin, throttling.UserRateThrottle):
+    pass
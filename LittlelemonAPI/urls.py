@@ -1,46 +1,93 @@
+import functools
+import importlib
+
+from django.conf import settings
 from django.urls import path
-from . import views
-from .views import MenuItemsView, add_to_cart, view_cart, place_order, view_user_orders, assign_to_delivery_crew, update_item_of_the_day
 
-urlpatterns = [  
+
+def lazy(dotted, is_async=False):
+    # A view that imports its module on the first request it serves, so a
+    # new worker only loads the view modules it is asked for. Every API
+    # view is exempt from CsrfViewMiddleware (DRF's SessionAuthentication
+    # checks CSRF itself), which the middleware reads before loading.
+    module, _, name = dotted.rpartition('.')
+
+    @functools.cache
+    def load():
+        view = getattr(importlib.import_module(module), name)
+        return view.as_view() if isinstance(view, type) else view
+
+    if is_async:
+        async def view(request, *args, **kwargs):
+            return await load()(request, *args, **kwargs)
+    else:
+        def view(request, *args, **kwargs):
+            return load()(request, *args, **kwargs)
+    # Named like the view itself (the metrics label of unnamed routes)
+    view.__module__, view.__name__, view.__qualname__ = module, name, name
+    view.csrf_exempt = True
+    return view
+
+
+def read(dotted):
+    # GET-heavy endpoints: the async version under ASYNC_VIEWS (async_views.py)
+    if settings.ASYNC_VIEWS:
+        return lazy('LittlelemonAPI.async_views.' + dotted.rpartition('.')[2], is_async=True)
+    return lazy('LittlelemonAPI.views.' + dotted)
+
+
+def view(dotted):
+    return lazy('LittlelemonAPI.views.' + dotted)
+
+
+urlpatterns = [
     # Throttle check
-    path('throttle', views.throttle_check),
-    
+    path('throttle', view('ops.throttle_check')),
+
     # Category endpoints
-    path('category', views.category, name='category'),
-    path('category/<int:id>', views.category_single),
+    path('category', read('menu.category'), name='category'),
+    path('category/<int:id>', view('menu.category_single')),
 
     # Menu-items endpoints
-    path('menu-items', views.MenuItemsView.as_view()),
-    path('menu-items/<int:id>', views.menuitems_single),
-    path('all-menu-items', views.all_menu_items, name='all-menu-items'),
-    path('menu-items/<int:item_id>/feature/', update_item_of_the_day, name='update-item-of-the-day'),
+    path('menu-items', view('menu.MenuItemsView')),
+    path('menu-items/<int:id>', view('menu.menuitems_single')),
+    path('all-menu-items', read('menu.all_menu_items'), name='all-menu-items'),
+    path('menu-items/<int:item_id>/feature/', view('menu.update_item_of_the_day'), name='update-item-of-the-day'),
 
     # User group management endpoints
-    path('login/', views.login, name='login'),
-    path('register/', views.register, name='register'),
-    path('groups/manager/users', views.manager_set),
-    path('groups/manager/users/<int:pk>', views.manager_delete),
-    path('groups/delivery-crew/users', views.delivery_set),
-    path('groups/delivery-crew/<int:pk>', views.delivery_delete),
-    path('assign-to-delivery-crew/<int:user_id>/', assign_to_delivery_crew, name='assign-to-delivery-crew'),
-
-    # Cart management endpoints 
-    path('cart/menu-items', views.cart),
-    path('add-to-cart/', add_to_cart, name='add-to-cart'),
-    path('view-cart/', view_cart, name='view-cart'),
+    path('login/', view('groups.login'), name='login'),
+    path('register/', view('groups.register'), name='register'),
+    path('groups/manager/users', view('groups.manager_set')),
+    path('groups/manager/users/<int:id>', view('groups.manager_delete')),
+    path('groups/delivery-crew/users', view('groups.delivery_set')),
+    path('groups/delivery-crew/<int:id>', view('groups.delivery_delete')),
+    path('assign-to-delivery-crew/<int:user_id>/', view('groups.assign_to_delivery_crew'), name='assign-to-delivery-crew'),
+
+    # Cart management endpoints
+    path('cart/menu-items', view('cart.cart')),
+    path('add-to-cart/', view('cart.add_to_cart'), name='add-to-cart'),
+    path('add-to-cart/batch/', view('cart.add_to_cart_batch'), name='add-to-cart-batch'),
+    path('view-cart/', read('cart.view_cart'), name='view-cart'),
 
     # Order management endpoints
-    path('orders', views.order),
-    path('orders/<int:id>', views.order_single),
-    path('place-order/', place_order, name='place-order'),
-    path('user-orders/', view_user_orders, name='user-orders'),
-    path('orders/<int:order_id>/assign-delivery/', views.assign_order_to_delivery, name='assign-order-to-delivery'),
-    path('orders/<int:order_id>/update-status/', views.update_order_status, name='update-order-status'),
-    
+    path('orders', read('orders.order')),
+    path('orders/<int:id>', view('orders.order_single')),
+    path('orders/export.<str:fmt>', view('orders.export_orders'), name='export-orders'),
+    path('place-order/', view('orders.place_order'), name='place-order'),
+    path('jobs/<int:id>', view('orders.job_status'), name='job'),
+    path('user-orders/', read('orders.view_user_orders'), name='user-orders'),
+    path('orders/<int:order_id>/assign-delivery/', view('orders.assign_order_to_delivery'), name='assign-order-to-delivery'),
+    path('orders/<int:order_id>/update-status/', view('orders.update_order_status'), name='update-order-status'),
+
+    # Sales analytics (managers)
+    path('analytics/sales', view('orders.sales_analytics'), name='sales-analytics'),
+
+    # Performance metrics (Prometheus)
+    path('metrics', view('ops.metrics_endpoint'), name='metrics'),
+
     # Test for admin access
-    path('admin/users', views.manager_admin),
-    
+    path('admin/users', view('groups.manager_admin')),
+
     # Test for serialization of Group
-    path('admin/group', views.group_view),
-]
\ No newline at end of file
+    path('admin/group', view('groups.group_view')),
+]
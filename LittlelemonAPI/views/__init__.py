@@ -0,0 +1,4 @@
+# The API views, one module per subsystem. Nothing is imported here: a
+# worker loads a module (and what it needs, e.g. django_filters for the
+# menu) on the first request that reaches it, see urls.py. Import views
+# from their module, e.g. `from LittlelemonAPI.views.orders import order`.
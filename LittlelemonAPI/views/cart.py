@@ -0,0 +1,99 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.decorators import api_view
+from .. import models
+from decimal import Decimal
+
+# Authentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import permission_classes
+
+# Throttle (token buckets shared by all workers, see throttling.py)
+from ..throttling import UserRateThrottle
+from rest_framework.decorators import throttle_classes
+
+# Serialization (formats: the MessagePack and CSV renderers)
+from rest_framework.decorators import renderer_classes
+from .. import formats, serializers
+
+# Cart updates (see checkout.py)
+from .. import checkout
+
+#Cart operations
+from ..models import Cart
+from ..serializers import CartSerializer
+
+def _add_to_cart(user, entries):
+    # Both add-to-cart endpoints: one price lookup and one upsert (see checkout.py)
+    quantities = {}
+    for entry in entries:
+        quantities[entry['menu_item_id']] = quantities.get(entry['menu_item_id'], 0) + entry['quantity']
+    missing = checkout.add_to_cart(user, quantities)
+    if missing:
+        return Response({'error': 'Menu item not found', 'menu_item_ids': missing}, status=status.HTTP_404_NOT_FOUND)
+    return None
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def add_to_cart(request):
+    serializer = serializers.CartEntrySerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    error = _add_to_cart(request.user, [serializer.validated_data])
+    if error:
+        return error
+    return Response({'message': 'Item added to cart'}, status=status.HTTP_200_OK)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def add_to_cart_batch(request):
+    # [{"menu_item_id": 1, "quantity": 2}, ...], all or nothing
+    serializer = serializers.CartEntrySerializer(data=request.data, many=True, allow_empty=False)
+    serializer.is_valid(raise_exception=True)
+    error = _add_to_cart(request.user, serializer.validated_data)
+    if error:
+        return error
+    return Response({'message': 'Items added to cart'}, status=status.HTTP_200_OK)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(formats.RENDERERS)
+def view_cart(request):
+    user = request.user
+    cart_items = CartSerializer.setup_eager_loading(Cart.objects.filter(user=user))
+    serializer = CartSerializer(cart_items, many=True)
+    return Response(serializer.data)
+
+@api_view(['GET', 'POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([UserRateThrottle])
+def cart(request):
+    if request.method == 'GET':
+        try:
+            cart = serializers.CartSerializer.setup_eager_loading(models.Cart.objects.all()).get(user=request.user)
+        except:
+            return Response({"message": "The cart is empty."}, status.HTTP_400_BAD_REQUEST)
+        serialized_item = serializers.CartSerializer(cart)
+        return Response(serialized_item.data, status.HTTP_200_OK)
+    if request.method == 'POST':
+        if models.Cart.objects.filter(user=request.user).exists():
+            return Response({"message": "The user has already a cart."}, status.HTTP_400_BAD_REQUEST)
+        menuitem = request.data["menuitem"]
+        quantity = request.data["quantity"]
+        unit_price = models.MenuItem.objects.get(pk=menuitem).price
+        price = Decimal(quantity) * unit_price
+        data = {"menuitem_id": menuitem,
+                "quantity": quantity,
+                "unit_price": unit_price,
+                "price": price,
+                "user_id": request.user.id,
+        }
+        serialized_item = serializers.CartSerializer(data=data)
+        serialized_item.is_valid(raise_exception=True)
+        serialized_item.save()
+        message = 'Cart is created.'
+        return Response({"message": message}, status.HTTP_201_CREATED)
+    if request.method == 'DELETE':
+        cart = get_object_or_404(models.Cart, user=request.user)
+        cart.delete()
+        return Response(status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,160 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.decorators import api_view
+
+# Authentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import permission_classes
+from django.contrib.auth import authenticate
+from rest_framework.authtoken.models import Token
+
+# Throttle (token buckets shared by all workers, see throttling.py)
+from ..throttling import UserRateThrottle
+from rest_framework.decorators import throttle_classes
+
+# Determine whether the user is admin
+from rest_framework.permissions import IsAdminUser
+
+# Manage users and group
+from django.contrib.auth.models import User, Group
+from .. import roles, serializers
+
+@api_view(['POST'])
+def login(request):
+    username = request.data.get('username')
+    password = request.data.get('password')
+    user = authenticate(username=username, password=password)
+    if user:
+        token, created = Token.objects.get_or_create(user=user)
+        return Response({'token': token.key})
+    else:
+        return Response({'error': 'Invalid Credentials'}, status=400)
+
+@api_view(['POST'])
+def register(request):
+    username = request.data.get('username')
+    email = request.data.get('email')
+    password = request.data.get('password')
+    if not username or not email or not password:
+        return Response({'error': 'Please provide all required fields'}, status=status.HTTP_400_BAD_REQUEST)
+    if User.objects.filter(username=username).exists():
+        return Response({'error': 'Username already exists'}, status=status.HTTP_400_BAD_REQUEST)
+    user = User.objects.create_user(username=username, email=email, password=password)
+    return Response({'message': 'User created successfully'}, status=status.HTTP_201_CREATED)
+
+# Test: Change user's group only by admin
+@api_view(['GET', 'POST', 'DELETE'])
+@permission_classes([IsAdminUser])
+def manager_admin(request):
+    username = request.data['username']
+    message = 'User ' + username + ' '
+    if username:
+        user = get_object_or_404(User, username=username)
+        managers = Group.objects.get(name="Manager")
+        if request.method == 'POST':
+            managers.user_set.add(user)
+            message += 'is set as manager.'
+        elif request.method == 'DELETE':
+            managers.user_set.remove(user)
+            message += 'is deleted from manager group.'
+        elif request.method == 'GET':
+            serialized_item = serializers.UserSerializer(managers, many=True)
+            return Response(serialized_item.data)
+        return Response({"message": message})
+    return Response({"message": "error"}, status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET', 'POST', 'DELETE'])
+@permission_classes([IsAdminUser])
+def group_view(request):
+    if request.method == 'GET':
+        serialized_item = serializers.GroupSerializer(Group.objects.all(), many=True)
+        return Response(serialized_item.data)
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def manager_set(request):
+    if not roles.is_manager(request.user):
+        return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+    if request.method == 'POST':
+        username = request.data['username']
+        if username:
+            user = get_object_or_404(User, username=username)
+        else:
+            return Response({"message": "Username is incorrect or not existed."}, status.HTTP_400_BAD_REQUEST)
+        managers = Group.objects.get(name="Manager")
+        managers.user_set.add(user)
+        message = 'User ' + username + ' ' 'is set as manager.'
+        return Response({"message": message}, status.HTTP_201_CREATED)
+    elif request.method == 'GET':
+        managers = serializers.UserSerializer.setup_eager_loading(User.objects.filter(groups__name=roles.MANAGER))
+        serialized_item = serializers.UserSerializer(managers, many=True)
+        return Response(serialized_item.data)
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([UserRateThrottle])
+def manager_delete(request, id):
+    if roles.is_manager(request.user):
+        if request.method != 'DELETE':
+            return Response({"message": "This endpoint only supports DELETE."}, status.HTTP_400_BAD_REQUEST)
+        user = get_object_or_404(User, id=id)
+        if roles.is_manager(user):
+            managers = Group.objects.get(name="Manager")
+            managers.user_set.remove(user)
+            message = 'User ' + user.get_username() + ' ' + 'is not manager now.'
+            return Response({"message": message}, status.HTTP_200_OK)
+        else:
+            return Response({"message": "This user is not a manager"}, status.HTTP_400_BAD_REQUEST)
+    else:
+        return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([UserRateThrottle])
+def delivery_set(request):
+    if not roles.is_manager(request.user):
+        return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+    if request.method == 'POST':
+        username = request.data['username']
+        if username:
+            user = get_object_or_404(User, username=username)
+        else:
+            return Response({"message": "Username is incorrect or not existed."}, status.HTTP_400_BAD_REQUEST)
+        crews = Group.objects.get(name="Delivery crew")
+        crews.user_set.add(user)
+        message = 'User ' + username + ' ' 'is set as delivery crew.'
+        return Response({"message": message}, status.HTTP_201_CREATED)
+    elif request.method == 'GET':
+        crews = serializers.UserSerializer.setup_eager_loading(User.objects.filter(groups__name=roles.DELIVERY_CREW))
+        serialized_item = serializers.UserSerializer(crews, many=True)
+        return Response(serialized_item.data)
+
+@api_view(['DELETE'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([UserRateThrottle])
+def delivery_delete(request, id):
+    if roles.is_manager(request.user):
+        if request.method != 'DELETE':
+            return Response({"message": "This endpoint only supports DELETE."}, status.HTTP_400_BAD_REQUEST)
+        user = get_object_or_404(User, id=id)
+        if roles.is_delivery_crew(user):
+            crews = Group.objects.get(name="Delivery crew")
+            crews.user_set.remove(user)
+            message = 'User ' + user.get_username() + ' ' + 'is not delivery crew now.'
+            return Response({"message": message}, status.HTTP_200_OK)
+        else:
+            return Response({"message": "This user is not a delivery crew"}, status.HTTP_400_BAD_REQUEST)
+    else:
+        return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated, IsAdminUser])  # Ensure only authenticated admins (managers) can access
+def assign_to_delivery_crew(request, user_id):
+    try:
+        user = User.objects.get(pk=user_id)
+        delivery_crew_group, created = Group.objects.get_or_create(name='Delivery crew')
+        delivery_crew_group.user_set.add(user)
+        return Response({'message': f'User {user.username} assigned to delivery crew'}, status=status.HTTP_200_OK)
+    except User.DoesNotExist:
+        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,176 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.decorators import api_view
+from .. import models
+
+# Authentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import permission_classes
+
+# Throttle (token buckets shared by all workers, see throttling.py)
+from ..throttling import AnonRateThrottle, UserRateThrottle
+from rest_framework.decorators import throttle_classes
+
+# Determine whether the user is admin
+from rest_framework.permissions import IsAdminUser
+from .. import roles
+
+# Serialization (listings: read-only fast path for the large lists;
+# formats: the MessagePack and CSV renderers they also offer)
+from rest_framework.decorators import renderer_classes
+from .. import formats, listings, serializers
+
+# Menu catalog cache
+from .. import catalog
+
+# Pagination
+from django.core.paginator import Paginator, EmptyPage
+from ..pagination import KeysetPagination, MenuItemPagination
+
+#Filtering
+from rest_framework import generics
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter
+from .. import search as menu_search
+
+from ..models import MenuItem
+from ..serializers import MenuItemSerializer
+
+@api_view(['GET'])
+@renderer_classes(formats.RENDERERS)
+def all_menu_items(request):
+    return catalog.cached_response(request, lambda: listings.menu_items(listings.menu_item_rows(models.MenuItem.objects.all())))
+
+class MenuItemsView(generics.ListCreateAPIView):
+    queryset = MenuItemSerializer.setup_eager_loading(MenuItem.objects.all())
+    serializer_class = MenuItemSerializer
+    permission_classes = [IsAdminUser]  # Only allow admins to post
+    pagination_class = MenuItemPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter, menu_search.MenuSearchFilter]
+    filterset_fields = ['category', 'price']
+    search_fields = ['title']
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [permission() for permission in self.permission_classes]
+        return []
+
+    def list(self, request, *args, **kwargs):
+        # Served from the versioned catalog cache, see catalog.py
+        return catalog.cached_response(request, lambda: super(MenuItemsView, self).list(request, *args, **kwargs).data)
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def category(request):
+    if request.method == 'GET':
+        items = models.Category.objects.all()
+        serialized_item = serializers.CategorySerializer(items, many=True)
+        return Response(serialized_item.data, status.HTTP_200_OK)
+    if request.method == 'POST' and roles.is_manager(request.user):
+        serialized_item = serializers.CategorySerializer(data=request.data)
+        serialized_item.is_valid(raise_exception=True)
+        serialized_item.save()
+        return Response(serialized_item.data, status.HTTP_201_CREATED)
+    return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+
+
+#some legacy below
+@api_view(['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def category_single(request, id):
+    item = get_object_or_404(models.Category, pk=id)
+    if request.method == 'GET':
+        serialized_item = serializers.CategorySerializer(item)
+        return Response(serialized_item.data, status.HTTP_200_OK)
+    elif request.method == 'POST':
+        return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+    if not roles.is_manager(request.user):
+        return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+    if request.method == 'PUT':
+        serialized_item = serializers.CategorySerializer(item, data=request.data)
+        serialized_item.is_valid(raise_exception=True)
+        serialized_item.save()
+        return Response(serialized_item.data, status.HTTP_205_RESET_CONTENT)
+    if request.method == 'PATCH':
+        serialized_item = serializers.CategorySerializer(item, data=request.data, partial=True)
+        serialized_item.is_valid(raise_exception=True)
+        serialized_item.save()
+        return Response(serialized_item.data, status.HTTP_205_RESET_CONTENT)
+    if request.method == 'DELETE':
+        item.delete()
+        return Response(status.HTTP_204_NO_CONTENT)
+
+@api_view(['GET', 'POST'])
+@throttle_classes([AnonRateThrottle, UserRateThrottle])
+def menuitems(request):
+    if request.method == 'GET':
+        items = serializers.MenuItemSerializer.setup_eager_loading(models.MenuItem.objects.all())
+        category_name = request.query_params.get('category')
+        to_price = request.query_params.get('to_price')
+        search = request.query_params.get('search')
+        ordering = request.query_params.get('ordering')
+        perpage = request.query_params.get('perpage', default=2)
+        page = request.query_params.get('page', default=1)
+        if category_name:
+            items = items.filter(category__title=category_name)
+        if to_price:
+            items = items.filter(price__lte=to_price)
+        if search:
+            items = menu_search.search_menu_items(items, search, rank=not ordering)
+        if ordering:
+            ordering_fields = ordering.split(",")
+            items = items.order_by(*ordering_fields)
+        if KeysetPagination.requested(request):
+            paginator = KeysetPagination(MenuItemPagination.keyset_fields, page_size=2)
+            items = paginator.paginate_queryset(items, request)
+            serialized_item = serializers.MenuItemSerializer(items, many=True)
+            return paginator.get_paginated_response(serialized_item.data)
+        paginator = Paginator(items, per_page=perpage)
+        try:
+            items = paginator.page(number=page)
+        except EmptyPage:
+            items = []
+        serialized_item = serializers.MenuItemSerializer(items, many=True)
+        return Response(serialized_item.data, status.HTTP_200_OK)
+    if request.method == 'POST' and roles.is_manager(request.user):
+        serialized_item = serializers.MenuItemSerializer(data=request.data)
+        serialized_item.is_valid(raise_exception=True)
+        serialized_item.save()
+        return Response(serialized_item.data, status.HTTP_201_CREATED)
+    return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+
+@api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
+@throttle_classes([AnonRateThrottle, UserRateThrottle])
+def menuitems_single(request, id):
+    item = get_object_or_404(models.MenuItem.objects.select_related('category'), pk=id)
+    if request.method == 'GET':
+        serialized_item = serializers.MenuItemSerializer(item)
+        return Response(serialized_item.data, status.HTTP_200_OK)
+    elif request.method == 'POST' or not roles.is_manager(request.user):
+        return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+    if request.method == 'PUT':
+        serialized_item = serializers.MenuItemSerializer(item, data=request.data)
+        serialized_item.is_valid(raise_exception=True)
+        serialized_item.save()
+        return Response(serialized_item.data, status.HTTP_205_RESET_CONTENT)
+    if request.method == 'PATCH':
+        serialized_item = serializers.MenuItemSerializer(item, data=request.data, partial=True)
+        serialized_item.is_valid(raise_exception=True)
+        serialized_item.save()
+        return Response(serialized_item.data, status.HTTP_205_RESET_CONTENT)
+    if request.method == 'DELETE':
+        item.delete()
+        return Response(status.HTTP_204_NO_CONTENT)
+
+@api_view(['PATCH'])
+@permission_classes([IsAdminUser])  # Only admin users can access this
+def update_item_of_the_day(request, item_id):
+    try:
+        item = MenuItem.objects.select_related('category').get(pk=item_id)
+        # MenuItem.save() unfeatures the previous item of the day
+        item.featured = True
+        item.save(update_fields=['featured'])
+        serializer = MenuItemSerializer(item)
+        return Response(serializer.data)
+    except MenuItem.DoesNotExist:
+        return Response({'error': 'Item not found'}, status=404)
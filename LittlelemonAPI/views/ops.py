@@ -0,0 +1,31 @@
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.decorators import api_view
+
+# Throttle (token buckets shared by all workers, see throttling.py)
+from ..throttling import AnonRateThrottle, UserRateThrottle
+from rest_framework.decorators import throttle_classes
+
+# Determine whether the user is admin
+from rest_framework.permissions import IsAdminUser
+from rest_framework.decorators import permission_classes
+
+# Performance metrics
+from django.http import HttpResponse
+from .. import metrics
+
+@api_view()
+def home(request):
+    return Response('The home view.', status.HTTP_200_OK)
+
+# Test: throttle test
+@api_view()
+@throttle_classes([AnonRateThrottle, UserRateThrottle])
+def throttle_check(request):
+    return Response({"message": "Throttle check."})
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metrics_endpoint(request):
+    # Prometheus text format, aggregated over the workers on this host
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
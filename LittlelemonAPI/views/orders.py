@@ -0,0 +1,253 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.decorators import api_view
+from .. import models
+
+# Authentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import permission_classes
+
+# Throttle (token buckets shared by all workers, see throttling.py)
+from ..throttling import UserRateThrottle
+from rest_framework.decorators import throttle_classes
+
+# Manage users and group
+from django.contrib.auth.models import User
+from .. import roles
+
+# Serialization (listings: read-only fast path for the large lists;
+# formats: the MessagePack and CSV renderers they also offer)
+from rest_framework.decorators import renderer_classes
+from .. import formats, listings, serializers
+
+# Order placement
+from django.db import transaction
+from django.urls import reverse
+from .. import checkout, jobs, rollups
+
+# Order export
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import ValidationError
+from django.utils.dateparse import parse_date
+from .. import export
+
+# Pagination
+from django.core.paginator import Paginator, EmptyPage
+from ..pagination import KeysetPagination
+
+from ..models import Order
+from ..serializers import OrderSerializer
+
+def prefers_async(request):
+    # RFC 7240: the client takes a 202 and polls the job instead
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+def job_accepted(job):
+    return Response(serializers.JobSerializer(job).data, status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': reverse('job', args=[job.pk])})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_status(request, id):
+    job = get_object_or_404(models.Job, pk=id)
+    if job.user_id != request.user.pk and not request.user.is_staff:
+        return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+    return Response(serializers.JobSerializer(job).data)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def place_order(request):
+    # Creates the order and its items and clears the cart in one transaction
+    if prefers_async(request):
+        return job_accepted(jobs.enqueue(checkout.PLACE_ORDER, {'user_id': request.user.pk}, user=request.user))
+    if checkout.place_order(request.user) is None:
+        return Response({'error': 'Your cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'message': 'Order placed successfully'}, status=status.HTTP_201_CREATED)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(formats.RENDERERS)
+def view_user_orders(request):
+    return Response(listings.orders(listings.order_rows(Order.objects.filter(user=request.user))))
+
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated])
+def assign_order_to_delivery(request, order_id):
+    user = request.user
+    if not roles.is_manager(user):
+        return Response({"message": "Unauthorized"}, status=status.HTTP_403_FORBIDDEN)
+    order = get_object_or_404(Order, pk=order_id)
+    delivery_crew_id = request.data.get('delivery_crew_id')
+    try:
+        delivery_crew_member = User.objects.get(pk=delivery_crew_id)
+        order.delivery_crew = delivery_crew_member
+        with transaction.atomic(), rollups.order_changing(order):
+            order.save()
+        return Response(OrderSerializer(order).data)
+    except User.DoesNotExist:
+        return Response({"message": "Delivery crew member not found"}, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['PATCH'])
+@permission_classes([IsAuthenticated])
+def update_order_status(request, order_id):
+    # Check if the user is part of the delivery crew
+    if not roles.is_delivery_crew(request.user):
+        return Response({"message": "You are not authorized."}, status=status.HTTP_403_FORBIDDEN)
+    # Get the order
+    order = get_object_or_404(Order, pk=order_id)
+    # Update the order status
+    order.is_delivered = True  # or use any other logic for status update
+    with transaction.atomic(), rollups.order_changing(order):
+        order.save()
+    return Response({"message": "Order status updated successfully."})
+
+# e.g. ?ordering=-date&cursor= pages on (date, id) without counting
+ORDER_KEYSET_FIELDS = ('id', 'date', 'total', 'status')
+
+def manager_orders(query_params):
+    # Filtered, unpaginated queryset behind the manager's order listing
+    orders = serializers.OrderHistorySerializer.setup_eager_loading(models.Order.objects.all())
+    to_price = query_params.get('to_price')
+    search = query_params.get('search')
+    ordering = query_params.get('ordering')
+    if to_price:
+        orders = orders.filter(total__lte=to_price)
+    if search:
+        orders = orders.filter(status__icontains=search)
+    if ordering:
+        ordering_fields = ordering.split(",")
+        orders = orders.order_by(*ordering_fields)
+    else:
+        # Pages of an unordered queryset aren't stable
+        orders = orders.order_by('pk')
+    return orders
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([UserRateThrottle])
+@renderer_classes(formats.RENDERERS)
+def order(request):
+    if request.method == 'GET':
+        if roles.is_manager(request.user):
+            orders = manager_orders(request.query_params)
+            perpage = request.query_params.get('perpage', default=2)
+            page = request.query_params.get('page', default=1)
+            if KeysetPagination.requested(request):
+                paginator = KeysetPagination(ORDER_KEYSET_FIELDS, page_size=2)
+                orders = paginator.paginate_queryset(orders, request)
+                serialized_order = serializers.OrderHistorySerializer(orders, many=True)
+                return paginator.get_paginated_response(serialized_order.data)
+            paginator = Paginator(listings.order_rows(orders), per_page=perpage)
+            try:
+                rows = paginator.page(number=page).object_list
+            except EmptyPage:
+                rows = []
+            return Response(listings.orders(rows), status.HTTP_200_OK)
+        elif roles.is_delivery_crew(request.user):
+            rows = listings.order_rows(models.Order.objects.filter(delivery_crew=request.user))
+            return Response(listings.orders(rows), status.HTTP_200_OK)
+        else: # customer view
+            order = listings.orders(listings.order_rows(models.Order.objects.filter(user=request.user)))
+            if order:
+                return Response(order, status.HTTP_200_OK)
+            else:
+                return Response(status=status.HTTP_404_NOT_FOUND)
+    if request.method == 'POST':
+        # same transactional path as place_order
+        if prefers_async(request):
+            return job_accepted(jobs.enqueue(checkout.PLACE_ORDER, {'user_id': request.user.pk}, user=request.user))
+        if checkout.place_order(request.user) is None:
+            return Response({"message": "The cart is empty."}, status.HTTP_404_NOT_FOUND)
+        message = 'Order is created.'
+        return Response({"message": message}, status.HTTP_201_CREATED)
+    return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+
+def save_order(serializer):
+    # Saving moves the order's date (auto_now), and PUT can change its total
+    with transaction.atomic(), rollups.order_changing(serializer.instance):
+        serializer.save()
+
+@api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([UserRateThrottle])
+def order_single(request, id):
+    order = get_object_or_404(serializers.OrderSerializer.setup_eager_loading(models.Order.objects.all()), pk=id)
+    if request.method == 'GET':
+        if order.user_id != request.user.id:
+            return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+        serialized_order = serializers.OrderSerializer(order)
+        return Response(serialized_order.data, status.HTTP_200_OK)
+    if request.method == 'PUT':
+        # only manager could perform PUT action
+        if not roles.is_manager(request.user):
+            return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+        serialized_item = serializers.OrderSerializer(order, data=request.data)
+        serialized_item.is_valid(raise_exception=True)
+        save_order(serialized_item)
+        return Response(serialized_item.data, status.HTTP_205_RESET_CONTENT)
+    if request.method == 'PATCH':
+        if roles.is_delivery_crew(request.user):
+            # delivery crew can only PATCH the order
+            if order.delivery_crew != request.user:
+                return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+            # only status of the order can be changed
+            deliverystatus = request.data["status"]
+            status_data = {"status": deliverystatus}
+            serialized_item = serializers.OrderSerializer(order, data=status_data, partial=True)
+            serialized_item.is_valid(raise_exception=True)
+            save_order(serialized_item)
+            return Response(serialized_item.data, status.HTTP_205_RESET_CONTENT)
+        if roles.is_manager(request.user):
+            serialized_item = serializers.OrderSerializer(order, data=request.data, partial=True)
+            serialized_item.is_valid(raise_exception=True)
+            save_order(serialized_item)
+            return Response(serialized_item.data, status.HTTP_205_RESET_CONTENT)
+        return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+    if request.method == 'DELETE':
+        if not roles.is_manager(request.user):
+            return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+        with transaction.atomic():
+            rollups.order_deleted(order)
+            order.delete()
+        return Response(status.HTTP_204_NO_CONTENT)
+
+def _date_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Dates must be YYYY-MM-DD.'})
+    return parsed
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_orders(request, fmt):
+    # Streams order history as NDJSON (one order per line) or CSV (one line per item)
+    if not roles.is_manager(request.user):
+        return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+    if fmt not in ('ndjson', 'csv'):
+        return Response({"message": "Supported formats are ndjson and csv."}, status.HTTP_404_NOT_FOUND)
+    queryset = export.export_queryset(_date_param(request, 'from'), _date_param(request, 'to'))
+    rows = export.rows(fmt, queryset, asynchronous=isinstance(request._request, ASGIRequest))
+    response = StreamingHttpResponse(rows, content_type='text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    response['Content-Disposition'] = f'attachment; filename="orders.{fmt}"'
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sales_analytics(request):
+    # Daily revenue, order counts and best sellers from the sales rollups
+    if not roles.is_manager(request.user):
+        return Response({"message": "You are not authorized."}, status.HTTP_403_FORBIDDEN)
+    try:
+        top = int(request.query_params.get('top', 10))
+    except ValueError:
+        raise ValidationError({'top': 'Must be an integer.'})
+    report = rollups.sales_report(_date_param(request, 'from'), _date_param(request, 'to'), max(0, min(top, 100)))
+    return Response(serializers.SalesReportSerializer(report).data)